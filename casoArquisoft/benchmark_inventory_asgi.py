@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrencia: endpoints async (ASGI) vs. hilos (WSGI)
+==================================================================
+
+Misma carga y mismo servicio (AsyncInventoryService) con los dos modelos de
+ejecución, `--clients` clientes concurrentes en lazo cerrado (cada uno envía
+su siguiente petición al recibir la respuesta):
+
+- wsgi: `--threads` hilos de worker (como gunicorn --threads); cada petición
+        ocupa su hilo durante todos sus viajes a la BD, con una conexión
+        propia por hilo
+- asgi: un solo event loop; las peticiones esperan a la BD y al pool con
+        await, sobre un pool de `--pool-size` conexiones
+
+Con SQLite, --latency-ms simula el tiempo de ida y vuelta de red a MySQL en
+cada viaje (SQLite es local y no lo tiene). Con --driver mysql se usa la BD
+real (requiere aiomysql).
+
+Uso:
+    python benchmark_inventory_asgi.py --clients 1500 --threads 32 --latency-ms 5
+    python benchmark_inventory_asgi.py --driver mysql --operation transaction
+"""
+
+import argparse
+import asyncio
+import functools
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'casoArquisoft.settings')
+
+import django
+
+django.setup()
+
+import inventory_async  # noqa: E402
+from inventory_config import ASR_CONFIG, INVENTORY_ASYNC_CONFIG  # noqa: E402
+from inventory_retry import RetryPolicy  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)]
+
+
+def build_service(args, workdir, pool_size):
+    config = dict(INVENTORY_ASYNC_CONFIG, driver=args.driver, pool_size=pool_size, max_overflow=0,
+                  pool_timeout=60, sqlite_path=os.path.join(workdir, 'inventory_async.sqlite3'))
+    service = inventory_async.AsyncInventoryService(
+        inventory_async.create_async_pool(config), RetryPolicy(budget_ms=60000), args.driver
+    )
+    if args.driver == 'sqlite':
+        service.pool.connect = functools.partial(inventory_async.connect_sqlite, config['sqlite_path'],
+                                                 latency_ms=args.latency_ms)
+    return service
+
+
+async def request(service, args, rng):
+    """Una petición de la carga: consulta de estado o transacción sobre una SKU al azar"""
+    producto_id = f'bench{rng.randrange(args.skus)}'
+    operation = args.operation
+    if operation == 'mixed':
+        operation = 'transaction' if rng.random() < 0.2 else 'status'
+    if operation == 'status':
+        return await service.get_inventory_status(producto_id=producto_id, ubicacion='BM-B1')
+    return await service.create_transaction({
+        'producto_id': producto_id, 'tipo_operacion': 'RECEPCION', 'cantidad': 1,
+        'ubicacion': 'BM-B1', 'operario_id': 'BENCH'
+    })
+
+
+async def run_clients(args, send):
+    """`--clients` clientes en lazo cerrado hasta completar `--requests`. Retorna (segundos, latencias, errores)"""
+    remaining = [args.requests]
+    latencies = []
+    errors = [0]
+    rng = random.Random(args.seed)
+
+    async def client():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            result = await send(rng)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if 'error' in result:
+                errors[0] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(args.clients)])
+    return time.perf_counter() - start, sorted(latencies), errors[0]
+
+
+async def run_asgi(args, workdir):
+    service = build_service(args, workdir, args.pool_size)
+    try:
+        result = await run_clients(args, lambda rng: request(service, args, rng))
+        return result + (threading.active_count(),)
+    finally:
+        await service.close()
+
+
+async def run_wsgi(args, workdir):
+    # Cada hilo atiende una petición a la vez de principio a fin, con su propio loop y conexión
+    local = threading.local()
+    services = []
+    lock = threading.Lock()
+
+    def handle(seed):
+        if not hasattr(local, 'loop'):
+            local.loop = asyncio.new_event_loop()
+            local.service = build_service(args, workdir, 1)
+            with lock:
+                services.append((local.loop, local.service))
+        return local.loop.run_until_complete(request(local.service, args, random.Random(seed)))
+
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=args.threads, thread_name_prefix='wsgi-worker') as executor:
+        result = await run_clients(
+            args, lambda rng: loop.run_in_executor(executor, handle, rng.random())
+        )
+        threads = threading.active_count()
+        for worker_loop, service in services:
+            executor.submit(worker_loop.run_until_complete, service.close()).result()
+    return result + (threads,)
+
+
+async def seed_stock(args, workdir):
+    service = build_service(args, workdir, 1)
+    try:
+        for index in range(args.skus):
+            await service.create_transaction({
+                'producto_id': f'bench{index}', 'tipo_operacion': 'RECEPCION', 'cantidad': 1000,
+                'ubicacion': 'BM-B1', 'operario_id': 'BENCH'
+            })
+    finally:
+        await service.close()
+
+
+def report(mode, seconds, latencies, errors, threads):
+    budget = ASR_CONFIG['max_response_time_ms']
+    within = sum(1 for value in latencies if value <= budget)
+    print(f"  {mode:<5} {len(latencies) / seconds:>9.0f} req/s   p50 {percentile(latencies, 50):8.2f} ms   "
+          f"p99 {percentile(latencies, 99):8.2f} ms   <= {budget} ms: {within / len(latencies):6.1%}   "
+          f"hilos {threads:<4} errores {errors}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark ASGI vs WSGI de los endpoints de inventario')
+    parser.add_argument('--driver', default='sqlite', choices=['sqlite', 'mysql'])
+    parser.add_argument('--operation', default='status', choices=['status', 'transaction', 'mixed'])
+    parser.add_argument('--clients', type=int, default=ASR_CONFIG['concurrent_users'])
+    parser.add_argument('--requests', type=int, default=6000)
+    parser.add_argument('--threads', type=int, default=32, help='Hilos del worker WSGI')
+    parser.add_argument('--pool-size', type=int, default=INVENTORY_ASYNC_CONFIG['pool_size'],
+                        help='Conexiones del pool ASGI')
+    parser.add_argument('--latency-ms', type=float, default=5, help='Latencia de red simulada (SQLite)')
+    parser.add_argument('--skus', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--modes', default='wsgi,asgi')
+    args = parser.parse_args(argv)
+
+    print(f"📊 {args.requests} peticiones '{args.operation}', {args.clients} clientes, driver {args.driver}, "
+          f"latencia {args.latency_ms} ms, WSGI {args.threads} hilos, ASGI pool {args.pool_size}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(seed_stock(args, workdir))
+        for mode in args.modes.split(','):
+            runner = run_wsgi if mode.strip() == 'wsgi' else run_asgi
+            report(mode.strip(), *asyncio.run(runner(args, workdir)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
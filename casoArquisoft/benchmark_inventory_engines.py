@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los motores de inventario (inventory_engines.py)
+=============================================================
+
+Ejecuta la misma carga (generada con una semilla fija) contra cada motor y
+reporta throughput y latencias p50/p99 por operación. El motor `mysql` es el
+servicio MySQL real (InventoryService de inventory_microservice), con sus
+reintentos, outbox, contador pendientes y caché; recibe las mismas llamadas
+pero conserva sus propias reglas (ver inventory_engines.MySQLEngine).
+
+Fases:
+1. create: transacciones de recepción/picking/devolución sobre las SKUs sembradas
+2. mixed:  consultas de stock, historial, actualizaciones y cancelaciones
+           sobre las transacciones creadas en la fase 1
+
+Uso:
+    python benchmark_inventory_engines.py --engines memory,sqlite --operations 5000 --threads 16
+    python benchmark_inventory_engines.py --engines mysql   # requiere la BD de INVENTORY_DATABASE_CONFIG
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'casoArquisoft.settings')
+
+import django
+
+django.setup()
+
+from inventory_engines import ENGINE_NAMES, create_engine  # noqa: E402
+
+OPERATION_TYPES = ['RECEPCION', 'PICKING', 'DEVOLUCION']
+
+# Proporción de cada operación en la fase mixta
+MIXED_WEIGHTS = {
+    'stock_status': 50,
+    'history': 10,
+    'update': 20,
+    'cancel': 20,
+}
+
+
+def build_workload(operations, skus, seed):
+    """Carga determinista: ([creaciones], [operaciones mixtas]) iguales para todos los motores"""
+    rng = random.Random(seed)
+    creates = [
+        ('create', (f'bench{rng.randrange(skus)}', rng.choice(OPERATION_TYPES), rng.randint(1, 5), 'BM-B1'))
+        for _ in range(operations)
+    ]
+    kinds = list(MIXED_WEIGHTS)
+    weights = list(MIXED_WEIGHTS.values())
+    mixed = []
+    for _ in range(operations):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == 'stock_status':
+            mixed.append((kind, (f'bench{rng.randrange(skus)}', rng.choice(['BM-B1', None]))))
+        elif kind == 'history':
+            mixed.append((kind, (50,)))
+        else:
+            # Índice de la transacción de la fase 1 sobre la que se opera
+            mixed.append((kind, (rng.randrange(operations), rng.randint(1, 5))))
+    return creates, mixed
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)]
+
+
+def run_phase(engine, workload, threads, created_ids):
+    """Ejecuta las operaciones con `threads` hilos. Retorna (segundos, {operación: [latencias ms]})"""
+
+    def execute(operation):
+        kind, args = operation
+        start = time.perf_counter()
+        if kind == 'create':
+            result = engine.create_transaction(*args, 'BENCH')
+        elif kind == 'stock_status':
+            result = engine.get_stock_status(*args)
+        elif kind == 'history':
+            result = engine.get_transaction_history(*args)
+        else:
+            transaction_id = created_ids[args[0] % len(created_ids)] if created_ids else 'TXN_INEXISTENTE'
+            if kind == 'update':
+                result = engine.update_transaction(transaction_id, {'cantidad': args[1]})
+            else:
+                result = engine.cancel_transaction(transaction_id, 'BENCH')
+        return kind, (time.perf_counter() - start) * 1000, result
+
+    latencies = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for kind, elapsed_ms, result in executor.map(execute, workload):
+            latencies.setdefault(kind, []).append(elapsed_ms)
+            if kind == 'create' and result.get('success'):
+                created_ids.append(result['transaction_id'])
+    return time.perf_counter() - start, latencies
+
+
+def report(engine_name, phase, seconds, latencies):
+    all_latencies = sorted(value for values in latencies.values() for value in values)
+    print(f"  {phase:<7} {len(all_latencies) / seconds:>10.0f} ops/s   "
+          f"p50 {percentile(all_latencies, 50):7.3f} ms   p99 {percentile(all_latencies, 99):7.3f} ms")
+    for kind, values in sorted(latencies.items()):
+        values.sort()
+        print(f"    {kind:<13} n={len(values):<6} p50 {percentile(values, 50):7.3f} ms   "
+              f"p99 {percentile(values, 99):7.3f} ms")
+
+
+def benchmark(engine_name, creates, mixed, skus, threads, workdir):
+    engine = create_engine(engine_name, sqlite_path=os.path.join(workdir, f'{engine_name}.sqlite3'))
+    try:
+        for index in range(skus):
+            engine.create_stock(f'bench{index}', 'BM-B1', cantidad=1000)
+
+        print(f"\n🔧 Motor: {engine_name}")
+        created_ids = []
+        for phase, workload in (('create', creates), ('mixed', mixed)):
+            seconds, latencies = run_phase(engine, workload, threads, created_ids)
+            report(engine_name, phase, seconds, latencies)
+    finally:
+        engine.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de los motores de inventario')
+    parser.add_argument('--engines', default='memory,sqlite',
+                        help=f"Motores separados por coma ({', '.join(ENGINE_NAMES)})")
+    parser.add_argument('--operations', type=int, default=2000, help='Operaciones por fase')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--skus', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    creates, mixed = build_workload(args.operations, args.skus, args.seed)
+    print(f"📊 {args.operations} operaciones por fase, {args.threads} hilos, {args.skus} SKUs, semilla {args.seed}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for engine_name in args.engines.split(','):
+            benchmark(engine_name.strip(), creates, mixed, args.skus, args.threads, workdir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'casoArquisoft.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Servir con: uvicorn casoArquisoft.asgi:application
+# Las vistas de inventory_async_urls esperan a la BD sin ocupar hilos; el
+# lifespan pre-calienta (INVENTORY_POOL_PREWARM) y cierra su pool de conexiones
+from inventory_async import handle_lifespan
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await handle_lifespan(receive, send)
+        return
+    await django_application(scope, receive, send)
@@ -14,3 +14,27 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'casoArquisoft.settings')
 
 application = get_wsgi_application()
+
+# Pre-calentar el pool MySQL de inventario al arrancar el worker (opcional)
+from inventory_config import INVENTORY_CONNECTION_POOL
+
+if INVENTORY_CONNECTION_POOL['prewarm']:
+    from inventory_microservice import warm_connection_pool
+
+    try:
+        warm_connection_pool()
+    except Exception as e:
+        # La base de datos puede no estar lista: el pool abrirá conexiones bajo demanda
+        print(f"No se pudo pre-calentar el pool de inventario: {e}")
+
+# Carga inicial de alertas de stock bajo del servicio MySQL (ver InventoryService.load_low_stock_alerts)
+from inventory_config import LOW_STOCK_CONFIG
+
+if LOW_STOCK_CONFIG['load_on_startup']:
+    from inventory_microservice import inventory_service
+
+    try:
+        inventory_service.load_low_stock_alerts()
+    except Exception as e:
+        # Sin la carga inicial las alertas se abren con la próxima escritura de cada SKU
+        print(f"No se pudo cargar el estado de stock bajo: {e}")
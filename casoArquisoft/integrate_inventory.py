@@ -67,17 +67,22 @@ def update_settings_file():
 # Importar configuración del microservicio
 from inventory_config import (
     INVENTORY_DATABASE_CONFIG, 
+    INVENTORY_REPLICA_DATABASES,
     ASR_CONFIG, 
     MONITORING_CONFIG,
     configure_django_for_inventory
 )
 
-# Base de datos adicional para inventario
+# Base de datos adicional para inventario (y sus réplicas de lectura, si las hay)
 DATABASES['inventory'] = INVENTORY_DATABASE_CONFIG
+DATABASES.update(INVENTORY_REPLICA_DATABASES)
 
 # Router para dirigir queries a la base de datos correcta
 DATABASE_ROUTERS = ['inventory_config.InventoryDatabaseRouter']
 
+# Lecturas del primario tras escribir (read-your-writes entre peticiones)
+MIDDLEWARE.append('inventory_replicas.InventoryReadYourWritesMiddleware')
+
 # Cache adicional para inventario
 CACHES['inventory'] = {
     'BACKEND': 'django.core.cache.backends.redis.RedisCache',
@@ -197,10 +202,14 @@ def update_main_urls():
     with open(main_urls_file, 'r', encoding='utf-8') as f:
         content = f.read()
     
+    # Endpoints async (servidos con casoArquisoft/asgi.py, ver inventory_async.py)
+    inventory_async_urls = """
+    path('api/inventory/async/', include('inventory_async_urls')),"""
+    
     # Rutas adicionales para el microservicio
     inventory_urls = """
     # URLs del microservicio de inventario
-    path('api/inventory/', include('inventory_urls')),
+    path('api/inventory/', include('inventory_urls')),""" + inventory_async_urls + """
     path('health/inventory/', InventoryHealthView.as_view(), name='inventory_health'),"""
     
     # Importaciones adicionales
@@ -241,6 +250,15 @@ class InventoryHealthView(View):
             f.write(content)
         
         print("✅ URLs principales actualizadas con rutas del microservicio")
+    elif 'inventory_async_urls' not in content:
+        # Integrado antes de los endpoints async: agregarlos tras las rutas síncronas
+        sync_urls = "    path('api/inventory/', include('inventory_urls')),"
+        content = content.replace(sync_urls, sync_urls + inventory_async_urls, 1)
+        
+        with open(main_urls_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+        
+        print("✅ URLs principales actualizadas con los endpoints async del microservicio")
     else:
         print("ℹ️  URLs principales ya contienen rutas del microservicio")
 
@@ -0,0 +1,113 @@
+"""
+Detección Incremental de Stock Bajo
+===================================
+
+Produce el evento STOCK_LOW_WARNING de EVENT_CONFIG sin recorrer el
+inventario: cada mutación de stock se evalúa en O(1) contra el umbral de su
+SKU-ubicación (o de su producto, o el umbral por defecto de LOW_STOCK_CONFIG).
+
+- Histéresis: una SKU entra en alerta al bajar del umbral y solo sale cuando
+  supera umbral + histéresis, así las oscilaciones alrededor del umbral no
+  generan una ráfaga de eventos
+- Las SKUs en alerta se mantienen en una lista ordenada (bisect) por su
+  faltante, de modo que "todas las SKUs bajo el umbral" se responde sin
+  calcular nada y la más crítica queda primera
+
+Lo usa InventoryServiceSimulator como listener del backend de almacenamiento.
+Los servicios MySQL solo toman de aquí los umbrales (threshold_for): su estado
+de alerta vive en la tabla alertas_stock_bajo y se evalúa dentro del lote de
+escritura (ver inventory_operations.stock_write_batch), así que es uno solo
+para todos los workers. El nivel es siempre el disponible (available_stock).
+"""
+
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from inventory_operations import available_stock
+
+LOW_STOCK_WARNING = 'STOCK_LOW_WARNING'
+LOW_STOCK_RESOLVED = 'STOCK_LOW_RESOLVED'
+
+
+class LowStockDetector:
+    """Umbrales de stock bajo evaluados incrementalmente"""
+
+    def __init__(self, default_threshold, hysteresis=0, thresholds=None, on_event=None):
+        self.default_threshold = default_threshold
+        self.hysteresis = hysteresis
+        self.thresholds = dict(thresholds or {})
+        self.on_event = on_event
+        self._lock = threading.Lock()
+        # stock_key -> (faltante, stock_key, producto_id, ubicacion, nivel, umbral) de las SKUs en alerta
+        self._low = {}
+        self._sorted = []
+        self._warnings = 0
+        self._resolved = 0
+
+    def threshold_for(self, stock_key, producto_id):
+        """Umbral de la SKU-ubicación, si no el del producto, si no el por defecto"""
+        threshold = self.thresholds.get(stock_key)
+        if threshold is None:
+            threshold = self.thresholds.get(producto_id, self.default_threshold)
+        return threshold
+
+    def observe(self, stock_key, producto_id, ubicacion, nivel):
+        """Evalúa el nuevo nivel de una SKU. Retorna el evento emitido o None"""
+        threshold = self.threshold_for(stock_key, producto_id)
+        event = None
+        with self._lock:
+            current = self._low.get(stock_key)
+            if current is not None:
+                # Quitar la entrada anterior de la lista ordenada (búsqueda binaria)
+                del self._sorted[bisect_left(self._sorted, current)]
+
+            if nivel < threshold or (current is not None and nivel < threshold + self.hysteresis):
+                entry = (threshold - nivel, stock_key, producto_id, ubicacion, nivel, threshold)
+                self._low[stock_key] = entry
+                insort(self._sorted, entry)
+                if current is None:
+                    self._warnings += 1
+                    event = LOW_STOCK_WARNING
+            elif current is not None:
+                del self._low[stock_key]
+                self._resolved += 1
+                event = LOW_STOCK_RESOLVED
+
+        if event is not None and self.on_event is not None:
+            self.on_event(event, {
+                'stock_key': stock_key,
+                'producto_id': producto_id,
+                'ubicacion': ubicacion,
+                'nivel': nivel,
+                'umbral': threshold,
+                'timestamp': datetime.now().isoformat()
+            })
+        return event
+
+    def stock_changed(self, stock_key, stock):
+        """Listener del backend de almacenamiento del simulador (nivel = disponible)"""
+        self.observe(stock_key, stock['producto_id'], stock['ubicacion'],
+                     available_stock(stock['cantidad'], stock['reservada']))
+
+    def transaction_changed(self, transaction):
+        """Las transacciones no cambian el nivel por sí mismas"""
+
+    def below_threshold(self, limit=None):
+        """SKUs en alerta ordenadas de mayor a menor faltante"""
+        with self._lock:
+            entries = self._sorted[::-1] if limit is None else self._sorted[:-limit - 1:-1]
+        return [
+            {'stock_key': stock_key, 'producto_id': producto_id, 'ubicacion': ubicacion,
+             'nivel': nivel, 'umbral': threshold, 'faltante': shortfall}
+            for shortfall, stock_key, producto_id, ubicacion, nivel, threshold in entries
+        ]
+
+    def stats(self):
+        return {
+            'skus_below_threshold': len(self._low),
+            'default_threshold': self.default_threshold,
+            'hysteresis': self.hysteresis,
+            'warnings_emitted': self._warnings,
+            'resolved_emitted': self._resolved,
+        }
@@ -0,0 +1,253 @@
+"""
+Archivo de Transacciones del Simulador de Inventario
+====================================================
+
+Almacenamiento frío para las transacciones que salen del conjunto caliente en
+memoria (ver INVENTORY_RETENTION_CONFIG):
+
+- Segmentos de solo-anexado con bloques comprimidos (zlib) de muchas
+  transacciones cada uno; el bloque es la unidad de escritura y de lectura
+- Índice por segmento: arreglo ordenado de entradas de ancho fijo
+  (hash64 del id, offset del bloque, posición en el bloque) que se consulta con
+  búsqueda binaria sobre mmap, sin cargarlo en memoria
+- El segmento activo mantiene su índice en un dict acotado por el tamaño del
+  segmento; al sellarse se escribe su archivo .idx
+
+La memoria usada es independiente de la cantidad de transacciones archivadas.
+"""
+
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+# Cabecera de cada bloque: longitud del payload comprimido, crc32, registros
+_BLOCK_HEADER = struct.Struct('<III')
+
+# Entrada del índice: hash64 del id, offset del bloque, posición en el bloque
+_INDEX_ENTRY = struct.Struct('<QQI')
+
+SEGMENT_PATTERN = 'transactions-*.seg'
+
+
+def _id_hash(transaction_id):
+    return int.from_bytes(hashlib.blake2b(transaction_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class TransactionArchive:
+    """Segmentos comprimidos de transacciones con índice en disco"""
+
+    def __init__(self, directory, segment_max_bytes=64 * 1024 * 1024, compression_level=6):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+
+        self._segment_file = None
+        self._segment_number = 0
+        self._active_index = {}        # hash -> [(offset, posición), ...] del segmento activo
+        self._sealed = []              # [(número, ruta del segmento, ruta del índice)] del más nuevo al más viejo
+        self._block_cache = (None, None, None)
+
+        self._archived_records = 0
+        self._raw_bytes = 0
+        self._compressed_bytes = 0
+        self._lookups = 0
+        self._hits = 0
+        self._opened = False
+
+    # -------------------------------------------------------------------------
+    # Apertura (diferida hasta el primer uso para no crear directorios vacíos)
+    # -------------------------------------------------------------------------
+
+    def _segment_paths(self, number):
+        base = os.path.join(self.directory, f'transactions-{number:06d}')
+        return base + '.seg', base + '.idx'
+
+    def _open(self):
+        if self._opened:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._sealed = []
+        self._active_index = {}
+        self._archived_records = 0
+        self._compressed_bytes = 0
+
+        numbers = sorted(int(os.path.basename(path)[13:19])
+                         for path in glob.glob(os.path.join(self.directory, SEGMENT_PATTERN)))
+        active = None
+        for number in numbers:
+            segment_path, index_path = self._segment_paths(number)
+            if os.path.exists(index_path):
+                self._sealed.insert(0, (number, segment_path, index_path))
+                self._archived_records += os.path.getsize(index_path) // _INDEX_ENTRY.size
+                self._compressed_bytes += os.path.getsize(segment_path)
+            else:
+                active = number
+
+        self._segment_number = active if active is not None else (numbers[-1] + 1 if numbers else 1)
+        segment_path, _ = self._segment_paths(self._segment_number)
+        if active is not None:
+            self._recover_active_segment(segment_path)
+        self._segment_file = open(segment_path, 'ab')
+        self._opened = True
+
+    def _recover_active_segment(self, segment_path):
+        """Reconstruye el índice del segmento activo y descarta un bloque final incompleto"""
+        offset = 0
+        with open(segment_path, 'rb') as f:
+            data = f.read()
+        while offset + _BLOCK_HEADER.size <= len(data):
+            length, crc, count = _BLOCK_HEADER.unpack_from(data, offset)
+            payload = data[offset + _BLOCK_HEADER.size:offset + _BLOCK_HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            lines = zlib.decompress(payload).split(b'\n')
+            for position, line in enumerate(lines):
+                self._active_index.setdefault(_id_hash(json.loads(line)['id']), []).append((offset, position))
+            self._archived_records += count
+            self._compressed_bytes += _BLOCK_HEADER.size + length
+            offset += _BLOCK_HEADER.size + length
+        if offset < len(data):
+            with open(segment_path, 'r+b') as f:
+                f.truncate(offset)
+
+    # -------------------------------------------------------------------------
+    # Escritura
+    # -------------------------------------------------------------------------
+
+    def append(self, transactions):
+        """Archiva un lote de transacciones (dicts crudos) como un bloque comprimido"""
+        if not transactions:
+            return
+        lines = [json.dumps(transaction, separators=(',', ':')).encode('utf-8') for transaction in transactions]
+        raw = b'\n'.join(lines)
+        payload = zlib.compress(raw, self.compression_level)
+
+        with self._lock:
+            self._open()
+            offset = self._segment_file.tell()
+            self._segment_file.write(_BLOCK_HEADER.pack(len(payload), zlib.crc32(payload), len(lines)))
+            self._segment_file.write(payload)
+            self._segment_file.flush()
+
+            for position, transaction in enumerate(transactions):
+                self._active_index.setdefault(_id_hash(transaction['id']), []).append((offset, position))
+            self._archived_records += len(lines)
+            self._raw_bytes += len(raw)
+            self._compressed_bytes += _BLOCK_HEADER.size + len(payload)
+
+            if self._segment_file.tell() >= self.segment_max_bytes:
+                self._seal_active_segment()
+
+    def _seal_active_segment(self):
+        """Escribe el índice ordenado del segmento activo y abre uno nuevo"""
+        os.fsync(self._segment_file.fileno())
+        self._segment_file.close()
+        segment_path, index_path = self._segment_paths(self._segment_number)
+
+        entries = sorted((hash_value, offset, position)
+                         for hash_value, locations in self._active_index.items()
+                         for offset, position in locations)
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for entry in entries:
+                f.write(_INDEX_ENTRY.pack(*entry))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, index_path)
+
+        self._sealed.insert(0, (self._segment_number, segment_path, index_path))
+        self._active_index = {}
+        self._segment_number += 1
+        self._segment_file = open(self._segment_paths(self._segment_number)[0], 'ab')
+
+    # -------------------------------------------------------------------------
+    # Lectura
+    # -------------------------------------------------------------------------
+
+    def get(self, transaction_id):
+        """Busca una transacción archivada (la versión más reciente). None si no existe"""
+        if not self._opened and not os.path.isdir(self.directory):
+            return None
+        hash_value = _id_hash(transaction_id)
+
+        with self._lock:
+            self._open()
+            self._lookups += 1
+            segment_path = self._segment_paths(self._segment_number)[0]
+            for offset, position in reversed(self._active_index.get(hash_value, ())):
+                transaction = self._read(self._segment_number, segment_path, offset, position)
+                if transaction['id'] == transaction_id:
+                    self._hits += 1
+                    return transaction
+
+            for number, segment_path, index_path in self._sealed:
+                for offset, position in self._search_index(index_path, hash_value):
+                    transaction = self._read(number, segment_path, offset, position)
+                    if transaction['id'] == transaction_id:
+                        self._hits += 1
+                        return transaction
+        return None
+
+    @staticmethod
+    def _search_index(index_path, hash_value):
+        """Entradas del índice con ese hash, de la más reciente a la más antigua"""
+        size = os.path.getsize(index_path)
+        if size == 0:
+            return []
+        with open(index_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            low, high = 0, size // _INDEX_ENTRY.size
+            while low < high:
+                middle = (low + high) // 2
+                if _INDEX_ENTRY.unpack_from(mapped, middle * _INDEX_ENTRY.size)[0] < hash_value:
+                    low = middle + 1
+                else:
+                    high = middle
+            matches = []
+            while low * _INDEX_ENTRY.size < size:
+                entry_hash, offset, position = _INDEX_ENTRY.unpack_from(mapped, low * _INDEX_ENTRY.size)
+                if entry_hash != hash_value:
+                    break
+                matches.append((offset, position))
+                low += 1
+        return reversed(matches)
+
+    def _read(self, number, segment_path, offset, position):
+        cached_number, cached_offset, lines = self._block_cache
+        if cached_number != number or cached_offset != offset:
+            if number == self._segment_number:
+                self._segment_file.flush()
+            with open(segment_path, 'rb') as f:
+                f.seek(offset)
+                length, _, _ = _BLOCK_HEADER.unpack(f.read(_BLOCK_HEADER.size))
+                lines = zlib.decompress(f.read(length)).split(b'\n')
+            self._block_cache = (number, offset, lines)
+        return json.loads(lines[position])
+
+    # -------------------------------------------------------------------------
+    # Administración
+    # -------------------------------------------------------------------------
+
+    def close(self):
+        with self._lock:
+            if self._segment_file:
+                self._segment_file.flush()
+                os.fsync(self._segment_file.fileno())
+                self._segment_file.close()
+                self._segment_file = None
+                self._opened = False
+
+    def stats(self):
+        return {
+            'archived_records': self._archived_records,
+            'segments': len(self._sealed) + (1 if self._opened else 0),
+            'bytes_on_disk': self._compressed_bytes,
+            'compression_ratio': round(self._raw_bytes / self._compressed_bytes, 2) if self._raw_bytes else None,
+            'lookups': self._lookups,
+            'lookup_hits': self._hits,
+        }
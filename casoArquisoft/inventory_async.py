@@ -0,0 +1,864 @@
+"""
+Endpoints Asíncronos (ASGI) del Servicio de Inventario
+======================================================
+
+Versión async de los endpoints de transacciones, estado y salud del servicio
+MySQL (inventory_microservice.py) para servirse con casoArquisoft/asgi.py:
+
+    uvicorn casoArquisoft.asgi:application --workers 4
+
+Bajo WSGI cada petición ocupa un hilo mientras espera a MySQL; aquí la espera
+(red, locks, pool) es un await, así que un solo proceso atiende miles de
+peticiones concurrentes con un puñado de hilos.
+
+- AsyncConnectionPool: pool de conexiones async con overflow, espera acotada
+  (PoolTimeoutError) y pre-ping de conexiones ociosas
+- Drivers: MySQL con aiomysql (opcional, como orjson) y SQLite para
+  desarrollo y tests. SQLite no tiene protocolo de red: cada conexión usa un
+  hilo dedicado para no bloquear el loop
+- AsyncInventoryService: mismas reglas y columnas que InventoryService
+  (en MySQL el mismo lote de escritura, stock_write_batch: stock, transacción,
+  outbox y alertas de stock bajo en una transacción de BD; contador
+  pendientes, listado paginado por clave), reintentos con RetryPolicy.run_async
+
+Conexiones y primitivas asyncio pertenecen a un event loop: hay un servicio
+(y un pool) por loop, ver get_async_service().
+"""
+
+import asyncio
+import functools
+import json
+import os
+import sqlite3
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from django.http import HttpResponseNotAllowed, StreamingHttpResponse
+
+from inventory_alerts import LOW_STOCK_RESOLVED, LOW_STOCK_WARNING, LowStockDetector
+from inventory_config import (
+    ASR_CONFIG, INVENTORY_ASYNC_CONFIG, INVENTORY_DATABASE_CONFIG, INVENTORY_RETRY_CONFIG,
+    INVENTORY_STATUS_CONFIG, LOW_STOCK_CONFIG
+)
+from inventory_ids import new_id
+from inventory_json import JsonResponse, aiter_json_listing, timed_endpoint
+from inventory_operations import available_stock, stock_delta, stock_write_batch
+from inventory_pool import PoolTimeoutError
+from inventory_retry import CommitOutcomeUnknown, RetryPolicy
+
+try:
+    import aiomysql
+    from pymysql.constants import CLIENT
+except ImportError:  # aiomysql es opcional: sin él solo está disponible el driver SQLite
+    aiomysql = None
+
+
+# =============================================================================
+# DRIVERS
+# =============================================================================
+
+# Esquema equivalente al de setup_inventory_simple.py para el driver SQLite
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS productos_inventario (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    producto_id TEXT NOT NULL,
+    ubicacion TEXT NOT NULL,
+    cantidad INTEGER NOT NULL DEFAULT 0,
+    cantidad_reservada INTEGER NOT NULL DEFAULT 0,
+    pendientes INTEGER NOT NULL DEFAULT 0,
+    fecha_creacion TEXT,
+    fecha_actualizacion TEXT,
+    UNIQUE (producto_id, ubicacion)
+);
+CREATE INDEX IF NOT EXISTS idx_ubicacion ON productos_inventario (ubicacion);
+CREATE TABLE IF NOT EXISTS transacciones_inventario (
+    id TEXT PRIMARY KEY,
+    producto_id TEXT NOT NULL,
+    tipo_operacion TEXT NOT NULL,
+    cantidad INTEGER NOT NULL,
+    cantidad_anterior INTEGER,
+    cantidad_nueva INTEGER,
+    ubicacion TEXT NOT NULL,
+    operario_id TEXT NOT NULL,
+    timestamp TEXT,
+    estado TEXT NOT NULL DEFAULT 'PROCESANDO',
+    observaciones TEXT,
+    fecha_actualizacion TEXT
+);
+CREATE TABLE IF NOT EXISTS alertas_stock_bajo (
+    producto_id TEXT NOT NULL,
+    ubicacion TEXT NOT NULL,
+    nivel INTEGER NOT NULL,
+    umbral INTEGER NOT NULL,
+    creada TEXT NOT NULL,
+    PRIMARY KEY (producto_id, ubicacion)
+);
+CREATE TABLE IF NOT EXISTS outbox_inventario (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    evento_id TEXT NOT NULL UNIQUE,
+    tipo_evento TEXT NOT NULL,
+    datos TEXT NOT NULL,
+    creado TEXT NOT NULL,
+    entregado TEXT
+);
+"""
+
+
+def _sqlite_param(value):
+    return value.isoformat(' ') if isinstance(value, datetime) else value
+
+
+class SQLiteAsyncConnection:
+    """Conexión SQLite con interfaz async; las llamadas corren en el hilo de la conexión"""
+
+    for_update = ''  # BEGIN IMMEDIATE ya toma el lock de escritura
+    insert_ignore = 'INSERT OR IGNORE'
+
+    def __init__(self, connection, executor, latency_ms=0):
+        self._connection = connection
+        self._executor = executor
+        # Latencia de red simulada por viaje (benchmark_inventory_asgi.py)
+        self.latency_ms = latency_ms
+
+    async def _call(self, function, *args):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _run(self, query, params):
+        cursor = self._connection.execute(query.replace('%s', '?'), [_sqlite_param(value) for value in params])
+        rows = [dict(row) for row in cursor.fetchall()] if cursor.description else None
+        return rows, cursor.rowcount
+
+    async def fetchall(self, query, params=()):
+        rows, _ = await self._call(self._run, query, params)
+        return rows
+
+    async def fetchone(self, query, params=()):
+        rows = await self.fetchall(query, params)
+        return rows[0] if rows else None
+
+    async def execute(self, query, params=()):
+        _, rowcount = await self._call(self._run, query, params)
+        return rowcount
+
+    async def begin(self):
+        await self.execute('BEGIN IMMEDIATE')
+
+    async def commit(self):
+        await self._call(self._connection.commit)
+
+    async def rollback(self):
+        await self._call(self._connection.rollback)
+
+    async def ping(self):
+        await self.fetchone('SELECT 1')
+
+    async def close(self):
+        try:
+            await self._call(self._connection.close)
+        finally:
+            self._executor.shutdown(wait=False)
+
+
+async def connect_sqlite(path, latency_ms=0, busy_timeout_ms=5000):
+    """Abre una conexión SQLite (creando el esquema si falta)"""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inventory-sqlite')
+
+    def open_connection():
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None: autocommit salvo dentro de BEGIN ... COMMIT explícitos
+        connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute(f'PRAGMA busy_timeout = {int(busy_timeout_ms)}')
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.executescript(SQLITE_SCHEMA)
+        return connection
+
+    try:
+        connection = await asyncio.get_running_loop().run_in_executor(executor, open_connection)
+    except BaseException:
+        executor.shutdown(wait=False)
+        raise
+    return SQLiteAsyncConnection(connection, executor, latency_ms)
+
+
+class MySQLAsyncConnection:
+    """Conexión aiomysql con la misma interfaz que SQLiteAsyncConnection"""
+
+    for_update = ' FOR UPDATE'
+    insert_ignore = 'INSERT IGNORE'
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    @staticmethod
+    def _with_errno(error):
+        # PyMySQL no expone errno como mysql.connector: RetryPolicy.classify lo necesita
+        if error.args and isinstance(error.args[0], int):
+            error.errno = error.args[0]
+        return error
+
+    async def _run(self, query, params):
+        try:
+            async with self._connection.cursor(aiomysql.DictCursor) as cursor:
+                rowcount = await cursor.execute(query, params or None)
+                rows = list(await cursor.fetchall()) if cursor.description else None
+                return rows, rowcount
+        except aiomysql.Error as error:
+            raise self._with_errno(error)
+
+    async def execute_batch(self, query, params):
+        """Lote multi-sentencia en un viaje; retorna la fila del último SELECT (ver InventoryService._execute_batch)"""
+        try:
+            async with self._connection.cursor() as cursor:
+                await cursor.execute(query, params)
+                outcome = None
+                while True:
+                    if cursor.description:
+                        outcome = await cursor.fetchone()  # Cada resultado debe consumirse
+                    if not await cursor.nextset():
+                        return outcome
+        except aiomysql.Error as error:
+            raise self._with_errno(error)
+
+    async def fetchall(self, query, params=()):
+        rows, _ = await self._run(query, params)
+        return rows
+
+    async def fetchone(self, query, params=()):
+        rows = await self.fetchall(query, params)
+        return rows[0] if rows else None
+
+    async def execute(self, query, params=()):
+        _, rowcount = await self._run(query, params)
+        return rowcount
+
+    async def begin(self):
+        await self._connection.begin()
+
+    async def commit(self):
+        await self._connection.commit()
+
+    async def rollback(self):
+        await self._connection.rollback()
+
+    async def ping(self):
+        await self._connection.ping(reconnect=False)
+
+    async def close(self):
+        self._connection.close()
+
+
+async def connect_mysql(config=INVENTORY_DATABASE_CONFIG):
+    if aiomysql is None:
+        raise ImportError("INVENTORY_ASYNC_DRIVER=mysql requiere aiomysql (pip install aiomysql)")
+    connection = await aiomysql.connect(
+        host=config['HOST'],
+        port=int(config['PORT']),
+        db=config['NAME'],
+        user=config['USER'],
+        password=config['PASSWORD'],
+        charset='utf8mb4',
+        autocommit=True,  # Las escrituras abren su transacción con begin() o START TRANSACTION
+        client_flag=CLIENT.MULTI_STATEMENTS  # Lote de escritura de stock_write_batch en un viaje
+    )
+    return MySQLAsyncConnection(connection)
+
+
+# =============================================================================
+# POOL ASÍNCRONO
+# =============================================================================
+
+class AsyncConnectionPool:
+    """Pool async con overflow, espera acotada y pre-ping (ver ElasticConnectionPool)"""
+
+    def __init__(self, connect, pool_size=50, max_overflow=50, pool_timeout=1.0, pre_ping_idle_seconds=5):
+        self.connect = connect  # Corrutina que abre una conexión
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pre_ping_idle_seconds = pre_ping_idle_seconds
+        self._idle = deque()     # (conexión, ociosa desde)
+        self._waiting = deque()  # Futures de las peticiones en espera, en orden de llegada
+        self._open = 0
+        self._waiters = 0
+        self._stats = {'checkouts': 0, 'timeouts': 0, 'opened': 0, 'discarded': 0,
+                       'ping_failures': 0, 'max_in_use': 0, 'max_waiters': 0}
+
+    @property
+    def max_connections(self):
+        return self.pool_size + self.max_overflow
+
+    async def acquire(self):
+        """
+        Conexión ociosa, nueva o liberada dentro de pool_timeout (esperando sin hilo).
+        Las que se liberan pasan directo al primer waiter (FIFO): una petición recién
+        llegada no puede adelantarse a las que ya esperan
+        """
+        if self._idle:
+            entry = self._idle.pop()
+        elif self._open < self.max_connections:
+            self._open += 1
+            entry = None
+        else:
+            entry = await self._wait()
+        self._stats['checkouts'] += 1
+        self._stats['max_in_use'] = max(self._stats['max_in_use'], self._open - len(self._idle))
+
+        try:
+            connection = None
+            if entry is not None:
+                connection, idle_since = entry
+                if time.monotonic() - idle_since > self.pre_ping_idle_seconds:
+                    try:
+                        await connection.ping()
+                    except Exception:
+                        self._stats['ping_failures'] += 1
+                        await self._close_quietly(connection)
+                        connection = None
+            if connection is None:
+                connection = await self.connect()
+                self._stats['opened'] += 1
+        except BaseException:
+            self._free_slot()
+            raise
+        return connection
+
+    async def _wait(self):
+        """Espera una conexión (o el lugar de una descartada, None) hasta pool_timeout"""
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiting.append(waiter)
+        self._waiters += 1
+        self._stats['max_waiters'] = max(self._stats['max_waiters'], self._waiters)
+        timer = loop.call_later(self.pool_timeout, self._expire, waiter)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Se canceló justo cuando recibía una conexión: devolverla al pool
+                entry = waiter.result()
+                if entry is None:
+                    self._free_slot()
+                elif self._put_back(*entry):
+                    loop.create_task(self._close_quietly(entry[0]))
+            raise
+        finally:
+            timer.cancel()
+            self._waiters -= 1
+
+    def _expire(self, waiter):
+        if not waiter.done():
+            self._stats['timeouts'] += 1
+            waiter.set_exception(PoolTimeoutError(
+                f"Sin conexiones libres tras {self.pool_timeout}s ({self.max_connections} en uso)"
+            ))
+
+    def _next_waiter(self):
+        while self._waiting:
+            waiter = self._waiting.popleft()
+            if not waiter.done():  # Las vencidas o canceladas se saltan
+                return waiter
+        return None
+
+    def _free_slot(self):
+        """Una conexión dejó de existir: su lugar pasa al primer waiter o queda libre"""
+        waiter = self._next_waiter()
+        if waiter is not None:
+            waiter.set_result(None)  # El waiter abrirá una conexión nueva
+        else:
+            self._open -= 1
+
+    def _put_back(self, connection, idle_since):
+        """Entrega la conexión al primer waiter o la deja ociosa. Retorna True si hay que cerrarla"""
+        waiter = self._next_waiter()
+        if waiter is not None:
+            waiter.set_result((connection, idle_since))
+            return False
+        if len(self._idle) >= self.pool_size:
+            self._open -= 1  # Overflow: no se conserva más allá de pool_size ociosas
+            return True
+        self._idle.append((connection, idle_since))
+        return False
+
+    async def release(self, connection, discard=False):
+        """Devuelve la conexión; con discard (estado incierto) la cierra y libera su lugar"""
+        if discard:
+            self._stats['discarded'] += 1
+            self._free_slot()
+            await self._close_quietly(connection)
+        elif self._put_back(connection, time.monotonic()):
+            await self._close_quietly(connection)
+
+    @staticmethod
+    async def _close_quietly(connection):
+        try:
+            await connection.close()
+        except Exception:
+            pass
+
+    async def warm(self, count=None):
+        """Abre hasta `count` conexiones (por defecto pool_size) y las deja ociosas"""
+        connections = []
+        try:
+            for _ in range(min(self.pool_size if count is None else count, self.max_connections)):
+                connections.append(await self.acquire())
+        finally:
+            for connection in connections:
+                await self.release(connection)
+        return len(connections)
+
+    async def close(self):
+        """Cierra las conexiones ociosas (las prestadas se cierran al devolverse)"""
+        idle, self._idle = list(self._idle), deque()
+        self._open -= len(idle)
+        for connection, _ in idle:
+            await self._close_quietly(connection)
+
+    def stats(self):
+        idle = len(self._idle)
+        stats = dict(self._stats)
+        stats.update({
+            'pool_size': self.pool_size,
+            'max_overflow': self.max_overflow,
+            'open': self._open,
+            'in_use': self._open - idle,
+            'idle': idle,
+            'waiters': self._waiters,
+        })
+        return stats
+
+
+# =============================================================================
+# SERVICIO ASÍNCRONO
+# =============================================================================
+
+class AsyncInventoryService:
+    """InventoryService sobre AsyncConnectionPool"""
+
+    STATUS_COLUMNS = ("producto_id, ubicacion, cantidad, cantidad_reservada, fecha_actualizacion, "
+                      "pendientes AS transacciones_pendientes")
+
+    def __init__(self, pool, retry_policy, driver):
+        self.pool = pool
+        self.retry_policy = retry_policy
+        self.driver = driver
+        # Solo umbrales: el estado de alerta vive en alertas_stock_bajo (ver stock_write_batch)
+        self.low_stock = LowStockDetector(
+            LOW_STOCK_CONFIG['default_threshold'],
+            hysteresis=LOW_STOCK_CONFIG['hysteresis'],
+            thresholds=LOW_STOCK_CONFIG['thresholds']
+        )
+
+    @asynccontextmanager
+    async def _unit_of_work(self):
+        """Conexión del pool; si algo falla se revierte y, si no se puede, se descarta"""
+        connection = await self.pool.acquire()
+        broken = False
+        try:
+            yield connection
+        except asyncio.CancelledError:
+            broken = True  # Cancelada a mitad de un viaje: el protocolo quedó en estado incierto
+            raise
+        except BaseException:
+            try:
+                await connection.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            await self.pool.release(connection, discard=broken)
+
+    @staticmethod
+    async def _commit(connection):
+        """Commit que no se reintenta si falla: la transacción pudo haberse aplicado"""
+        try:
+            await connection.commit()
+        except Exception as e:
+            raise CommitOutcomeUnknown(str(e)) from e
+
+    async def create_transaction(self, transaction_data):
+        """
+        Crear nueva transacción de inventario
+        POST /api/inventory/async/transactions/
+        """
+        start_time = time.time()
+
+        required_fields = ['producto_id', 'tipo_operacion', 'cantidad', 'ubicacion', 'operario_id']
+        for field in required_fields:
+            if field not in transaction_data:
+                return {'error': f'Campo requerido: {field}', 'status': 400}
+
+        cantidad = transaction_data['cantidad']
+        delta = stock_delta(transaction_data['tipo_operacion'], cantidad)
+        if delta is None:
+            return {'error': 'Tipo de operación inválido', 'status': 400}
+
+        producto_id = transaction_data['producto_id']
+        ubicacion = transaction_data['ubicacion']
+        transaction_id = new_id('TXN_')
+        params = {
+            'transaction_id': transaction_id,
+            'event_id': new_id('EVT_'),
+            'alert_event_id': new_id('EVT_'),
+            'producto_id': producto_id,
+            'tipo_operacion': transaction_data['tipo_operacion'],
+            'cantidad': cantidad,
+            'delta': delta,
+            'ubicacion': ubicacion,
+            'operario_id': transaction_data['operario_id'],
+            'umbral': self.low_stock.threshold_for(f"{producto_id}_{ubicacion}", producto_id),
+            'histeresis': self.low_stock.hysteresis
+        }
+
+        async def write_transaction():
+            """Unidad de trabajo reintentable: retorna la cantidad anterior o None sin stock"""
+            timestamp = datetime.now()
+            params.update(timestamp=timestamp, timestamp_iso=timestamp.isoformat())
+            async with self._unit_of_work() as connection:
+                if self.driver == 'mysql':
+                    # El mismo lote que InventoryService.create_inventory_transaction
+                    aplicada, cantidad_anterior = await connection.execute_batch(stock_write_batch(delta), params)
+                else:
+                    aplicada, cantidad_anterior = await self._write_sqlite(connection, params)
+                if not aplicada:
+                    await connection.rollback()
+                    return None
+                await self._commit(connection)
+                return cantidad_anterior
+
+        try:
+            current_stock = await self.retry_policy.run_async(write_transaction)
+        except Exception as e:
+            return {'error': str(e), 'status': 500}
+        if current_stock is None:
+            return {'error': 'Stock insuficiente', 'status': 400}
+
+        return {
+            'transaction_id': transaction_id,
+            'status': 'COMPLETADA',
+            'cantidad_anterior': current_stock,
+            'cantidad_nueva': current_stock + delta,
+            'response_time_ms': (time.time() - start_time) * 1000,
+            'status_code': 201
+        }
+
+    @staticmethod
+    async def _write_sqlite(connection, params):
+        """
+        stock_write_batch en SQLite, que no tiene lotes multi-sentencia ni variables de
+        sesión: las mismas sentencias, una por viaje, dentro de BEGIN IMMEDIATE.
+        Retorna (aplicada, cantidad_anterior)
+        """
+        await connection.begin()
+        producto_id, ubicacion, delta = params['producto_id'], params['ubicacion'], params['delta']
+        if delta > 0:
+            # Las entradas crean la SKU si no existe
+            await connection.execute(
+                f"{connection.insert_ignore} INTO productos_inventario "
+                "(producto_id, ubicacion, cantidad, fecha_creacion) VALUES (%s, %s, 0, %s)",
+                (producto_id, ubicacion, params['timestamp'])
+            )
+        # UPDATE condicional y relativo: las salidas no aplican si el disponible no alcanza
+        stock = await connection.fetchone(
+            "UPDATE productos_inventario SET cantidad = cantidad + %s, fecha_actualizacion = %s "
+            "WHERE producto_id = %s AND ubicacion = %s AND (%s > 0 OR cantidad - cantidad_reservada >= %s) "
+            "RETURNING cantidad, cantidad_reservada",
+            (delta, params['timestamp'], producto_id, ubicacion, delta, params['cantidad'])
+        )
+        if stock is None:
+            return 0, None
+
+        cantidad_anterior = stock['cantidad'] - delta
+        nivel = available_stock(stock['cantidad'], stock['cantidad_reservada'])
+        await connection.execute(
+            "INSERT INTO transacciones_inventario "
+            "(id, producto_id, tipo_operacion, cantidad, cantidad_anterior, cantidad_nueva, "
+            "ubicacion, operario_id, timestamp, estado) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'COMPLETADA')",
+            (params['transaction_id'], producto_id, params['tipo_operacion'], params['cantidad'],
+             cantidad_anterior, stock['cantidad'], ubicacion, params['operario_id'], params['timestamp'])
+        )
+        events = [(params['event_id'], 'INVENTORY_CHANGED', {
+            'transaction_id': params['transaction_id'],
+            'producto_id': producto_id,
+            'tipo_operacion': params['tipo_operacion'],
+            'cantidad_anterior': cantidad_anterior,
+            'cantidad_nueva': stock['cantidad'],
+            'ubicacion': ubicacion,
+            'timestamp': params['timestamp_iso']
+        })]
+
+        umbral, histeresis = params['umbral'], params['histeresis']
+        alert = {'stock_key': f"{producto_id}_{ubicacion}", 'producto_id': producto_id, 'ubicacion': ubicacion,
+                 'nivel': nivel, 'umbral': umbral, 'timestamp': params['timestamp_iso']}
+        if nivel < umbral and await connection.execute(
+                f"{connection.insert_ignore} INTO alertas_stock_bajo (producto_id, ubicacion, nivel, umbral, creada) "
+                "VALUES (%s, %s, %s, %s, %s)", (producto_id, ubicacion, nivel, umbral, params['timestamp'])):
+            events.append((params['alert_event_id'], LOW_STOCK_WARNING, alert))
+        if nivel < umbral + histeresis:
+            await connection.execute(
+                "UPDATE alertas_stock_bajo SET nivel = %s WHERE producto_id = %s AND ubicacion = %s",
+                (nivel, producto_id, ubicacion)
+            )
+        elif await connection.execute(
+                "DELETE FROM alertas_stock_bajo WHERE producto_id = %s AND ubicacion = %s", (producto_id, ubicacion)):
+            events.append((params['alert_event_id'], LOW_STOCK_RESOLVED, alert))
+
+        for event_id, event_type, data in events:
+            await connection.execute(
+                "INSERT INTO outbox_inventario (evento_id, tipo_evento, datos, creado) VALUES (%s, %s, %s, %s)",
+                (event_id, event_type, json.dumps(data), params['timestamp'])
+            )
+        return 1, cantidad_anterior
+
+    async def _fetchall(self, query, params=()):
+        async def read():
+            async with self._unit_of_work() as connection:
+                return await connection.fetchall(query, params)
+        return await self.retry_policy.run_async(read)
+
+    async def get_inventory_status(self, producto_id=None, ubicacion=None, after_id=None, limit=None):
+        """
+        Consultar estado del inventario
+        GET /api/inventory/async/status/
+
+        Mismo contrato que InventoryService.get_inventory_status
+        """
+        start_time = time.time()
+
+        try:
+            if producto_id or ubicacion:
+                conditions = []
+                params = []
+
+                if producto_id:
+                    conditions.append("producto_id = %s")
+                    params.append(producto_id)
+
+                if ubicacion:
+                    conditions.append("ubicacion = %s")
+                    params.append(ubicacion)
+
+                result = await self._fetchall(
+                    f"SELECT {self.STATUS_COLUMNS} FROM productos_inventario "
+                    f"WHERE {' AND '.join(conditions)} ORDER BY fecha_actualizacion DESC",
+                    tuple(params)
+                )
+                page = {}
+            else:
+                result, next_cursor = await self._status_page(after_id or 0, limit)
+                page = {'next_cursor': next_cursor}
+
+            return {
+                'inventory': result,
+                'total_records': len(result),
+                **page,
+                'response_time_ms': (time.time() - start_time) * 1000,
+                'status_code': 200
+            }
+
+        except Exception as e:
+            return {'error': str(e), 'status': 500}
+
+    async def _status_page(self, after_id, limit=None):
+        """Página de SKUs con id > after_id. Retorna (filas, cursor siguiente o None)"""
+        limit = max(1, min(limit or INVENTORY_STATUS_CONFIG['page_size'], INVENTORY_STATUS_CONFIG['max_page_size']))
+        rows = await self._fetchall(
+            f"SELECT id, {self.STATUS_COLUMNS} FROM productos_inventario WHERE id > %s ORDER BY id LIMIT %s",
+            (after_id, limit)
+        )
+        next_cursor = rows[-1]['id'] if len(rows) == limit else None
+        for row in rows:
+            del row['id']
+        return rows, next_cursor
+
+    async def iter_inventory_status(self, page_size=None, first_page=None):
+        """
+        Todo el inventario, página a página: nunca hay más de una página en memoria.
+        first_page: (filas, cursor) ya leídos con _status_page(0, page_size)
+        """
+        rows, after_id = first_page or await self._status_page(0, page_size)
+        for row in rows:
+            yield row
+        while after_id is not None:
+            rows, after_id = await self._status_page(after_id, page_size)
+            for row in rows:
+                yield row
+
+    async def health(self):
+        async with self._unit_of_work() as connection:
+            await connection.ping()
+        return {
+            'driver': self.driver,
+            'pool_status': self.pool.stats(),
+            'retries': self.retry_policy.stats(),
+            'low_stock': {
+                'skus_below_threshold': (await self._fetchall(
+                    "SELECT COUNT(*) AS abiertas FROM alertas_stock_bajo"))[0]['abiertas'],
+                'default_threshold': self.low_stock.default_threshold,
+                'hysteresis': self.low_stock.hysteresis,
+            },
+            'database_test': 'OK'
+        }
+
+    async def close(self):
+        await self.pool.close()
+
+
+def create_async_pool(config=INVENTORY_ASYNC_CONFIG):
+    if config['driver'] == 'sqlite':
+        connect = functools.partial(connect_sqlite, config['sqlite_path'])
+    elif config['driver'] == 'mysql':
+        connect = connect_mysql
+    else:
+        raise ValueError(f"Driver async de inventario desconocido: {config['driver']}")
+    return AsyncConnectionPool(
+        connect,
+        pool_size=config['pool_size'],
+        max_overflow=config['max_overflow'],
+        pool_timeout=config['pool_timeout'],
+        pre_ping_idle_seconds=config['pre_ping_idle_seconds']
+    )
+
+
+# Reintentos compartidos por los servicios de todos los loops (contadores únicos en health)
+retry_policy = RetryPolicy(
+    max_attempts=INVENTORY_RETRY_CONFIG['max_attempts'],
+    base_delay_ms=INVENTORY_RETRY_CONFIG['base_delay_ms'],
+    max_delay_ms=INVENTORY_RETRY_CONFIG['max_delay_ms'],
+    budget_ms=ASR_CONFIG['max_response_time_ms']
+)
+
+_services = weakref.WeakKeyDictionary()  # event loop -> AsyncInventoryService
+
+
+def get_async_service():
+    """Servicio del event loop en curso (se crea en el primer uso, sin abrir conexiones)"""
+    loop = asyncio.get_running_loop()
+    service = _services.get(loop)
+    if service is None:
+        service = _services[loop] = AsyncInventoryService(
+            create_async_pool(), retry_policy, INVENTORY_ASYNC_CONFIG['driver']
+        )
+    return service
+
+
+async def handle_lifespan(receive, send):
+    """Protocolo lifespan de ASGI: pre-calienta el pool al arrancar y lo cierra al terminar"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if INVENTORY_ASYNC_CONFIG['prewarm']:
+                try:
+                    await get_async_service().pool.warm()
+                except Exception as e:
+                    # La base de datos puede no estar lista: el pool abrirá conexiones bajo demanda
+                    print(f"No se pudo pre-calentar el pool async de inventario: {e}")
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            service = _services.get(asyncio.get_running_loop())
+            if service is not None:
+                await service.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+# =============================================================================
+# VISTAS ASYNC
+# =============================================================================
+# Los decoradores csrf_exempt y require_http_methods de Django 4.2 envuelven la
+# vista en una función síncrona; en las vistas async el método se valida a mano
+# y la exención de CSRF se marca con el atributo que lee el middleware.
+
+@timed_endpoint('async_transactions')
+async def create_inventory_transaction(request):
+    """
+    POST /api/inventory/async/transactions/
+    Crear nueva transacción de inventario (recepción, picking, devolución)
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+    try:
+        result = await get_async_service().create_transaction(data)
+        status_code = result.get('status_code', result.get('status', 500))
+        return JsonResponse(result, status=status_code)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+create_inventory_transaction.csrf_exempt = True
+
+
+@timed_endpoint('async_status')
+async def get_inventory_status(request):
+    """
+    GET /api/inventory/async/status/
+    Consultar estado actual del inventario (sin filtros se transmite por páginas)
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    try:
+        producto_id = request.GET.get('producto_id')
+        ubicacion = request.GET.get('ubicacion')
+        cursor = request.GET.get('cursor')
+        limit = request.GET.get('limit')
+        service = get_async_service()
+
+        if not (producto_id or ubicacion or cursor or limit):
+            # La primera página se lee antes de responder: un fallo de la BD todavía es un 500
+            start_time = time.time()
+            first_page = await service._status_page(0)
+            return StreamingHttpResponse(
+                aiter_json_listing('inventory', service.iter_inventory_status(first_page=first_page), start_time),
+                content_type='application/json'
+            )
+
+        try:
+            after_id = int(cursor) if cursor else None
+            limit = int(limit) if limit else None
+            if (after_id is not None and after_id < 0) or (limit is not None and limit <= 0):
+                raise ValueError
+        except ValueError:
+            return JsonResponse({'error': 'cursor debe ser un entero >= 0 y limit un entero positivo'}, status=400)
+
+        result = await service.get_inventory_status(producto_id, ubicacion, after_id=after_id, limit=limit)
+        return JsonResponse(result, status=result.get('status_code', 500))
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@timed_endpoint('async_health')
+async def inventory_health_check(request):
+    """
+    GET /api/inventory/async/health/
+    Health check del servicio async (conexión, pool y reintentos)
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    try:
+        metrics = await get_async_service().health()
+        return JsonResponse({
+            'service': 'inventory-microservice-async',
+            'status': 'healthy',
+            'timestamp': datetime.now().isoformat(),
+            'metrics': metrics
+        })
+    except Exception as e:
+        return JsonResponse({
+            'service': 'inventory-microservice-async',
+            'status': 'unhealthy',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }, status=503)
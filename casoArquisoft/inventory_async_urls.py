@@ -0,0 +1,18 @@
+"""
+URLs Asíncronas del Microservicio de Gestión de Inventario
+==========================================================
+
+Servidas sin bloquear hilos con casoArquisoft/asgi.py (ver inventory_async.py).
+integrate_inventory.py las incluye en casoArquisoft/urls.py junto a inventory_urls
+"""
+
+from django.urls import path
+import inventory_async as async_views
+
+app_name = 'inventory_async'
+
+urlpatterns = [
+    path('transactions/', async_views.create_inventory_transaction, name='transactions'),
+    path('status/', async_views.get_inventory_status, name='status'),
+    path('health/', async_views.inventory_health_check, name='health_check'),
+]
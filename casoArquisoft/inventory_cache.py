@@ -0,0 +1,179 @@
+"""
+Caché de Lecturas del Microservicio de Inventario
+=================================================
+
+Caché en memoria compartido por los hilos de InventoryService, con una
+política por clase de dato (ver INVENTORY_CACHE_CONFIG):
+
+- TTL por clase ('stock', 'transactions', ...); cada clase guarda sus
+  entradas en orden de escritura, así las vencidas están siempre al principio
+  y el barrido activo cuesta O(vencidas)
+- Tamaño máximo: al superarlo se descartan las entradas más antiguas
+- Invalidación por generación: una lectura que empezó antes de una escritura
+  no puede volver a poblar el caché con el valor que la escritura dejó obsoleto
+- Métricas de aciertos, fallos, vencimientos y repoblaciones descartadas
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+
+class PolicyCache:
+    """Caché thread-safe con TTL por clase de dato"""
+
+    def __init__(self, ttls, default_ttl=300, max_entries=10000, sweep_interval_seconds=5, clock=time.monotonic):
+        self.ttls = dict(ttls)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # clase -> OrderedDict clave -> (vence, escrito, valor), en orden de escritura
+        self._entries = {}
+        self._size = 0
+        self._next_sweep = clock() + sweep_interval_seconds
+        # Generaciones: cada lectura a la BD toma un token creciente; una invalidación
+        # marca la clave con el token vigente. Solo se guarda lo leído después de la marca
+        self._tokens = itertools.count(1)
+        self._last_token = 0
+        self._invalidated = {}
+        self._loads_in_flight = {}
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0,
+                       'invalidations': 0, 'stale_discarded': 0, 'hit_age_ms_total': 0.0}
+
+    def _ttl(self, data_class):
+        return self.ttls.get(data_class, self.default_ttl)
+
+    def get(self, data_class, key):
+        """Retorna (encontrado, valor)"""
+        now = self._clock()
+        with self._lock:
+            self._maybe_sweep(now)
+            entries = self._entries.get(data_class)
+            entry = entries.get(key) if entries else None
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            expires_at, written_at, value = entry
+            if expires_at <= now:
+                del entries[key]
+                self._size -= 1
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return False, None
+            self._stats['hits'] += 1
+            self._stats['hit_age_ms_total'] += (now - written_at) * 1000
+            return True, value
+
+    def begin_load(self, key):
+        """Token para una lectura a la BD que luego se guardará con set(..., token)"""
+        with self._lock:
+            token = next(self._tokens)
+            self._last_token = token
+            self._loads_in_flight[token] = key
+            return token
+
+    def set(self, data_class, key, value, token=None):
+        """
+        Guarda un valor. Con el token de begin_load solo se guarda si la clave no
+        se invalidó mientras se leía. Retorna True si se guardó.
+        """
+        now = self._clock()
+        with self._lock:
+            if token is not None:
+                self._loads_in_flight.pop(token, None)
+                if self._invalidated.get((data_class, key), 0) >= token:
+                    self._stats['stale_discarded'] += 1
+                    return False
+
+            entries = self._entries.setdefault(data_class, OrderedDict())
+            if key in entries:
+                del entries[key]
+                self._size -= 1
+            entries[key] = (now + self._ttl(data_class), now, value)
+            self._size += 1
+
+            while self._size > self.max_entries:
+                self._evict_oldest()
+            self._maybe_sweep(now)
+            return True
+
+    def get_or_load(self, data_class, key, loader):
+        """Valor en caché o el que retorne loader() (guardado si no quedó obsoleto)"""
+        found, value = self.get(data_class, key)
+        if found:
+            return value
+        token = self.begin_load(key)
+        try:
+            value = loader()
+        except BaseException:
+            with self._lock:
+                self._loads_in_flight.pop(token, None)
+            raise
+        self.set(data_class, key, value, token)
+        return value
+
+    def invalidate(self, data_class, key):
+        """Elimina la clave y descarta las lecturas de ella que sigan en curso"""
+        with self._lock:
+            entries = self._entries.get(data_class)
+            if entries and entries.pop(key, None) is not None:
+                self._size -= 1
+            # Las lecturas con token <= a la marca empezaron antes de esta escritura
+            self._invalidated[(data_class, key)] = self._last_token
+            self._stats['invalidations'] += 1
+
+    def _evict_oldest(self):
+        # La entrada más antigua entre las primeras de cada clase
+        oldest_class = min((entries for entries in self._entries.values() if entries),
+                           key=lambda entries: next(iter(entries.values()))[1])
+        oldest_class.popitem(last=False)
+        self._size -= 1
+        self._stats['evicted'] += 1
+
+    def _maybe_sweep(self, now):
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+    def _sweep(self, now):
+        """Barrido activo: vencidas de cada clase y marcas de invalidación ya inútiles"""
+        self._next_sweep = now + self.sweep_interval_seconds
+        for entries in self._entries.values():
+            while entries:
+                expires_at = next(iter(entries.values()))[0]
+                if expires_at > now:
+                    break
+                entries.popitem(last=False)
+                self._size -= 1
+                self._stats['expired'] += 1
+
+        # Una marca solo afecta a lecturas con token menor o igual: si ya no hay
+        # ninguna de esas en curso, la marca puede borrarse
+        oldest_load = min(self._loads_in_flight, default=self._last_token + 1)
+        self._invalidated = {cache_key: mark for cache_key, mark in self._invalidated.items()
+                             if mark >= oldest_load}
+
+    def sweep(self):
+        with self._lock:
+            self._sweep(self._clock())
+
+    def __len__(self):
+        return self._size
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            entries_per_class = {data_class: len(entries) for data_class, entries in self._entries.items()}
+        lookups = stats['hits'] + stats['misses']
+        hit_age_ms_total = stats.pop('hit_age_ms_total')
+        stats.update({
+            'entries': self._size,
+            'max_entries': self.max_entries,
+            'entries_per_class': entries_per_class,
+            'ttl_seconds': dict(self.ttls),
+            'hit_ratio': round(stats['hits'] / lookups, 4) if lookups else None,
+            'avg_hit_age_ms': round(hit_age_ms_total / stats['hits'], 3) if stats['hits'] else None,
+        })
+        return stats
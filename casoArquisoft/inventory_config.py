@@ -3,7 +3,9 @@
 # Para integración con Django principal y cumplimiento del ASR
 # =============================================================================
 
+import itertools
 import os
+import threading
 
 # =============================================================================
 # CONFIGURACIÓN DE BASE DE DATOS PARA MICROSERVICIO
@@ -36,6 +38,63 @@ INVENTORY_CONNECTION_POOL = {
     'pool_reset_session': True,
     'pool_pre_ping': True,  # Verificar conexiones antes de usar
     'max_overflow': 10,     # Conexiones adicionales si es necesario
+    'pool_timeout': 1.0,    # Espera máxima (segundos) por una conexión libre
+    'pre_ping_idle_seconds': 5,  # Solo se verifican las que estuvieron ociosas más tiempo
+    'pool_recycle': 3600,   # Reabrir conexiones con más de 1 hora de vida
+    # El pool se crea en el primer uso; con prewarm el arranque del worker abre pool_size conexiones
+    'prewarm': os.getenv('INVENTORY_POOL_PREWARM', 'false').lower() == 'true',
+}
+
+# Réplicas de lectura (ver InventoryDatabaseRouter). Cada host de
+# INVENTORY_DB_REPLICA_HOSTS ("host1:3306,host2") es un alias inventory_replica_N
+_REPLICA_HOSTS = [host.strip() for host in os.getenv('INVENTORY_DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+
+INVENTORY_REPLICA_DATABASES = {
+    f'inventory_replica_{index}': {
+        **INVENTORY_DATABASE_CONFIG,
+        'HOST': host.split(':')[0],
+        'PORT': host.split(':')[1] if ':' in host else INVENTORY_DATABASE_CONFIG['PORT'],
+        'TEST': {'MIRROR': 'inventory'},  # En tests las réplicas apuntan al primario
+    }
+    for index, host in enumerate(_REPLICA_HOSTS, start=1)
+}
+
+INVENTORY_REPLICA_CONFIG = {
+    'primary': 'inventory',
+    'replicas': list(INVENTORY_REPLICA_DATABASES),
+    # 'round_robin' o 'least_latency' (latencia medida por ReplicaMonitor)
+    'selection': os.getenv('INVENTORY_REPLICA_SELECTION', 'round_robin'),
+    'max_lag_seconds': 2,            # Réplicas más atrasadas se saltan (todas: primario)
+    'read_your_writes_seconds': 5,   # Pin al primario tras escribir; cubre el lag aceptado
+    'health_check_interval_seconds': 5,
+}
+
+# Pool asíncrono de los endpoints ASGI (ver inventory_async.py). Las conexiones en
+# espera no ocupan hilos, así que el pool puede ser más grande que el de WSGI
+INVENTORY_ASYNC_CONFIG = {
+    # 'mysql' (requiere aiomysql) o 'sqlite' (desarrollo y tests)
+    'driver': os.getenv('INVENTORY_ASYNC_DRIVER', 'mysql'),
+    'sqlite_path': os.getenv('INVENTORY_ASYNC_SQLITE_PATH', 'data/inventory_async.sqlite3'),
+    'pool_size': 50,
+    'max_overflow': 50,
+    'pool_timeout': 1.0,
+    'pre_ping_idle_seconds': 5,
+    'prewarm': os.getenv('INVENTORY_POOL_PREWARM', 'false').lower() == 'true',
+}
+
+# Reintentos de unidades de trabajo (ver inventory_retry.py). El presupuesto total
+# de latencia es ASR_CONFIG['max_response_time_ms']
+INVENTORY_RETRY_CONFIG = {
+    'max_attempts': 4,      # Intentos totales por unidad de trabajo
+    'base_delay_ms': 5,     # Backoff exponencial: 5, 10, 20... ms (con full jitter)
+    'max_delay_ms': 100,
+}
+
+# Listado de estado sin filtros (GET /api/inventory/status/): paginado por clave
+# (id > cursor) y transmitido por páginas de page_size filas
+INVENTORY_STATUS_CONFIG = {
+    'page_size': 500,
+    'max_page_size': 5000,
 }
 
 # =============================================================================
@@ -47,6 +106,90 @@ INVENTORY_CACHE_CONFIG = {
     'stock_timeout': 60,     # 1 minuto para datos de stock
     'transactions_timeout': 1800,  # 30 minutos para transacciones
     'key_prefix': 'inventory_',
+    'max_entries': 10000,          # Tope del caché en proceso de InventoryService
+    'sweep_interval_seconds': 5,   # Barrido activo de entradas vencidas
+}
+
+# =============================================================================
+# CONFIGURACIÓN DE PERSISTENCIA DEL SIMULADOR (WAL + SNAPSHOTS)
+# =============================================================================
+
+INVENTORY_PERSISTENCE_CONFIG = {
+    'enabled': os.getenv('INVENTORY_WAL_ENABLED', 'false').lower() == 'true',
+    'directory': os.getenv('INVENTORY_WAL_DIR', 'data/inventory_wal'),
+    'group_commit_ms': 5,             # Un fsync por grupo de escrituras cada 5ms
+    'sync_commit': False,             # True: cada mutación espera el fsync de su grupo
+    'snapshot_every_records': 50000,  # Snapshot compacto cada N registros de WAL
+}
+
+# =============================================================================
+# CONFIGURACIÓN DEL ALMACENAMIENTO COMPARTIDO DEL SIMULADOR
+# =============================================================================
+
+INVENTORY_STORAGE_CONFIG = {
+    # 'memory': estado por proceso; 'sqlite': estado compartido entre workers de gunicorn
+    'backend': os.getenv('INVENTORY_STORAGE_BACKEND', 'memory'),
+    # Motor por defecto de inventory_engines.create_engine: 'memory', 'sqlite' o 'mysql'
+    # (el servicio real). Sin definir, el mismo backend del simulador
+    'engine': os.getenv('INVENTORY_ENGINE'),
+    'sqlite_path': os.getenv('INVENTORY_SQLITE_PATH', 'data/inventory_simulator.sqlite3'),
+    'busy_timeout_ms': 5000,  # Espera máxima por el lock de escritura entre procesos
+    'change_log_events': 10000,  # Eventos conservados en la tabla cambios (flujo y versiones, SQLite)
+}
+
+# =============================================================================
+# CONFIGURACIÓN DE RETENCIÓN DE TRANSACCIONES DEL SIMULADOR
+# =============================================================================
+
+INVENTORY_RETENTION_CONFIG = {
+    'enabled': os.getenv('INVENTORY_RETENTION_ENABLED', 'true').lower() == 'true',
+    'archive_directory': os.getenv('INVENTORY_ARCHIVE_DIR', 'data/inventory_archive'),
+    'max_hot_transactions': 200000,        # Transacciones máximas en memoria
+    'max_age_seconds': 6 * 3600,           # Antigüedad máxima en memoria (6 horas)
+    'eviction_batch': 1000,                # Transacciones por bloque comprimido
+    'eviction_interval_seconds': 1.0,      # Cada cuánto archiva el hilo de fondo
+    'segment_max_bytes': 64 * 1024 * 1024, # Tamaño de cada segmento de archivo
+    'compression_level': 6,
+}
+
+# =============================================================================
+# CONFIGURACIÓN DE IDEMPOTENCIA DE ESCRITURAS
+# =============================================================================
+
+INVENTORY_IDEMPOTENCY_CONFIG = {
+    'header': 'Idempotency-Key',
+    'ttl_seconds': 3600,            # Tiempo que se recuerda cada clave (1 hora)
+    'max_entries': 100000,          # Claves máximas guardadas
+    'in_flight_wait_seconds': 0.5,  # Espera máxima por la petición original (ASR)
+}
+
+# =============================================================================
+# CONFIGURACIÓN DE RESERVAS DE STOCK
+# =============================================================================
+
+INVENTORY_RESERVATION_CONFIG = {
+    'default_ttl_seconds': 300,  # Vencimiento por defecto de una reserva (5 minutos)
+    'max_ttl_seconds': 3600,     # Vencimiento máximo permitido
+}
+
+# =============================================================================
+# CONFIGURACIÓN DE SERIALIZACIÓN JSON DE LAS RESPUESTAS
+# =============================================================================
+
+INVENTORY_JSON_CONFIG = {
+    # 'auto': orjson si está instalado, si no json estándar; 'orjson' o 'stdlib' para forzar
+    'encoder': os.getenv('INVENTORY_JSON_ENCODER', 'auto'),
+}
+
+# =============================================================================
+# CONFIGURACIÓN DEL FLUJO DE CAMBIOS (SSE / LONG-POLL)
+# =============================================================================
+
+INVENTORY_STREAM_CONFIG = {
+    'buffer_events': 10000,     # Eventos recientes disponibles para reanudar
+    'heartbeat_seconds': 15,    # Comentario keep-alive si no hay eventos
+    'max_stream_seconds': 300,  # Se cierra el stream y el cliente reconecta con Last-Event-ID
+    'max_poll_seconds': 25,     # Espera máxima de un long-poll
 }
 
 # =============================================================================
@@ -88,12 +231,48 @@ EVENT_CONFIG = {
         'INVENTORY_UPDATED', 
         'INVENTORY_DELETED',
         'STOCK_LOW_WARNING',
+        'STOCK_LOW_RESOLVED',
         'TRANSACTION_COMPLETED',
         'TRANSACTION_FAILED',
     ],
     'publish_to_queue': False,  # Cambiar a True para RabbitMQ/SQS
 }
 
+# Publicador asíncrono de eventos del servicio MySQL (ver inventory_publisher.py)
+EVENT_PUBLISHER_CONFIG = {
+    'queue_size': 10000,        # Capacidad de inventory_queue
+    'workers': 2,               # Hilos que escriben lotes en outbox_inventario
+    'batch_size': 200,          # Eventos máximos por executemany
+    'flush_interval_ms': 50,    # Espera máxima para completar un lote
+    'put_timeout_ms': 50,       # Con la cola llena, espera antes de escribir en línea
+    'shutdown_timeout_seconds': 10,
+}
+
+# Outbox transaccional y relay hacia el broker (ver inventory_outbox.py).
+# Con EVENT_CONFIG['publish_to_queue'] el servicio corre el relay en proceso;
+# si no, se ejecuta aparte con: python inventory_outbox.py
+OUTBOX_CONFIG = {
+    'broker': os.getenv('INVENTORY_EVENT_BROKER', 'file'),  # 'file' | 'socket'
+    'file_path': os.getenv('INVENTORY_EVENT_FILE', 'data/inventory_events.jsonl'),
+    'socket_host': os.getenv('INVENTORY_EVENT_SOCKET_HOST', '127.0.0.1'),
+    'socket_port': int(os.getenv('INVENTORY_EVENT_SOCKET_PORT', '9099')),
+    'batch_size': 500,          # Eventos reclamados por SELECT ... SKIP LOCKED
+    'poll_interval_ms': 200,    # Espera cuando el outbox queda vacío
+    'rate_window_seconds': 60,  # Ventana para eventos/segundo sostenidos
+}
+
+# Umbrales de stock bajo (evaluados en cada mutación, ver inventory_alerts.py)
+LOW_STOCK_CONFIG = {
+    'default_threshold': 20,  # Unidades disponibles mínimas por SKU-ubicación
+    'hysteresis': 5,          # La alerta se resuelve al superar umbral + histéresis
+    'load_on_startup': True,  # Servicio MySQL: abrir al arrancar las alertas de SKUs ya bajo el umbral
+    'thresholds': {
+        # Por producto ('zapatos') o por SKU-ubicación ('zapatos_A1-B1')
+        'zapatos': 30,
+        'mesa': 10,
+    },
+}
+
 # =============================================================================
 # CONFIGURACIÓN DE SEGURIDAD
 # =============================================================================
@@ -179,6 +358,7 @@ def configure_django_for_inventory():
         # Agregar base de datos de inventario a Django
         if hasattr(settings, 'DATABASES'):
             settings.DATABASES['inventory'] = INVENTORY_DATABASE_CONFIG
+            settings.DATABASES.update(INVENTORY_REPLICA_DATABASES)
         
         # Configurar cache para inventario si no existe
         if hasattr(settings, 'CACHES'):
@@ -209,6 +389,7 @@ def configure_django_for_inventory():
         # Configurar middleware para métricas
         inventory_middleware = [
             'corsheaders.middleware.CorsMiddleware',
+            'inventory_replicas.InventoryReadYourWritesMiddleware',
         ]
         
         if hasattr(settings, 'MIDDLEWARE'):
@@ -234,6 +415,7 @@ def get_inventory_urls():
     
     return [
         path('api/inventory/', include('inventory_urls')),
+        path('api/inventory/async/', include('inventory_async_urls')),
         path('health/inventory/', include([
             path('', lambda request: JsonResponse({
                 'status': 'healthy',
@@ -250,24 +432,92 @@ def get_inventory_urls():
 class InventoryDatabaseRouter:
     """
     Router para dirigir consultas de inventario a la base de datos correcta
+
+    Escrituras y migraciones van al primario. Las lecturas van a una réplica
+    (round-robin o la de menor latencia) salvo que la sesión haya escrito hace
+    menos de read_your_writes_seconds o que ninguna réplica tenga un lag
+    aceptable; en ambos casos van al primario (ver inventory_replicas.py)
+
+    Como router de Django solo enruta modelos del ORM con app_label 'inventory'.
+    El microservicio (InventoryService) no usa el ORM: lee con SQL directo y
+    elige el pool de cada lectura con read_alias() de su propia instancia
     """
+    def __init__(self, config=None, monitor=None):
+        from inventory_replicas import ReplicaMonitor
+
+        self.config = config or INVENTORY_REPLICA_CONFIG
+        self.primary = self.config['primary']
+        self.replicas = list(self.config['replicas'])
+        self.monitor = monitor or ReplicaMonitor(interval_seconds=self.config['health_check_interval_seconds'])
+        self._round_robin = itertools.count()
+        self._stats_lock = threading.Lock()
+        self._stats = {'replica_reads': 0, 'pinned_reads': 0, 'lag_fallbacks': 0, 'writes': 0}
+
+    @staticmethod
+    def _is_inventory(model):
+        """Modelos del ORM de la app 'inventory' (las tablas del microservicio no tienen modelo)"""
+        return hasattr(model, '_meta') and model._meta.app_label == 'inventory'
+
+    def _count(self, key):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def read_alias(self):
+        """Alias para la siguiente lectura de inventario"""
+        from inventory_replicas import pinned_to_primary
+
+        if not self.replicas:
+            return self.primary
+        if pinned_to_primary(self.config['read_your_writes_seconds']):
+            self._count('pinned_reads')
+            return self.primary
+        candidates = self.monitor.eligible(self.replicas, self.config['max_lag_seconds'])
+        if not candidates:
+            self._count('lag_fallbacks')
+            return self.primary
+        self._count('replica_reads')
+        if self.config['selection'] == 'least_latency':
+            return min(candidates, key=self.monitor.latency_ms)
+        return candidates[next(self._round_robin) % len(candidates)]
+
     def db_for_read(self, model, **hints):
-        if hasattr(model, '_meta') and model._meta.app_label == 'inventory':
-            return 'inventory'
+        if self._is_inventory(model):
+            return self.read_alias()
         return None
 
     def db_for_write(self, model, **hints):
-        if hasattr(model, '_meta') and model._meta.app_label == 'inventory':
-            return 'inventory'
+        if self._is_inventory(model):
+            from inventory_replicas import mark_write
+
+            mark_write()
+            self._count('writes')
+            return self.primary
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Un objeto leído de una réplica puede relacionarse con uno del primario
+        databases = {self.primary, *self.replicas}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
         return None
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
         if app_label == 'inventory':
-            return db == 'inventory'
-        elif db == 'inventory':
+            return db == self.primary
+        elif db == self.primary or db in self.replicas:
             return False
         return None
 
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            'primary': self.primary,
+            'selection': self.config['selection'],
+            'replicas': self.monitor.stats(),
+        })
+        return stats
+
 def check_asr_compliance(response_time_ms, concurrent_users):
     """
     Verifica si una operación cumple con los ASR definidos
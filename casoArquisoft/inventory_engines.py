@@ -0,0 +1,198 @@
+"""
+Motores de Almacenamiento del Inventario
+========================================
+
+Interfaz común (InventoryEngine) para las operaciones del inventario: crear,
+actualizar y cancelar transacciones, consultar stock e historial. El contrato
+de respuestas es el de InventoryServiceSimulator:
+
+- memory: el simulador sobre un MemoryInventoryBackend propio
+- sqlite: el simulador sobre un SQLiteInventoryBackend propio
+- mysql: adaptador del servicio MySQL real (inventory_microservice.InventoryService).
+  Delega cada operación en el servicio, sin otra ruta de escritura, y traduce
+  sus respuestas al contrato. Conserva las reglas del servicio: una
+  actualización cambia el estado (no la cantidad) y una cancelación crea la
+  transacción de reversión
+
+El motor por defecto es INVENTORY_STORAGE_CONFIG['engine'], o si no el
+backend del simulador en ejecución (INVENTORY_STORAGE_CONFIG['backend']). La
+suite de paridad (tests_inventory.EngineParityTests) y
+benchmark_inventory_engines.py ejecutan las mismas cargas contra cada motor.
+"""
+
+from abc import ABC, abstractmethod
+
+from inventory_config import INVENTORY_STORAGE_CONFIG
+from inventory_microservice_simple import InventoryServiceSimulator
+from inventory_storage import create_backend
+
+ENGINE_NAMES = ('memory', 'sqlite', 'mysql')
+
+
+class InventoryEngine(ABC):
+    """
+    Operaciones de inventario comunes a todos los motores. Cada una retorna un
+    dict con 'success' y, si falla, 'error'
+    """
+
+    name = None
+
+    @abstractmethod
+    def create_stock(self, producto_id, ubicacion, cantidad=0, reservada=0):
+        """Registra el stock inicial de una SKU-ubicación"""
+
+    @abstractmethod
+    def create_transaction(self, producto_id, tipo_operacion, cantidad, ubicacion, operario_id):
+        """Con éxito: transaction_id, stock_anterior y stock_nuevo"""
+
+    @abstractmethod
+    def update_transaction(self, transaction_id, data):
+        """Con éxito: transaction_id"""
+
+    @abstractmethod
+    def cancel_transaction(self, transaction_id, operario_id):
+        """Con éxito: transaction_id y estado_nuevo"""
+
+    @abstractmethod
+    def get_stock_status(self, producto_id, ubicacion=None):
+        """
+        Con ubicación: cantidad, cantidad_reservada y cantidad_disponible. Sin ella:
+        total_cantidad, total_reservada, total_disponible, ubicaciones y detalle_ubicaciones
+        """
+
+    @abstractmethod
+    def get_transaction_history(self, limit=50):
+        """transactions (las últimas `limit`, más recientes primero) y total_count"""
+
+    def close(self):
+        """Libera los recursos del motor"""
+
+
+# =============================================================================
+# MOTORES DEL SIMULADOR (MEMORIA Y SQLITE)
+# =============================================================================
+
+class SimulatorEngine(InventoryEngine):
+    """
+    InventoryServiceSimulator ligado a un backend propio: sus classmethods usan
+    cls.storage, así que basta una subclase con otro backend. Sin el retraso
+    simulado, para que el benchmark mida el almacenamiento.
+    """
+
+    def __init__(self, name, backend):
+        self.name = name
+        self.backend = backend
+        self.simulator = type(f'{name.capitalize()}InventoryEngineSimulator', (InventoryServiceSimulator,), {
+            'storage': backend,
+            'processing_delay_seconds': 0,
+        })
+
+    def create_stock(self, producto_id, ubicacion, cantidad=0, reservada=0):
+        stock_key = f"{producto_id}_{ubicacion}"
+        with self.backend.locked([stock_key]):
+            self.backend.create_stock(stock_key, producto_id, ubicacion, cantidad, reservada)
+
+    def create_transaction(self, producto_id, tipo_operacion, cantidad, ubicacion, operario_id):
+        return self.simulator.create_transaction(producto_id, tipo_operacion, cantidad, ubicacion, operario_id)
+
+    def update_transaction(self, transaction_id, data):
+        return self.simulator.update_transaction(transaction_id, data)
+
+    def cancel_transaction(self, transaction_id, operario_id):
+        return self.simulator.delete_transaction(transaction_id, operario_id)
+
+    def get_stock_status(self, producto_id, ubicacion=None):
+        result = self.simulator.get_stock_status(producto_id, ubicacion)
+        return dict(result, success='error' not in result)
+
+    def get_transaction_history(self, limit=50):
+        return dict(self.simulator.get_transaction_history(limit), success=True)
+
+
+# =============================================================================
+# MOTOR MYSQL (SERVICIO REAL)
+# =============================================================================
+
+class MySQLEngine(InventoryEngine):
+    """Adaptador de InventoryService al contrato de InventoryEngine"""
+
+    name = 'mysql'
+
+    def __init__(self, service=None):
+        if service is None:
+            # Import diferido: inventory_microservice requiere mysql.connector
+            from inventory_microservice import inventory_service as service
+        self.service = service
+
+    @staticmethod
+    def _result(result, **fields):
+        """Respuesta del servicio en el contrato: success, error o los campos dados"""
+        if 'error' in result:
+            return {'success': False, 'error': result['error'],
+                    'processing_time_ms': result.get('response_time_ms')}
+        return {'success': True, **fields, 'processing_time_ms': result.get('response_time_ms')}
+
+    def create_stock(self, producto_id, ubicacion, cantidad=0, reservada=0):
+        self.service.create_product_record(producto_id, ubicacion, cantidad, reservada)
+
+    def create_transaction(self, producto_id, tipo_operacion, cantidad, ubicacion, operario_id):
+        result = self.service.create_inventory_transaction({
+            'producto_id': producto_id, 'tipo_operacion': tipo_operacion, 'cantidad': cantidad,
+            'ubicacion': ubicacion, 'operario_id': operario_id
+        })
+        return self._result(result, transaction_id=result.get('transaction_id'),
+                            stock_anterior=result.get('cantidad_anterior'),
+                            stock_nuevo=result.get('cantidad_nueva'))
+
+    def update_transaction(self, transaction_id, data):
+        result = self.service.update_inventory(transaction_id, data)
+        return self._result(result, transaction_id=transaction_id)
+
+    def cancel_transaction(self, transaction_id, operario_id):
+        result = self.service.cancel_transaction(transaction_id, operario_id)
+        return self._result(result, transaction_id=transaction_id, estado_nuevo=result.get('status'))
+
+    def get_stock_status(self, producto_id, ubicacion=None):
+        result = self.service.get_inventory_status(producto_id, ubicacion)
+        rows = result.get('inventory')
+        if 'error' not in result and not rows:
+            result = {'error': 'Producto no encontrado en la ubicación especificada' if ubicacion
+                      else 'Producto no encontrado', 'response_time_ms': result['response_time_ms']}
+        if 'error' in result:
+            return self._result(result)
+
+        if ubicacion:
+            row = rows[0]
+            return self._result(result, producto_id=producto_id, ubicacion=ubicacion,
+                                cantidad=row['cantidad'], cantidad_reservada=row['cantidad_reservada'],
+                                cantidad_disponible=row['cantidad'] - row['cantidad_reservada'])
+        total_cantidad = sum(row['cantidad'] for row in rows)
+        total_reservada = sum(row['cantidad_reservada'] for row in rows)
+        return self._result(
+            result, producto_id=producto_id, total_cantidad=total_cantidad, total_reservada=total_reservada,
+            total_disponible=total_cantidad - total_reservada, ubicaciones=len(rows),
+            detalle_ubicaciones=[
+                {'producto_id': row['producto_id'], 'ubicacion': row['ubicacion'],
+                 'cantidad': row['cantidad'], 'reservada': row['cantidad_reservada']}
+                for row in rows
+            ]
+        )
+
+    def get_transaction_history(self, limit=50):
+        result = self.service.get_transaction_history(limit)
+        return self._result(result, transactions=result.get('transactions'), total_count=result.get('total_count'))
+
+
+# =============================================================================
+# SELECCIÓN DEL MOTOR
+# =============================================================================
+
+def create_engine(name=None, config=INVENTORY_STORAGE_CONFIG, sqlite_path=None):
+    """Crea el motor `name` (por defecto el configurado en INVENTORY_STORAGE_CONFIG)"""
+    name = name or config['engine'] or config['backend']
+    if name not in ENGINE_NAMES:
+        raise ValueError(f"Motor de inventario desconocido: {name}")
+    if name == 'mysql':
+        return MySQLEngine()
+    config = dict(config, backend=name, sqlite_path=sqlite_path or config['sqlite_path'])
+    return SimulatorEngine(name, create_backend(config, {}, {}))
@@ -0,0 +1,241 @@
+"""
+Flujo de Cambios del Simulador de Inventario
+============================================
+
+Canal push para el dashboard: cada cambio de stock o de transacción se
+publica como un evento compacto con un número de secuencia creciente.
+
+- Buffer circular de tamaño fijo: publicar es O(1) y leer "desde el evento N"
+  cuesta O(eventos nuevos), sin recorrer el historial
+- Cada evento se serializa una sola vez al publicarse, no por cliente
+- Si un cliente pide un id que ya salió del buffer recibe `reset` y debe
+  recargar el estado completo una vez
+
+El id del último evento es además la versión del inventario: cada SKU-ubicación
+guarda la versión de su último cambio en un OrderedDict ordenado por versión,
+así "qué cambió desde la versión N" se responde recorriendo solo los cambios.
+
+ChangeFeed vive en el proceso, como el backend en memoria. Con el backend
+SQLite los eventos y las versiones están en la tabla `cambios` de la base
+compartida (escrita en la misma transacción que cada cambio) y
+SQLiteChangeFeed los lee: todos los workers ven la misma secuencia y epoch.
+
+Los streams SSE mantienen ocupado un hilo del worker mientras están abiertos:
+en gunicorn usar workers gthread (--threads) para atender varios paneles.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from inventory_json import dumps
+
+
+def stock_event(stock_key, stock):
+    """Datos del evento 'stock' (mismo formato en ambos flujos)"""
+    return {
+        'stock_key': stock_key,
+        'producto_id': stock['producto_id'],
+        'ubicacion': stock['ubicacion'],
+        'cantidad': stock['cantidad'],
+        'reservada': stock['reservada']
+    }
+
+
+def transaction_event(transaction):
+    """Datos del evento 'transaction' (mismo formato en ambos flujos)"""
+    return {
+        'id': transaction['id'],
+        'producto_id': transaction['producto_id'],
+        'tipo_operacion': transaction['tipo_operacion'],
+        'cantidad': transaction['cantidad'],
+        'ubicacion': transaction['ubicacion'],
+        'operario_id': transaction['operario_id'],
+        'estado': transaction['estado'],
+        'timestamp': transaction['timestamp']
+    }
+
+
+class ChangeFeed:
+    """Buffer circular de eventos con espera por nuevos eventos"""
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self._ring = [None] * capacity
+        self._last_id = 0
+        self._condition = threading.Condition()
+        # Identifica esta secuencia de versiones: cambia si el proceso reinicia
+        self.epoch = uuid.uuid4().hex[:12]
+        self._stock_versions = OrderedDict()
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, event_type, data, stock_key=None):
+        """Publica un evento y despierta a los clientes en espera. Retorna su id"""
+        payload = dumps(data)
+        with self._condition:
+            self._last_id += 1
+            self._ring[self._last_id % self.capacity] = (self._last_id, event_type, payload)
+            if stock_key is not None:
+                # Misma sección crítica que el id: el orden del dict sigue siempre al de las versiones
+                self._stock_versions[stock_key] = self._last_id
+                self._stock_versions.move_to_end(stock_key)
+            self._condition.notify_all()
+            return self._last_id
+
+    def stock_changed(self, stock_key, stock):
+        return self.publish('stock', stock_event(stock_key, stock), stock_key=stock_key)
+
+    def transaction_changed(self, transaction):
+        return self.publish('transaction', transaction_event(transaction))
+
+    def since(self, last_id):
+        """
+        Eventos con id mayor a last_id: retorna (eventos, reset). reset es True
+        si last_id ya no está en el buffer (se devuelven los que sí están).
+        """
+        with self._condition:
+            newest = self._last_id
+            oldest = max(newest - self.capacity + 1, 1)
+            reset = last_id < oldest - 1 or last_id > newest
+            start = oldest if reset else last_id + 1
+            return [self._ring[event_id % self.capacity] for event_id in range(start, newest + 1)], reset
+
+    def covers(self, version):
+        """True si stock_changes_since(version) puede responder (si no, hace falta una sincronización completa)"""
+        return 0 < version <= self._last_id
+
+    def stock_changes_since(self, version):
+        """
+        SKU-ubicaciones modificadas después de `version`, de la más antigua a
+        la más reciente: [(stock_key, versión)]. Costo O(cambios).
+        """
+        changes = []
+        with self._condition:
+            for stock_key in reversed(self._stock_versions):
+                stock_version = self._stock_versions[stock_key]
+                if stock_version <= version:
+                    break
+                changes.append((stock_key, stock_version))
+            current = self._last_id
+        changes.reverse()
+        return changes, current
+
+    def wait(self, last_id, timeout):
+        """Espera hasta que haya eventos posteriores a last_id. True si los hay"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._last_id != last_id, timeout)
+
+    def stats(self):
+        return {
+            'epoch': self.epoch,
+            'last_event_id': self._last_id,
+            'tracked_stock_keys': len(self._stock_versions),
+            'buffer_capacity': self.capacity,
+            'buffered_events': min(self._last_id, self.capacity),
+        }
+
+
+class SQLiteChangeFeed:
+    """
+    Misma interfaz que ChangeFeed sobre la tabla `cambios` del
+    SQLiteInventoryBackend. Las versiones las asigna la base (AUTOINCREMENT,
+    en orden de COMMIT porque SQLite serializa los escritores) y el epoch está
+    guardado en ella, así que no cambia entre workers ni al reiniciar.
+
+    Se registra como listener solo para despertar al instante a los clientes
+    de este worker; los cambios de otros workers se detectan consultando la
+    base cada poll_interval_ms.
+    """
+
+    def __init__(self, backend, poll_interval_ms=100):
+        self.backend = backend
+        self.capacity = backend.change_log_events
+        self.poll_interval = poll_interval_ms / 1000.0
+        self._condition = threading.Condition()
+        self.epoch = backend.execute("SELECT valor FROM meta WHERE clave = 'epoch'").fetchone()[0]
+
+    @property
+    def last_id(self):
+        row = self.backend.execute("SELECT seq FROM sqlite_sequence WHERE name = 'cambios'").fetchone()
+        return row[0] if row else 0
+
+    def _oldest_id(self):
+        row = self.backend.execute("SELECT MIN(version) FROM cambios").fetchone()
+        return row[0] or 1
+
+    def publish(self, event_type, data, stock_key=None):
+        with self.backend.locked([]):
+            return self.backend.log_change(event_type, data, stock_key)
+
+    def _wake(self, *args):
+        with self._condition:
+            self._condition.notify_all()
+
+    stock_changed = _wake
+    transaction_changed = _wake
+
+    def since(self, last_id):
+        """Eventos con id mayor a last_id: retorna (eventos, reset), como ChangeFeed.since"""
+        # Lecturas de una misma transacción: ven un único snapshot de la base
+        with self.backend.snapshot():
+            newest = self.last_id
+            oldest = self._oldest_id()
+            reset = last_id < oldest - 1 or last_id > newest
+            start = oldest if reset else last_id + 1
+            rows = self.backend.execute(
+                "SELECT version, tipo, datos FROM cambios WHERE version >= ? AND version <= ? ORDER BY version",
+                (start, newest)
+            ).fetchall()
+        return [(version, tipo, bytes(datos)) for version, tipo, datos in rows], reset
+
+    def covers(self, version):
+        with self.backend.snapshot():
+            return self._oldest_id() - 1 <= version <= self.last_id and version > 0
+
+    def stock_changes_since(self, version):
+        """SKU-ubicaciones modificadas después de `version`: ([(stock_key, versión)], versión actual)"""
+        with self.backend.snapshot():
+            rows = self.backend.execute(
+                "SELECT stock_key, MAX(version) FROM cambios WHERE version > ? AND stock_key IS NOT NULL "
+                "GROUP BY stock_key ORDER BY 2",
+                (version,)
+            ).fetchall()
+            current = self.last_id
+        return [(stock_key, stock_version) for stock_key, stock_version in rows], current
+
+    def wait(self, last_id, timeout):
+        """Espera hasta que haya eventos posteriores a last_id. True si los hay"""
+        deadline = time.monotonic() + timeout
+        while self.last_id == last_id:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            with self._condition:
+                self._condition.wait(min(self.poll_interval, remaining))
+        return True
+
+    def stats(self):
+        with self.backend.snapshot():
+            last_id = self.last_id
+            buffered = self.backend.execute("SELECT COUNT(*) FROM cambios").fetchone()[0]
+        return {
+            'backend': 'sqlite',
+            'epoch': self.epoch,
+            'last_event_id': last_id,
+            'buffer_capacity': self.capacity,
+            'buffered_events': buffered,
+        }
+
+
+def create_change_feed(backend, capacity=10000):
+    """Flujo de cambios acorde al backend del simulador (ver docstring del módulo)"""
+    if backend.name == 'sqlite':
+        feed = SQLiteChangeFeed(backend)
+    else:
+        feed = ChangeFeed(capacity)
+    backend.listeners.append(feed)
+    return feed
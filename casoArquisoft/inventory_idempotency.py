@@ -0,0 +1,259 @@
+"""
+Idempotencia de Escrituras del Microservicio de Inventario
+==========================================================
+
+Los escáneres y JMeter reintentan las escrituras ante timeouts. Con el header
+`Idempotency-Key` el servidor guarda la respuesta de la primera ejecución y la
+devuelve tal cual en los reintentos, sin volver a tocar el stock.
+
+- Almacén acotado por cantidad de claves y por TTL (ver INVENTORY_IDEMPOTENCY_CONFIG)
+- Un reintento que llega mientras la original sigue en curso espera su
+  resultado en lugar de ejecutarse en paralelo
+- Reusar una clave con otro cuerpo o en otro endpoint responde 422
+- Las respuestas 5xx no se guardan, para que el cliente pueda reintentar
+
+El almacén sigue al backend del simulador (create_idempotency_store): con el
+backend en memoria vive en el proceso, igual que el stock; con SQLite las claves
+se guardan en la base compartida, en la misma transacción que el cambio de
+stock, así un reintento que llega a otro worker también se reconoce.
+"""
+
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+
+from django.http import HttpResponse
+
+from inventory_config import INVENTORY_IDEMPOTENCY_CONFIG
+from inventory_json import JsonResponse
+
+
+class _Entry:
+    __slots__ = ('fingerprint', 'expires_at', 'status', 'content', 'done')
+
+    def __init__(self, fingerprint, expires_at):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.status = None
+        self.content = None
+        self.done = threading.Event()
+
+
+class IdempotencyStore:
+    """Mapa clave -> respuesta guardada en memoria del proceso, acotado por tamaño y TTL"""
+
+    def __init__(self, max_entries=100000, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._replays = 0
+        self._conflicts = 0
+        self._evicted = 0
+
+    def _purge(self, now):
+        # Todas las claves tienen el mismo TTL: las vencidas están al principio
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+            entry.done.set()
+            self._evicted += 1
+
+    def transaction(self):
+        """Contexto que envuelve begin(), la petición y finish() (aquí no hace falta ninguno)"""
+        return nullcontext()
+
+    def begin(self, key, fingerprint):
+        """
+        Registra el inicio de una petición. Retorna (entry, is_new): si is_new
+        es False la entry pertenece a una ejecución anterior o en curso.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                return entry, False
+            entry = _Entry(fingerprint, now + self.ttl_seconds)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._purge(now)
+            return entry, True
+
+    def finish(self, key, entry, status, content):
+        """Guarda la respuesta (o libera la clave si fue un error del servidor)"""
+        with self._lock:
+            if status >= 500:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            else:
+                entry.status = status
+                entry.content = content
+        entry.done.set()
+
+    def mark_replay(self):
+        with self._lock:
+            self._replays += 1
+
+    def mark_conflict(self):
+        with self._lock:
+            self._conflicts += 1
+
+    def stats(self):
+        return {
+            'backend': 'memory',
+            'keys': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'replays': self._replays,
+            'conflicts': self._conflicts,
+            'evicted': self._evicted,
+        }
+
+
+class SQLiteIdempotencyStore:
+    """
+    Claves en la base del SQLiteInventoryBackend, compartidas por los workers.
+
+    transaction() abre la transacción BEGIN IMMEDIATE del backend y la petición
+    se ejecuta dentro: la clave, el cambio de stock y la respuesta se confirman
+    juntos (o ninguno). Un reintento en otro worker espera el lock de escritura
+    y luego encuentra la respuesta ya confirmada, nunca una ejecución a medias.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS idempotencia (
+        orden INTEGER PRIMARY KEY AUTOINCREMENT,
+        clave TEXT NOT NULL UNIQUE,
+        huella BLOB NOT NULL,
+        expira REAL NOT NULL,
+        estado INTEGER,
+        contenido BLOB
+    );
+    CREATE INDEX IF NOT EXISTS idx_idempotencia_expira ON idempotencia (expira);
+    """
+
+    def __init__(self, backend, max_entries=100000, ttl_seconds=3600):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # Contadores de este worker
+        self._replays = 0
+        self._conflicts = 0
+        backend.executescript(self.SCHEMA)
+
+    def transaction(self):
+        return self.backend.locked([])
+
+    def begin(self, key, fingerprint):
+        """Igual que IdempotencyStore.begin; llamar dentro de transaction()"""
+        now = time.time()
+        row = self.backend.execute(
+            "SELECT huella, expira, estado, contenido FROM idempotencia WHERE clave = ?", (key,)
+        ).fetchone()
+        if row is not None and row[1] > now:
+            entry = _Entry(row[0], row[1])
+            entry.status, entry.content = row[2], row[3]
+            entry.done.set()
+            return entry, False
+
+        self.backend.execute("DELETE FROM idempotencia WHERE expira <= ?", (now,))
+        cursor = self.backend.execute(
+            "INSERT OR REPLACE INTO idempotencia (clave, huella, expira) VALUES (?, ?, ?)",
+            (key, fingerprint, now + self.ttl_seconds)
+        )
+        # Acotar por cantidad: `orden` crece con cada alta, se descartan las más viejas
+        self.backend.execute("DELETE FROM idempotencia WHERE orden <= ?", (cursor.lastrowid - self.max_entries,))
+        return _Entry(fingerprint, now + self.ttl_seconds), True
+
+    def finish(self, key, entry, status, content):
+        if status >= 500:
+            self.backend.execute("DELETE FROM idempotencia WHERE clave = ?", (key,))
+        else:
+            self.backend.execute("UPDATE idempotencia SET estado = ?, contenido = ? WHERE clave = ?",
+                                 (status, content, key))
+            entry.status = status
+            entry.content = content
+        entry.done.set()
+
+    def mark_replay(self):
+        with self._lock:
+            self._replays += 1
+
+    def mark_conflict(self):
+        with self._lock:
+            self._conflicts += 1
+
+    def stats(self):
+        return {
+            'backend': 'sqlite',
+            'keys': self.backend.execute("SELECT COUNT(*) FROM idempotencia").fetchone()[0],
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'replays': self._replays,
+            'conflicts': self._conflicts,
+        }
+
+
+def create_idempotency_store(backend, config=INVENTORY_IDEMPOTENCY_CONFIG):
+    """Almacén de claves acorde al backend del simulador (ver docstring del módulo)"""
+    if backend.name == 'sqlite':
+        return SQLiteIdempotencyStore(backend, max_entries=config['max_entries'],
+                                      ttl_seconds=config['ttl_seconds'])
+    return IdempotencyStore(max_entries=config['max_entries'], ttl_seconds=config['ttl_seconds'])
+
+
+def idempotent(store):
+    """
+    Decorador para los métodos de escritura de una View, con las claves en
+    `store`. Sin el header Idempotency-Key la petición se procesa normalmente.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(INVENTORY_IDEMPOTENCY_CONFIG['header'])
+            if not key:
+                return view_method(self, request, *args, **kwargs)
+
+            fingerprint = hashlib.sha256(
+                request.method.encode() + b' ' + request.path.encode() + b'\n' + request.body
+            ).digest()
+            with store.transaction():
+                entry, is_new = store.begin(key, fingerprint)
+
+                if not is_new:
+                    if entry.fingerprint != fingerprint:
+                        store.mark_conflict()
+                        return JsonResponse({
+                            'status': 'error',
+                            'error': 'Idempotency-Key ya usada con otra petición'
+                        }, status=422)
+
+                    if not entry.done.wait(INVENTORY_IDEMPOTENCY_CONFIG['in_flight_wait_seconds']) \
+                            or entry.content is None:
+                        store.mark_conflict()
+                        return JsonResponse({
+                            'status': 'error',
+                            'error': 'La petición original con esta Idempotency-Key sigue en proceso'
+                        }, status=409)
+
+                    store.mark_replay()
+                    response = HttpResponse(entry.content, status=entry.status, content_type='application/json')
+                    response['Idempotent-Replayed'] = 'true'
+                    return response
+
+                try:
+                    response = view_method(self, request, *args, **kwargs)
+                except BaseException:
+                    store.finish(key, entry, 500, None)
+                    raise
+                store.finish(key, entry, response.status_code, response.content)
+                return response
+
+        return wrapper
+    return decorator
@@ -0,0 +1,184 @@
+"""
+Serialización JSON Rápida del Microservicio de Inventario
+=========================================================
+
+Reemplazo de django.http.JsonResponse para las vistas de inventario:
+
+- Codificador intercambiable: orjson si está instalado (o configurado), con
+  fallback automático al json de la librería estándar
+- Mide el tiempo de serialización de cada respuesta y lo acumula por
+  endpoint (ver timed_endpoint); el tiempo también viaja en el header
+  X-Serialization-Time-Ms
+
+Uso en vistas basadas en clase:
+    @method_decorator(timed_endpoint('transactions'), name='dispatch')
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import threading
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+from inventory_config import INVENTORY_JSON_CONFIG
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+
+# =============================================================================
+# CODIFICADORES
+# =============================================================================
+
+def _stdlib_dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _orjson_default(value):
+    # Tipos que orjson no conoce (Decimal, UUID ya soportado, etc.): mismo criterio que Django
+    return DjangoJSONEncoder().default(value)
+
+def _orjson_dumps(data):
+    try:
+        return orjson.dumps(data, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        # Enteros fuera de 64 bits u otros casos no soportados
+        return _stdlib_dumps(data)
+
+def _select_encoder(name):
+    if name == 'orjson' and orjson is None:
+        raise ImportError("INVENTORY_JSON_ENCODER=orjson pero orjson no está instalado")
+    if name in ('orjson', 'auto') and orjson is not None:
+        return 'orjson', _orjson_dumps
+    if name in ('stdlib', 'auto'):
+        return 'stdlib', _stdlib_dumps
+    raise ValueError(f"Codificador JSON desconocido: {name}")
+
+ENCODER_NAME, dumps = _select_encoder(INVENTORY_JSON_CONFIG['encoder'])
+
+
+# =============================================================================
+# TIEMPOS DE SERIALIZACIÓN POR ENDPOINT
+# =============================================================================
+
+_current_endpoint = contextvars.ContextVar('inventory_endpoint', default='otros')
+_stats_lock = threading.Lock()
+SERIALIZATION_STATS = {}
+
+def _record(endpoint, elapsed_ms, size):
+    with _stats_lock:
+        stats = SERIALIZATION_STATS.get(endpoint)
+        if stats is None:
+            stats = SERIALIZATION_STATS[endpoint] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'total_bytes': 0}
+        stats['count'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        stats['total_bytes'] += size
+
+def serialization_stats():
+    """Resumen por endpoint para MetricsView/health"""
+    with _stats_lock:
+        endpoints = {
+            endpoint: {
+                'count': stats['count'],
+                'avg_ms': round(stats['total_ms'] / stats['count'], 3),
+                'max_ms': round(stats['max_ms'], 3),
+                'avg_bytes': stats['total_bytes'] // stats['count'],
+            }
+            for endpoint, stats in SERIALIZATION_STATS.items()
+        }
+    return {'encoder': ENCODER_NAME, 'endpoints': endpoints}
+
+def timed_endpoint(name):
+    """Atribuye la serialización de las respuestas de la vista al endpoint `name`"""
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            # Vistas async (ver inventory_async): el wrapper también debe ser corrutina
+            @functools.wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                token = _current_endpoint.set(f"{name} {request.method}")
+                try:
+                    return await view_func(request, *args, **kwargs)
+                finally:
+                    _current_endpoint.reset(token)
+            return async_wrapper
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            token = _current_endpoint.set(f"{name} {request.method}")
+            try:
+                return view_func(request, *args, **kwargs)
+            finally:
+                _current_endpoint.reset(token)
+        return wrapper
+    return decorator
+
+
+# =============================================================================
+# RESPUESTA
+# =============================================================================
+
+class JsonResponse(HttpResponse):
+    """Compatible con django.http.JsonResponse (data, safe, status...)"""
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError('In order to allow non-dict objects to be serialized set the safe parameter to False.')
+        kwargs.setdefault('content_type', 'application/json')
+
+        start = time.perf_counter()
+        content = dumps(data)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        super().__init__(content=content, **kwargs)
+        self['X-Serialization-Time-Ms'] = f"{elapsed_ms:.3f}"
+        _record(_current_endpoint.get(), elapsed_ms, len(content))
+
+
+def _listing_end(count, start_time, error=None):
+    """
+    Cierre del listado: total, tiempo de respuesta y status_code como las respuestas
+    no transmitidas. Si una página falla a mitad del cuerpo (el status HTTP ya se
+    envió) el cierre lleva "error" y status_code 500
+    """
+    end = {'total_records': count, 'response_time_ms': (time.time() - start_time) * 1000}
+    end.update({'error': str(error), 'status_code': 500} if error is not None else {'status_code': 200})
+    return b'],' + dumps(end)[1:]
+
+
+def iter_json_listing(key, items, start_time=None):
+    """
+    Fragmentos de {"<key>": [...], "total_records": N, "response_time_ms": T, "status_code": 200}
+    generados a medida que llegan los items (para StreamingHttpResponse)
+    """
+    start_time = start_time or time.time()
+    yield b'{"' + key.encode('utf-8') + b'":['
+    count = 0
+    try:
+        for item in items:
+            yield (b',' if count else b'') + dumps(item)
+            count += 1
+    except Exception as e:
+        yield _listing_end(count, start_time, e)
+        return
+    yield _listing_end(count, start_time)
+
+
+async def aiter_json_listing(key, items, start_time=None):
+    """Igual que iter_json_listing para un iterador asíncrono de items"""
+    start_time = start_time or time.time()
+    yield b'{"' + key.encode('utf-8') + b'":['
+    count = 0
+    try:
+        async for item in items:
+            yield (b',' if count else b'') + dumps(item)
+            count += 1
+    except Exception as e:
+        yield _listing_end(count, start_time, e)
+        return
+    yield _listing_end(count, start_time)
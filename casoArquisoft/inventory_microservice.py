@@ -14,8 +14,23 @@ Arquitectura del Microservicio:
 - Event-driven para notificar cambios
 """
 
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
-from django.http import JsonResponse
+from inventory_alerts import LowStockDetector
+from inventory_cache import PolicyCache
+from inventory_config import (
+    ASR_CONFIG, EVENT_CONFIG, EVENT_PUBLISHER_CONFIG, INVENTORY_CACHE_CONFIG, INVENTORY_CONNECTION_POOL,
+    INVENTORY_DATABASE_CONFIG, INVENTORY_REPLICA_CONFIG, INVENTORY_REPLICA_DATABASES, INVENTORY_RETRY_CONFIG,
+    INVENTORY_STATUS_CONFIG, LOW_STOCK_CONFIG, OUTBOX_CONFIG, InventoryDatabaseRouter
+)
+from inventory_ids import new_id
+from inventory_json import JsonResponse, iter_json_listing, timed_endpoint
+from inventory_operations import low_stock_load_batch, stock_delta, stock_write_batch
+from inventory_outbox import OutboxRelay, create_broker
+from inventory_pool import ElasticConnectionPool
+from inventory_publisher import EventPublisher
+from inventory_replicas import ReplicaMonitor, mark_write, pinned_to_primary
+from inventory_retry import CommitOutcomeUnknown, RetryPolicy
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import json
@@ -23,60 +38,204 @@ import time
 from datetime import datetime
 import mysql.connector
 from mysql.connector import Error
+import atexit
 import threading
+from contextlib import contextmanager
 from queue import Queue
 
-# Pool de conexiones para alta concurrencia
-connection_pool = mysql.connector.pooling.MySQLConnectionPool(
-    pool_name="inventory_pool",
-    pool_size=20,  # Para manejar 1500 usuarios concurrentes
-    pool_reset_session=True,
-    host='localhost',
-    database='inventario_db',
-    user='inventory_user',
-    password='inventory123'
-)
+def _connect(config=INVENTORY_DATABASE_CONFIG):
+    """Nueva conexión a la base de datos de inventario (o a una de sus réplicas)"""
+    return mysql.connector.connect(
+        host=config['HOST'],
+        port=int(config['PORT']),
+        database=config['NAME'],
+        user=config['USER'],
+        password=config['PASSWORD']
+    )
+
+def _create_pool(connect):
+    return ElasticConnectionPool(
+        connect,
+        pool_size=INVENTORY_CONNECTION_POOL['pool_size'],
+        max_overflow=INVENTORY_CONNECTION_POOL['max_overflow'],
+        pool_timeout=INVENTORY_CONNECTION_POOL['pool_timeout'],
+        pre_ping=INVENTORY_CONNECTION_POOL['pool_pre_ping'],
+        pre_ping_idle_seconds=INVENTORY_CONNECTION_POOL['pre_ping_idle_seconds'],
+        pool_recycle=INVENTORY_CONNECTION_POOL['pool_recycle'],
+        reset_session=INVENTORY_CONNECTION_POOL['pool_reset_session']
+    )
+
+# Pool de conexiones para alta concurrencia: pool_size + max_overflow con espera acotada.
+# Se crea en el primer uso (ver get_connection_pool): importar este módulo no toca MySQL
+connection_pool = None
+_connection_pool_lock = threading.Lock()
+
+# Un pool por réplica de lectura (alias de INVENTORY_REPLICA_DATABASES), también perezosos
+replica_pools = {}
 
-# Queue para operaciones asíncronas
-inventory_queue = Queue()
+def get_connection_pool():
+    """Pool de conexiones del servicio, creado en la primera llamada"""
+    global connection_pool
+    if connection_pool is None:
+        with _connection_pool_lock:
+            if connection_pool is None:
+                connection_pool = _create_pool(_connect)
+    return connection_pool
+
+def get_replica_pool(alias):
+    """Pool de conexiones de una réplica de lectura, creado en la primera llamada"""
+    pool = replica_pools.get(alias)
+    if pool is None:
+        with _connection_pool_lock:
+            pool = replica_pools.get(alias)
+            if pool is None:
+                config = INVENTORY_REPLICA_DATABASES[alias]
+                pool = replica_pools[alias] = _create_pool(lambda: _connect(config))
+    return pool
+
+def warm_connection_pool(count=None):
+    """
+    Hook de arranque (ver casoArquisoft/wsgi.py): abre las conexiones antes de
+    la primera petición. Retorna cuántas se abrieron
+    """
+    return get_connection_pool().warm(count)
+
+# Queue acotada de eventos pendientes de publicar (ver EventPublisher)
+inventory_queue = Queue(maxsize=EVENT_PUBLISHER_CONFIG['queue_size'])
 
 class InventoryService:
     """Servicio principal de gestión de inventario"""
     
     def __init__(self):
-        self.cache = {}
-        self.lock = threading.Lock()
+        # Caché compartido por los hilos de las peticiones (TTL por clase de dato).
+        # 'stock': consultas de estado filtradas, invalidadas por cada escritura de la SKU
+        self.cache = PolicyCache(
+            {
+                'stock': INVENTORY_CACHE_CONFIG['stock_timeout'],
+            },
+            default_ttl=INVENTORY_CACHE_CONFIG['default_timeout'],
+            max_entries=INVENTORY_CACHE_CONFIG['max_entries'],
+            sweep_interval_seconds=INVENTORY_CACHE_CONFIG['sweep_interval_seconds']
+        )
+        # Eventos escritos en lotes por hilos de fondo, fuera del tiempo de respuesta
+        self.event_publisher = EventPublisher(
+            inventory_queue, self._write_events,
+            workers=EVENT_PUBLISHER_CONFIG['workers'],
+            batch_size=EVENT_PUBLISHER_CONFIG['batch_size'],
+            flush_interval_ms=EVENT_PUBLISHER_CONFIG['flush_interval_ms'],
+            put_timeout_ms=EVENT_PUBLISHER_CONFIG['put_timeout_ms'],
+            retryable=self._event_write_retryable
+        )
+        # Reintentos de unidades de trabajo completas dentro del presupuesto del ASR
+        self.retry_policy = RetryPolicy(
+            max_attempts=INVENTORY_RETRY_CONFIG['max_attempts'],
+            base_delay_ms=INVENTORY_RETRY_CONFIG['base_delay_ms'],
+            max_delay_ms=INVENTORY_RETRY_CONFIG['max_delay_ms'],
+            budget_ms=ASR_CONFIG['max_response_time_ms']
+        )
+        # Umbrales de stock bajo. El estado de alerta vive en MySQL (alertas_stock_bajo) y
+        # se evalúa dentro del lote de escritura (ver stock_write_batch): aquí solo se
+        # resuelve el umbral de cada SKU
+        self.low_stock = LowStockDetector(
+            LOW_STOCK_CONFIG['default_threshold'],
+            hysteresis=LOW_STOCK_CONFIG['hysteresis'],
+            thresholds=LOW_STOCK_CONFIG['thresholds']
+        )
+        # Lecturas a réplicas con la misma selección que el router de Django (lag,
+        # read-your-writes, round-robin o menor latencia). InventoryDatabaseRouter solo
+        # enruta modelos del ORM; este servicio usa SQL directo y sus propios pools, así
+        # que lo consulta con read_alias() y mide el lag por esos pools
+        self.read_router = InventoryDatabaseRouter(monitor=ReplicaMonitor(
+            probe=self._probe_replica,
+            interval_seconds=INVENTORY_REPLICA_CONFIG['health_check_interval_seconds']
+        ))
     
-    def get_connection(self):
-        """Obtener conexión del pool"""
-        return connection_pool.get_connection()
+    def get_connection(self, pool=None):
+        """Obtener conexión del pool (por defecto, el del primario)"""
+        return (pool or get_connection_pool()).get_connection()
     
-    def execute_with_retry(self, query, params=None, retries=3):
-        """Ejecutar query con reintentos automáticos"""
-        for attempt in range(retries):
+    @contextmanager
+    def _unit_of_work(self, dictionary=False, pool=None):
+        """Conexión y cursor de una unidad de trabajo: se cierran siempre, también si algo falla"""
+        connection = self.get_connection(pool)
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=dictionary)
+            yield connection, cursor
+        except Exception:
             try:
-                connection = self.get_connection()
-                cursor = connection.cursor(dictionary=True)
-                
+                connection.rollback()
+            except Exception:
+                pass  # Conexión perdida: el pool la descarta al devolverla
+            raise
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            connection.close()
+    
+    @staticmethod
+    def _commit(connection):
+        """Commit que no se reintenta si falla: la transacción pudo haberse aplicado"""
+        mark_write()  # Read-your-writes: la sesión lee del primario durante un rato
+        try:
+            connection.commit()
+        except Exception as e:
+            raise CommitOutcomeUnknown(str(e)) from e
+    
+    @staticmethod
+    def _execute_batch(cursor, query, params):
+        """Lote multi-sentencia en un viaje; retorna la fila del último SELECT"""
+        outcome = None
+        for statement_result in cursor.execute(query, params, multi=True):
+            if statement_result.with_rows:
+                outcome = statement_result.fetchone()  # Cada resultado debe consumirse
+        return outcome
+    
+    def execute_with_retry(self, query, params=None, pool=None):
+        """Ejecutar query con reintentos automáticos (ver RetryPolicy)"""
+        def unit_of_work():
+            with self._unit_of_work(dictionary=True, pool=pool) as (connection, cursor):
                 if params:
                     cursor.execute(query, params)
                 else:
                     cursor.execute(query)
                 
                 if query.strip().upper().startswith('SELECT'):
-                    result = cursor.fetchall()
-                else:
-                    connection.commit()
-                    result = cursor.rowcount
-                
-                cursor.close()
-                connection.close()
-                return result
-                
-            except Error as e:
-                if attempt == retries - 1:
-                    raise e
-                time.sleep(0.1)  # Breve pausa antes de reintentar
+                    return cursor.fetchall()
+                self._commit(connection)
+                return cursor.rowcount
+        
+        return self.retry_policy.run(unit_of_work)
+    
+    def _read(self, query, params=None):
+        """
+        SELECT en la réplica que elija read_router (ver InventoryDatabaseRouter.read_alias)
+        o en el primario. Si la réplica falla queda fuera hasta la siguiente medición y la
+        lectura se repite en el primario
+        """
+        alias = self.read_router.read_alias()
+        if alias != self.read_router.primary:
+            try:
+                return self.execute_with_retry(query, params, pool=get_replica_pool(alias))
+            except Exception as e:
+                self.read_router.monitor.record(alias, None, error=str(e))
+        return self.execute_with_retry(query, params)
+    
+    def _probe_replica(self, alias):
+        """Lag de la réplica en segundos (None si la replicación está detenida)"""
+        with self._unit_of_work(dictionary=True, pool=get_replica_pool(alias)) as (connection, cursor):
+            try:
+                cursor.execute('SHOW REPLICA STATUS')
+            except Error:
+                cursor.execute('SHOW SLAVE STATUS')  # MySQL anterior a 8.0.22
+            row = cursor.fetchone()
+        if row is None:
+            return 0.0  # No es réplica (p. ej. el mismo servidor en desarrollo)
+        lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+        return None if lag is None else float(lag)
     
     def create_inventory_transaction(self, transaction_data):
         """
@@ -92,153 +251,98 @@ class InventoryService:
                 if field not in transaction_data:
                     return {'error': f'Campo requerido: {field}', 'status': 400}
             
-            # Generar ID único para la transacción
-            transaction_id = f"TXN_{int(time.time() * 1000000)}"
-            
-            # Query para insertar transacción
-            insert_query = """
-            INSERT INTO transacciones_inventario 
-            (id, producto_id, tipo_operacion, cantidad, cantidad_anterior, cantidad_nueva, 
-             ubicacion, operario_id, timestamp, estado)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'PROCESANDO')
-            """
-            
-            # Obtener cantidad actual del producto
-            current_stock = self.get_product_stock(transaction_data['producto_id'], transaction_data['ubicacion'])
-            
-            # Calcular nueva cantidad según tipo de operación
+            # Cambio relativo de stock según tipo de operación
             cantidad = transaction_data['cantidad']
-            if transaction_data['tipo_operacion'] == 'RECEPCION':
-                nueva_cantidad = current_stock + cantidad
-            elif transaction_data['tipo_operacion'] == 'PICKING':
-                if current_stock < cantidad:
-                    return {'error': 'Stock insuficiente', 'status': 400}
-                nueva_cantidad = current_stock - cantidad
-            elif transaction_data['tipo_operacion'] == 'DEVOLUCION':
-                nueva_cantidad = current_stock + cantidad
-            else:
+            delta = stock_delta(transaction_data['tipo_operacion'], cantidad)
+            if delta is None:
                 return {'error': 'Tipo de operación inválido', 'status': 400}
             
-            # Ejecutar transacción
-            params = (
-                transaction_id,
-                transaction_data['producto_id'],
-                transaction_data['tipo_operacion'],
-                cantidad,
-                current_stock,
-                nueva_cantidad,
-                transaction_data['ubicacion'],
-                transaction_data['operario_id'],
-                datetime.now()
-            )
+            # Generar ID único para la transacción, su evento y la posible alerta de stock bajo
+            transaction_id = new_id('TXN_')
+            event_id = new_id('EVT_')
+            alert_event_id = new_id('EVT_')
+            write_query = stock_write_batch(delta)
+            
+            producto_id = transaction_data['producto_id']
+            ubicacion = transaction_data['ubicacion']
+            threshold = self.low_stock.threshold_for(f"{producto_id}_{ubicacion}", producto_id)
+            timestamp = datetime.now()
+            params = {
+                'transaction_id': transaction_id,
+                'event_id': event_id,
+                'alert_event_id': alert_event_id,
+                'producto_id': producto_id,
+                'tipo_operacion': transaction_data['tipo_operacion'],
+                'cantidad': cantidad,
+                'delta': delta,
+                'ubicacion': ubicacion,
+                'operario_id': transaction_data['operario_id'],
+                'timestamp': timestamp,
+                'timestamp_iso': timestamp.isoformat(),
+                'umbral': threshold,
+                'histeresis': self.low_stock.hysteresis
+            }
             
-            # Usar transacción de BD para consistencia
-            connection = self.get_connection()
-            connection.start_transaction()
+            def write_transaction():
+                """Unidad de trabajo reintentable: retorna la cantidad anterior o None sin stock"""
+                with self._unit_of_work() as (connection, cursor):
+                    # 1 viaje con todas las sentencias + commit
+                    aplicada, cantidad_anterior = self._execute_batch(cursor, write_query, params)
+                    
+                    if aplicada <= 0:
+                        connection.rollback()
+                        return None
+                    
+                    self._commit(connection)
+                    return cantidad_anterior
+            
+            current_stock = self.retry_policy.run(write_transaction)
+            if current_stock is None:
+                return {'error': 'Stock insuficiente', 'status': 400}
+            nueva_cantidad = current_stock + delta
+            
+            # Invalidar caché para este producto (descarta también lecturas en curso)
+            self._invalidate_stock(transaction_data['producto_id'], transaction_data['ubicacion'])
+            
+            # Calcular tiempo de respuesta
+            response_time = (time.time() - start_time) * 1000
             
-            try:
-                cursor = connection.cursor()
-                
-                # 1. Insertar transacción
-                cursor.execute(insert_query, params)
-                
-                # 2. Actualizar stock del producto
-                update_stock_query = """
-                UPDATE productos_inventario 
-                SET cantidad = %s, fecha_actualizacion = %s 
-                WHERE producto_id = %s AND ubicacion = %s
-                """
-                cursor.execute(update_stock_query, (nueva_cantidad, datetime.now(), 
-                                                  transaction_data['producto_id'], 
-                                                  transaction_data['ubicacion']))
-                
-                # 3. Marcar transacción como completada
-                cursor.execute(
-                    "UPDATE transacciones_inventario SET estado = 'COMPLETADA' WHERE id = %s",
-                    (transaction_id,)
-                )
-                
-                connection.commit()
-                cursor.close()
-                
-                # Limpiar caché para este producto
-                cache_key = f"stock_{transaction_data['producto_id']}_{transaction_data['ubicacion']}"
-                if cache_key in self.cache:
-                    del self.cache[cache_key]
-                
-                # Calcular tiempo de respuesta
-                response_time = (time.time() - start_time) * 1000
-                
-                # Enviar evento de cambio de inventario (para notificar a otros servicios)
-                self.publish_inventory_event({
-                    'transaction_id': transaction_id,
-                    'producto_id': transaction_data['producto_id'],
-                    'tipo_operacion': transaction_data['tipo_operacion'],
-                    'cantidad_anterior': current_stock,
-                    'cantidad_nueva': nueva_cantidad,
-                    'ubicacion': transaction_data['ubicacion'],
-                    'timestamp': datetime.now().isoformat(),
-                    'response_time_ms': response_time
-                })
-                
-                return {
-                    'transaction_id': transaction_id,
-                    'status': 'COMPLETADA',
-                    'cantidad_anterior': current_stock,
-                    'cantidad_nueva': nueva_cantidad,
-                    'response_time_ms': response_time,
-                    'status_code': 201
-                }
-                
-            except Exception as e:
-                connection.rollback()
-                raise e
-            finally:
-                connection.close()
+            return {
+                'transaction_id': transaction_id,
+                'status': 'COMPLETADA',
+                'cantidad_anterior': current_stock,
+                'cantidad_nueva': nueva_cantidad,
+                'response_time_ms': response_time,
+                'status_code': 201
+            }
                 
         except Exception as e:
             return {'error': str(e), 'status': 500}
     
     def get_product_stock(self, producto_id, ubicacion):
-        """Obtener stock actual con caché"""
-        cache_key = f"stock_{producto_id}_{ubicacion}"
-        
-        # Verificar caché primero
-        if cache_key in self.cache:
-            cache_data = self.cache[cache_key]
-            if time.time() - cache_data['timestamp'] < 30:  # Caché válido por 30 segundos
-                return cache_data['cantidad']
-        
-        # Consultar base de datos
-        query = """
-        SELECT cantidad FROM productos_inventario 
-        WHERE producto_id = %s AND ubicacion = %s
-        """
-        
-        result = self.execute_with_retry(query, (producto_id, ubicacion))
-        
-        if result:
-            cantidad = result[0]['cantidad']
-            # Actualizar caché
-            self.cache[cache_key] = {
-                'cantidad': cantidad,
-                'timestamp': time.time()
-            }
-            return cantidad
-        else:
-            # Producto no existe, crear registro inicial
-            self.create_product_record(producto_id, ubicacion)
-            return 0
+        """Obtener stock actual con caché (0 si la SKU no existe; una lectura no la crea)"""
+        rows = self._cached_status(producto_id, ubicacion)
+        return rows[0]['cantidad'] if rows else 0
+    
+    @staticmethod
+    def _status_cache_key(producto_id, ubicacion):
+        return f"{producto_id or ''}|{ubicacion or ''}"
+    
+    def _invalidate_stock(self, producto_id, ubicacion):
+        """Descarta las consultas en caché que incluyen la SKU: por SKU, por producto y por ubicación"""
+        for key in ((producto_id, ubicacion), (producto_id, None), (None, ubicacion)):
+            self.cache.invalidate('stock', self._status_cache_key(*key))
     
-    def create_product_record(self, producto_id, ubicacion):
-        """Crear registro inicial de producto"""
+    def create_product_record(self, producto_id, ubicacion, cantidad=0, reservada=0):
+        """Crear registro inicial de producto (el stock inicial no genera transacción)"""
         query = """
-        INSERT INTO productos_inventario (producto_id, ubicacion, cantidad, fecha_creacion)
-        VALUES (%s, %s, 0, %s)
+        INSERT INTO productos_inventario (producto_id, ubicacion, cantidad, cantidad_reservada, fecha_creacion)
+        VALUES (%s, %s, %s, %s, %s)
         ON DUPLICATE KEY UPDATE fecha_actualizacion = %s
         """
         timestamp = datetime.now()
-        self.execute_with_retry(query, (producto_id, ubicacion, timestamp, timestamp))
+        self.execute_with_retry(query, (producto_id, ubicacion, cantidad, reservada, timestamp, timestamp))
+        self._invalidate_stock(producto_id, ubicacion)
     
     def update_inventory(self, transaction_id, update_data):
         """
@@ -248,22 +352,47 @@ class InventoryService:
         start_time = time.time()
         
         try:
-            query = """
+            # El cambio de estado y el contador productos_inventario.pendientes (transacciones
+            # en PROCESANDO de la SKU) se actualizan en la misma transacción de BD
+            update_query = """
+            START TRANSACTION;
+            SET @estado_anterior = NULL, @producto_id = NULL, @ubicacion = NULL;
+            SELECT estado, producto_id, ubicacion INTO @estado_anterior, @producto_id, @ubicacion
+            FROM transacciones_inventario WHERE id = %(transaction_id)s FOR UPDATE;
             UPDATE transacciones_inventario 
-            SET estado = %s, observaciones = %s, fecha_actualizacion = %s
-            WHERE id = %s
+            SET estado = %(estado)s, observaciones = %(observaciones)s, fecha_actualizacion = %(timestamp)s
+            WHERE id = %(transaction_id)s;
+            UPDATE productos_inventario
+            SET pendientes = pendientes + (%(estado)s = 'PROCESANDO') - (@estado_anterior = 'PROCESANDO')
+            WHERE producto_id = @producto_id AND ubicacion = @ubicacion
+              AND (%(estado)s = 'PROCESANDO') <> (@estado_anterior = 'PROCESANDO');
+            SELECT @estado_anterior IS NOT NULL AS encontrada, @producto_id, @ubicacion
             """
+            params = {
+                'transaction_id': transaction_id,
+                'estado': update_data.get('estado', 'ACTUALIZADA'),
+                'observaciones': update_data.get('observaciones', ''),
+                'timestamp': datetime.now()
+            }
             
-            result = self.execute_with_retry(query, (
-                update_data.get('estado', 'ACTUALIZADA'),
-                update_data.get('observaciones', ''),
-                datetime.now(),
-                transaction_id
-            ))
+            def write_update():
+                """Retorna la SKU de la transacción, o None si no existe"""
+                with self._unit_of_work() as (connection, cursor):
+                    encontrada, producto_id, ubicacion = self._execute_batch(cursor, update_query, params)
+                    if not encontrada:
+                        connection.rollback()
+                        return None
+                    self._commit(connection)
+                    return producto_id, ubicacion
+            
+            sku = self.retry_policy.run(write_update)
+            if sku:
+                # El contador pendientes de la SKU pudo cambiar
+                self._invalidate_stock(*sku)
             
             response_time = (time.time() - start_time) * 1000
             
-            if result > 0:
+            if sku:
                 return {
                     'transaction_id': transaction_id,
                     'status': 'ACTUALIZADA',
@@ -276,7 +405,7 @@ class InventoryService:
         except Exception as e:
             return {'error': str(e), 'status': 500}
     
-    def cancel_transaction(self, transaction_id):
+    def cancel_transaction(self, transaction_id, operario_id='SYSTEM_REVERSAL'):
         """
         Cancelar/revertir transacción
         DELETE /api/inventory/transactions/{transaction_id}/
@@ -313,7 +442,7 @@ class InventoryService:
                 'tipo_operacion': inverse_operation[transaction['tipo_operacion']],
                 'cantidad': transaction['cantidad'],
                 'ubicacion': transaction['ubicacion'],
-                'operario_id': 'SYSTEM_REVERSAL',
+                'operario_id': operario_id,
                 'observaciones': f'Reversión de transacción {transaction_id}'
             }
             
@@ -347,75 +476,207 @@ class InventoryService:
         except Exception as e:
             return {'error': str(e), 'status': 500}
     
-    def get_inventory_status(self, producto_id=None, ubicacion=None):
+    # Las transacciones pendientes salen del contador pendientes, sin JOIN ni GROUP BY
+    STATUS_COLUMNS = ("producto_id, ubicacion, cantidad, cantidad_reservada, fecha_actualizacion, "
+                      "pendientes AS transacciones_pendientes")
+    
+    def get_inventory_status(self, producto_id=None, ubicacion=None, after_id=None, limit=None):
         """
         Consultar estado del inventario
         GET /api/inventory/status/
+        
+        Con filtros es una lectura por índice (uk_producto_ubicacion, idx_producto o
+        idx_ubicacion) a través del caché. Sin filtros retorna una página por clave primaria a partir
+        de after_id, con el cursor de la siguiente en next_cursor. Ambas se leen de una réplica
+        cuando hay alguna sana y la sesión no escribió hace poco (ver _read)
         """
         start_time = time.time()
         
         try:
-            base_query = """
-            SELECT pi.producto_id, pi.ubicacion, pi.cantidad, pi.fecha_actualizacion,
-                   COUNT(ti.id) as transacciones_pendientes
-            FROM productos_inventario pi
-            LEFT JOIN transacciones_inventario ti ON pi.producto_id = ti.producto_id 
-                AND pi.ubicacion = ti.ubicacion AND ti.estado = 'PROCESANDO'
-            """
+            if producto_id or ubicacion:
+                result = self._cached_status(producto_id, ubicacion)
+                page = {}
+            else:
+                result, next_cursor = self._status_page(after_id or 0, limit)
+                page = {'next_cursor': next_cursor}
+            
+            response_time = (time.time() - start_time) * 1000
+            
+            return {
+                'inventory': result,
+                'total_records': len(result),
+                **page,
+                'response_time_ms': response_time,
+                'status_code': 200
+            }
             
+        except Exception as e:
+            return {'error': str(e), 'status': 500}
+    
+    def _cached_status(self, producto_id, ubicacion):
+        """SKUs que cumplen los filtros, leídas a través del caché (clase 'stock')"""
+        def load_status():
             conditions = []
             params = []
             
             if producto_id:
-                conditions.append("pi.producto_id = %s")
+                conditions.append("producto_id = %s")
                 params.append(producto_id)
             
             if ubicacion:
-                conditions.append("pi.ubicacion = %s")
+                conditions.append("ubicacion = %s")
                 params.append(ubicacion)
             
-            if conditions:
-                base_query += " WHERE " + " AND ".join(conditions)
-            
-            base_query += " GROUP BY pi.producto_id, pi.ubicacion ORDER BY pi.fecha_actualizacion DESC"
-            
-            result = self.execute_with_retry(base_query, params if params else None)
-            
-            response_time = (time.time() - start_time) * 1000
+            query = f"""
+            SELECT {self.STATUS_COLUMNS}
+            FROM productos_inventario
+            WHERE {" AND ".join(conditions)}
+            ORDER BY fecha_actualizacion DESC
+            """
+            return self._read(query, params)
+        
+        if self.read_router.replicas and pinned_to_primary(self.read_router.config['read_your_writes_seconds']):
+            # El caché es compartido y pudo cargarse de una réplica atrasada: la sesión
+            # que acaba de escribir lee su SKU directo del primario
+            return load_status()
+        return self.cache.get_or_load('stock', self._status_cache_key(producto_id, ubicacion), load_status)
+    
+    def _status_page(self, after_id, limit=None):
+        """Página de SKUs con id > after_id. Retorna (filas, cursor siguiente o None)"""
+        limit = max(1, min(limit or INVENTORY_STATUS_CONFIG['page_size'], INVENTORY_STATUS_CONFIG['max_page_size']))
+        query = f"""
+        SELECT id, {self.STATUS_COLUMNS}
+        FROM productos_inventario
+        WHERE id > %s
+        ORDER BY id
+        LIMIT %s
+        """
+        rows = self._read(query, (after_id, limit))
+        next_cursor = rows[-1]['id'] if len(rows) == limit else None
+        for row in rows:
+            del row['id']
+        return rows, next_cursor
+    
+    def iter_inventory_status(self, page_size=None, first_page=None):
+        """
+        Todo el inventario, página a página: nunca hay más de una página en memoria.
+        first_page: (filas, cursor) ya leídos con _status_page(0, page_size)
+        """
+        rows, after_id = first_page or self._status_page(0, page_size)
+        yield from rows
+        while after_id is not None:
+            rows, after_id = self._status_page(after_id, page_size)
+            yield from rows
+    
+    def get_transaction_history(self, limit=50):
+        """Últimas transacciones (índice idx_timestamp) y el total registrado"""
+        start_time = time.time()
+        
+        try:
+            transactions = self._read("""
+            SELECT id, producto_id, tipo_operacion, cantidad, cantidad_anterior, cantidad_nueva,
+                   ubicacion, operario_id, timestamp, estado
+            FROM transacciones_inventario
+            ORDER BY timestamp DESC, id DESC
+            LIMIT %s
+            """, (limit,))
+            total = self._read("SELECT COUNT(*) AS total FROM transacciones_inventario")
             
             return {
-                'inventory': result,
-                'total_records': len(result),
-                'response_time_ms': response_time,
+                'transactions': transactions,
+                'total_count': total[0]['total'],
+                'response_time_ms': (time.time() - start_time) * 1000,
                 'status_code': 200
             }
             
         except Exception as e:
             return {'error': str(e), 'status': 500}
     
-    def publish_inventory_event(self, event_data):
-        """Publicar evento de cambio de inventario (para integración con otros microservicios)"""
-        try:
-            # En un ambiente real, esto se enviaría a un message broker (RabbitMQ, Kafka, SQS)
-            # Por ahora, lo guardamos en una tabla de eventos
-            event_query = """
-            INSERT INTO eventos_inventario (evento_id, tipo_evento, datos, timestamp)
-            VALUES (%s, 'INVENTORY_CHANGED', %s, %s)
-            """
-            
-            event_id = f"EVT_{int(time.time() * 1000000)}"
+    def load_low_stock_alerts(self):
+        """
+        Carga inicial de alertas de stock bajo (hook de arranque, ver casoArquisoft/wsgi.py):
+        abre la alerta de cada SKU que ya estaba bajo su umbral. Idempotente y segura con
+        varios workers. Retorna cuántas alertas abrió
+        """
+        candidates = self.execute_with_retry("""
+        SELECT pi.producto_id, pi.ubicacion
+        FROM productos_inventario pi
+        LEFT JOIN alertas_stock_bajo a ON a.producto_id = pi.producto_id AND a.ubicacion = pi.ubicacion
+        WHERE a.producto_id IS NULL AND pi.cantidad - pi.cantidad_reservada < %s
+        """, (max([self.low_stock.default_threshold, *self.low_stock.thresholds.values()]),))
+        load_query = low_stock_load_batch()
+        opened = 0
+        for row in candidates:
+            producto_id, ubicacion = row['producto_id'], row['ubicacion']
+            timestamp = datetime.now()
+            params = {
+                'alert_event_id': new_id('EVT_'),
+                'producto_id': producto_id,
+                'ubicacion': ubicacion,
+                'umbral': self.low_stock.threshold_for(f"{producto_id}_{ubicacion}", producto_id),
+                'timestamp': timestamp,
+                'timestamp_iso': timestamp.isoformat()
+            }
             
-            self.execute_with_retry(event_query, (
-                event_id,
-                json.dumps(event_data),
-                datetime.now()
-            ))
+            def open_alert():
+                with self._unit_of_work() as (connection, cursor):
+                    abierta, = self._execute_batch(cursor, load_query, params)
+                    self._commit(connection)
+                    return abierta
             
-        except Exception as e:
-            print(f"Error publicando evento: {e}")
+            opened += self.retry_policy.run(open_alert)
+        return opened
+    
+    def low_stock_stats(self):
+        """Alertas abiertas (compartidas por todos los workers) y umbrales configurados"""
+        rows = self.execute_with_retry("SELECT COUNT(*) AS abiertas FROM alertas_stock_bajo")
+        return {
+            'skus_below_threshold': rows[0]['abiertas'],
+            'default_threshold': self.low_stock.default_threshold,
+            'hysteresis': self.low_stock.hysteresis,
+        }
+    
+    def publish_inventory_event(self, event_data, event_type='INVENTORY_CHANGED'):
+        """Publicar evento de cambio de inventario (para integración con otros microservicios)"""
+        # Se escribe en el outbox (en segundo plano, ver _write_events) y el relay de
+        # inventory_outbox lo lleva al message broker (RabbitMQ, Kafka, SQS)
+        event_id = new_id('EVT_')
+        self.event_publisher.publish((event_id, event_type, json.dumps(event_data), datetime.now()))
+    
+    def _write_events(self, rows):
+        """
+        Escribe un lote de eventos en el outbox con un solo INSERT multi-fila (executemany).
+        INSERT IGNORE: si el commit anterior del mismo lote sí se aplicó, repetirlo no
+        duplica eventos ni falla por uk_evento
+        """
+        event_query = """
+        INSERT IGNORE INTO outbox_inventario (evento_id, tipo_evento, datos, creado)
+        VALUES (%s, %s, %s, %s)
+        """
+        with self._unit_of_work() as (connection, cursor):
+            cursor.executemany(event_query, rows)
+            self._commit(connection)
+    
+    @staticmethod
+    def _event_write_retryable(error):
+        """Lotes de eventos: errores transitorios y commits de resultado desconocido (el lote es idempotente)"""
+        return isinstance(error, CommitOutcomeUnknown) or RetryPolicy.classify(error) is not None
 
 # Instancia global del servicio
 inventory_service = InventoryService()
+atexit.register(inventory_service.event_publisher.stop, EVENT_PUBLISHER_CONFIG['shutdown_timeout_seconds'])
+
+# Relay del outbox en proceso (si no, correr aparte: python inventory_outbox.py)
+outbox_relay = None
+if EVENT_CONFIG['publish_to_queue']:
+    outbox_relay = OutboxRelay(
+        inventory_service.get_connection, create_broker(OUTBOX_CONFIG),
+        batch_size=OUTBOX_CONFIG['batch_size'],
+        poll_interval_ms=OUTBOX_CONFIG['poll_interval_ms'],
+        rate_window_seconds=OUTBOX_CONFIG['rate_window_seconds']
+    )
+    outbox_relay.start()
+    atexit.register(outbox_relay.stop)
 
 # =============================================================================
 # API ENDPOINTS
@@ -423,6 +684,7 @@ inventory_service = InventoryService()
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@timed_endpoint('mysql_transactions')
 def create_inventory_transaction(request):
     """
     POST /api/inventory/transactions/
@@ -442,6 +704,7 @@ def create_inventory_transaction(request):
 
 @csrf_exempt
 @require_http_methods(["PUT"])
+@timed_endpoint('mysql_transactions')
 def update_inventory_transaction(request, transaction_id):
     """
     PUT /api/inventory/transactions/{transaction_id}/
@@ -461,6 +724,7 @@ def update_inventory_transaction(request, transaction_id):
 
 @csrf_exempt
 @require_http_methods(["DELETE"])
+@timed_endpoint('mysql_transactions')
 def cancel_inventory_transaction(request, transaction_id):
     """
     DELETE /api/inventory/transactions/{transaction_id}/
@@ -476,6 +740,7 @@ def cancel_inventory_transaction(request, transaction_id):
         return JsonResponse({'error': str(e)}, status=500)
 
 @require_http_methods(["GET"])
+@timed_endpoint('mysql_status')
 def get_inventory_status(request):
     """
     GET /api/inventory/status/
@@ -484,8 +749,29 @@ def get_inventory_status(request):
     try:
         producto_id = request.GET.get('producto_id')
         ubicacion = request.GET.get('ubicacion')
+        cursor = request.GET.get('cursor')
+        limit = request.GET.get('limit')
+        
+        if not (producto_id or ubicacion or cursor or limit):
+            # Listado completo: se transmite por páginas en lugar de armarlo en memoria. La
+            # primera se lee antes de responder, así un fallo de la BD todavía es un 500
+            start_time = time.time()
+            first_page = inventory_service._status_page(0)
+            return StreamingHttpResponse(
+                iter_json_listing('inventory', inventory_service.iter_inventory_status(first_page=first_page),
+                                  start_time),
+                content_type='application/json'
+            )
         
-        result = inventory_service.get_inventory_status(producto_id, ubicacion)
+        try:
+            after_id = int(cursor) if cursor else None
+            limit = int(limit) if limit else None
+            if (after_id is not None and after_id < 0) or (limit is not None and limit <= 0):
+                raise ValueError
+        except ValueError:
+            return JsonResponse({'error': 'cursor debe ser un entero >= 0 y limit un entero positivo'}, status=400)
+        
+        result = inventory_service.get_inventory_status(producto_id, ubicacion, after_id=after_id, limit=limit)
         
         status_code = result.get('status_code', 200)
         return JsonResponse(result, status=status_code)
@@ -494,6 +780,7 @@ def get_inventory_status(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 @require_http_methods(["GET"])
+@timed_endpoint('mysql_health')
 def inventory_health_check(request):
     """
     GET /api/inventory/health/
@@ -503,16 +790,17 @@ def inventory_health_check(request):
         # Verificar conexión a base de datos
         test_result = inventory_service.execute_with_retry("SELECT 1 as test")
         
-        # Verificar pool de conexiones
-        pool_status = {
-            'pool_size': connection_pool.pool_size,
-            'connections_in_use': len([conn for conn in connection_pool._cnx_queue.queue if conn.is_connected()])
-        }
-        
         # Métricas de rendimiento
         metrics = {
             'cache_size': len(inventory_service.cache),
-            'pool_status': pool_status,
+            'cache': inventory_service.cache.stats(),
+            'event_publisher': inventory_service.event_publisher.stats(),
+            'outbox_relay': outbox_relay.stats() if outbox_relay else None,
+            'retries': inventory_service.retry_policy.stats(),
+            'low_stock': inventory_service.low_stock_stats(),
+            'pool_status': get_connection_pool().stats(),
+            'replica_pools': {alias: pool.stats() for alias, pool in replica_pools.items()},
+            'read_routing': inventory_service.read_router.stats(),
             'database_test': 'OK' if test_result else 'FAILED'
         }
         
@@ -4,16 +4,32 @@ Microservicio de Gestión de Inventario - Versión Simplificada
 Para demostración del ASR sin dependencias externas
 """
 
+import atexit
 import json
 import time
-import uuid
+from collections import deque
 from datetime import datetime
-from django.http import JsonResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
 
+from inventory_alerts import LowStockDetector
+from inventory_archive import TransactionArchive
+from inventory_config import (
+    INVENTORY_PERSISTENCE_CONFIG, INVENTORY_RESERVATION_CONFIG, INVENTORY_RETENTION_CONFIG, INVENTORY_STORAGE_CONFIG,
+    INVENTORY_STREAM_CONFIG, LOW_STOCK_CONFIG
+)
+from inventory_events import create_change_feed
+from inventory_idempotency import create_idempotency_store, idempotent
+from inventory_ids import new_id
+from inventory_json import JsonResponse, dumps, serialization_stats, timed_endpoint
+from inventory_operations import VALID_OPERATION_TYPES, stock_delta
+from inventory_persistence import InventoryPersistence
+from inventory_reservations import HoldScheduler
+from inventory_storage import MemoryInventoryBackend, create_backend
+
 # =============================================================================
 # SIMULADOR DE BASE DE DATOS EN MEMORIA (para demostración)
 # =============================================================================
@@ -34,6 +50,150 @@ TRANSACTIONS = {}
 # Métricas en memoria
 METRICS = []
 
+# Reservas de stock activas del backend en memoria (id -> reserva); con SQLite
+# viven en la base compartida
+RESERVATIONS = {}
+
+# Backend de almacenamiento del simulador (memoria del proceso o SQLite
+# compartido entre workers), ver inventory_storage.py
+STORAGE = create_backend(INVENTORY_STORAGE_CONFIG, INVENTORY_STOCK, TRANSACTIONS, RESERVATIONS)
+
+# Claves Idempotency-Key de las escrituras, en el mismo backend que el stock
+IDEMPOTENCY_STORE = create_idempotency_store(STORAGE)
+
+# Flujo de cambios de stock y transacciones para el dashboard (SSE / long-poll)
+# y versión del inventario: en el proceso o en la base SQLite compartida
+CHANGE_FEED = create_change_feed(STORAGE, INVENTORY_STREAM_CONFIG['buffer_events'])
+
+# Máximo de líneas aceptadas en un lote de transacciones
+MAX_BATCH_SIZE = 1000
+
+def _new_transaction_id():
+    """Genera un ID único de transacción, ordenado por tiempo (ver inventory_ids)"""
+    return new_id('TXN_')
+
+def _new_reservation_id():
+    """Genera un ID único de reserva, ordenado por tiempo (ver inventory_ids)"""
+    return new_id('HOLD_')
+
+def _validate_transaction_data(data):
+    """Valida el cuerpo de una transacción. Retorna el mensaje de error o None"""
+    if not isinstance(data, dict):
+        return 'Cada transacción debe ser un objeto JSON'
+    
+    required_fields = ['producto_id', 'tipo_operacion', 'cantidad', 'ubicacion', 'operario_id']
+    for field in required_fields:
+        if field not in data:
+            return f'Campo requerido faltante: {field}'
+    
+    if data['tipo_operacion'] not in VALID_OPERATION_TYPES:
+        return 'Tipo de operación inválido. Debe ser: RECEPCION, PICKING, o DEVOLUCION'
+    
+    if not isinstance(data['cantidad'], int) or data['cantidad'] <= 0:
+        return 'La cantidad debe ser un número entero positivo'
+    
+    return None
+
+def get_inventory_summary():
+    """Retorna el resumen del inventario en O(1)"""
+    return InventoryServiceSimulator.storage.summary()
+
+# =============================================================================
+# PERSISTENCIA OPCIONAL (WAL + SNAPSHOTS)
+# =============================================================================
+
+# Instancia de InventoryPersistence cuando el WAL está habilitado
+PERSISTENCE = None
+
+def _snapshot_state():
+    """Estado a incluir en un snapshot"""
+    return INVENTORY_STOCK, TRANSACTIONS, RESERVATIONS
+
+def init_persistence(config=INVENTORY_PERSISTENCE_CONFIG):
+    """
+    Recupera el estado desde el último snapshot + WAL y activa el registro
+    de mutaciones del backend en memoria. Si no hay estado previo se conserva
+    el inventario inicial y se persiste como punto de partida.
+    """
+    global PERSISTENCE
+    
+    persistence = InventoryPersistence(
+        config['directory'],
+        group_commit_ms=config['group_commit_ms'],
+        sync_commit=config['sync_commit'],
+        snapshot_every_records=config['snapshot_every_records']
+    )
+    stock, transactions, holds = persistence.recover()
+    
+    if stock is not None:
+        STORAGE.load(stock, transactions, holds)
+    else:
+        persistence.snapshot(INVENTORY_STOCK, TRANSACTIONS, RESERVATIONS)
+    
+    persistence.state_provider = _snapshot_state
+    STORAGE.persistence = persistence
+    PERSISTENCE = persistence
+    atexit.register(persistence.close)
+    return persistence
+
+# El WAL solo aplica al backend en memoria; SQLite ya es durable
+if INVENTORY_PERSISTENCE_CONFIG['enabled'] and isinstance(STORAGE, MemoryInventoryBackend):
+    init_persistence()
+
+# =============================================================================
+# RETENCIÓN DE TRANSACCIONES (CONJUNTO CALIENTE + ARCHIVO COMPRIMIDO)
+# =============================================================================
+
+def init_retention(config=INVENTORY_RETENTION_CONFIG):
+    """
+    Acota las transacciones en memoria: las que exceden el límite de cantidad
+    o de antigüedad se archivan en segmentos comprimidos (desde un hilo de
+    fondo) y siguen siendo consultables por id a través del índice en disco.
+    """
+    archive = TransactionArchive(
+        config['archive_directory'],
+        segment_max_bytes=config['segment_max_bytes'],
+        compression_level=config['compression_level']
+    )
+    STORAGE.enable_retention(
+        archive,
+        max_hot_transactions=config['max_hot_transactions'],
+        max_age_seconds=config['max_age_seconds'],
+        eviction_batch=config['eviction_batch'],
+        eviction_interval_seconds=config['eviction_interval_seconds']
+    )
+    atexit.register(archive.close)
+    atexit.register(STORAGE.stop_retention)  # atexit es LIFO: se detiene antes de cerrar el archivo
+    return archive
+
+# SQLite ya guarda las transacciones en disco; la retención aplica al backend en memoria
+if INVENTORY_RETENTION_CONFIG['enabled'] and isinstance(STORAGE, MemoryInventoryBackend):
+    init_retention()
+
+# =============================================================================
+# DETECCIÓN DE STOCK BAJO
+# =============================================================================
+
+# Últimas alertas emitidas (para el API; el flujo de cambios también las publica)
+STOCK_ALERTS = deque(maxlen=1000)
+
+def _emit_stock_alert(event_type, data):
+    alert = dict(data, event_type=event_type)
+    STOCK_ALERTS.append(alert)
+    CHANGE_FEED.publish('alert', alert)
+
+LOW_STOCK_DETECTOR = LowStockDetector(
+    LOW_STOCK_CONFIG['default_threshold'],
+    hysteresis=LOW_STOCK_CONFIG['hysteresis'],
+    thresholds=LOW_STOCK_CONFIG['thresholds']
+)
+
+# Estado inicial (una sola vez al arrancar); desde aquí cada mutación se evalúa al ocurrir
+for _stock_key, _stock in STORAGE.all_stock():
+    LOW_STOCK_DETECTOR.stock_changed(_stock_key, _stock)
+LOW_STOCK_DETECTOR.on_event = _emit_stock_alert
+STORAGE.listeners.append(LOW_STOCK_DETECTOR)
+
 # =============================================================================
 # SIMULADOR DE SERVICIOS DEL MICROSERVICIO
 # =============================================================================
@@ -41,72 +201,87 @@ METRICS = []
 class InventoryServiceSimulator:
     """Simulador del servicio de inventario para demostración"""
     
-    @staticmethod
-    def create_transaction(producto_id, tipo_operacion, cantidad, ubicacion, operario_id):
+    # Backend de almacenamiento (ver inventory_storage.py)
+    storage = STORAGE
+    
+    # Retraso de procesamiento simulado por operación (los motores de inventory_engines usan 0)
+    processing_delay_seconds = 0.01
+    
+    @classmethod
+    def _record_transaction(cls, transaction_id, producto_id, tipo_operacion, cantidad, ubicacion,
+                            operario_id, cantidad_anterior, nueva_cantidad, start_time, extra=None):
+        """Registra una transacción completada"""
+        transaction = {
+            'id': transaction_id,
+            'producto_id': producto_id,
+            'tipo_operacion': tipo_operacion,
+            'cantidad': cantidad,
+            'cantidad_anterior': cantidad_anterior,
+            'cantidad_nueva': nueva_cantidad,
+            'ubicacion': ubicacion,
+            'operario_id': operario_id,
+            'estado': 'COMPLETADA',
+            'timestamp': time.time_ns(),
+            'processing_time_ms': (time.time() - start_time) * 1000
+        }
+        if extra:
+            transaction.update(extra)
+        
+        return cls.storage.save_transaction(transaction)
+    
+    @classmethod
+    def create_transaction(cls, producto_id, tipo_operacion, cantidad, ubicacion, operario_id):
         """Simula la creación de una transacción de inventario"""
         start_time = time.time()
         
         # Generar ID único de transacción
-        transaction_id = f"TXN_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
+        transaction_id = _new_transaction_id()
         
         # Clave para el stock
         stock_key = f"{producto_id}_{ubicacion}"
         
-        # Verificar si existe el producto en la ubicación
-        if stock_key not in INVENTORY_STOCK:
-            return {
-                'success': False,
-                'error': 'Producto no encontrado en la ubicación especificada',
-                'processing_time_ms': (time.time() - start_time) * 1000
-            }
-        
-        stock_info = INVENTORY_STOCK[stock_key].copy()
-        cantidad_anterior = stock_info['cantidad']
-        
-        # Procesar según tipo de operación
-        if tipo_operacion == 'RECEPCION':
-            nueva_cantidad = cantidad_anterior + cantidad
-        elif tipo_operacion == 'PICKING':
-            if cantidad_anterior < cantidad:
+        with cls.storage.locked([stock_key]):
+            # Verificar si existe el producto en la ubicación
+            stock = cls.storage.get_stock(stock_key)
+            if stock is None:
+                return {
+                    'success': False,
+                    'error': 'Producto no encontrado en la ubicación especificada',
+                    'processing_time_ms': (time.time() - start_time) * 1000
+                }
+            
+            cantidad_anterior = stock['cantidad']
+            
+            # Procesar según tipo de operación
+            delta = stock_delta(tipo_operacion, cantidad)
+            if delta is None:
+                return {
+                    'success': False,
+                    'error': 'Tipo de operación inválido',
+                    'processing_time_ms': (time.time() - start_time) * 1000
+                }
+            # Un picking no puede consumir unidades reservadas por otros operarios
+            if delta < 0 and cantidad_anterior + delta < stock['reservada']:
                 return {
                     'success': False,
                     'error': 'Stock insuficiente',
                     'stock_actual': cantidad_anterior,
+                    'stock_disponible': cantidad_anterior - stock['reservada'],
                     'cantidad_solicitada': cantidad,
                     'processing_time_ms': (time.time() - start_time) * 1000
                 }
-            nueva_cantidad = cantidad_anterior - cantidad
-        elif tipo_operacion == 'DEVOLUCION':
-            nueva_cantidad = cantidad_anterior + cantidad
-        else:
-            return {
-                'success': False,
-                'error': 'Tipo de operación inválido',
-                'processing_time_ms': (time.time() - start_time) * 1000
-            }
-        
-        # Simular pequeño retraso de procesamiento (para realismo)
-        time.sleep(0.01)  # 10ms
-        
-        # Actualizar stock
-        INVENTORY_STOCK[stock_key]['cantidad'] = nueva_cantidad
-        
-        # Registrar transacción
-        transaction = {
-            'id': transaction_id,
-            'producto_id': producto_id,
-            'tipo_operacion': tipo_operacion,
-            'cantidad': cantidad,
-            'cantidad_anterior': cantidad_anterior,
-            'cantidad_nueva': nueva_cantidad,
-            'ubicacion': ubicacion,
-            'operario_id': operario_id,
-            'estado': 'COMPLETADA',
-            'timestamp': datetime.now().isoformat(),
-            'processing_time_ms': (time.time() - start_time) * 1000
-        }
+            nueva_cantidad = cantidad_anterior + delta
+            
+            # Actualizar stock y registrar transacción
+            cls.storage.adjust_stock(stock_key, delta)
+            cls._record_transaction(
+                transaction_id, producto_id, tipo_operacion, cantidad, ubicacion,
+                operario_id, cantidad_anterior, nueva_cantidad, start_time
+            )
         
-        TRANSACTIONS[transaction_id] = transaction
+        # Simular pequeño retraso de procesamiento (para realismo), solo en escrituras
+        # aplicadas y fuera del lock; las respuestas de validación no lo pagan
+        time.sleep(cls.processing_delay_seconds)
         
         # Registrar métrica
         processing_time = (time.time() - start_time) * 1000
@@ -127,16 +302,115 @@ class InventoryServiceSimulator:
             'asr_compliant': processing_time <= 500
         }
     
-    @staticmethod
-    def get_stock_status(producto_id, ubicacion=None):
+    @classmethod
+    def create_transactions_batch(cls, items, atomic=True):
+        """
+        Aplica un lote de transacciones ya validadas bajo un solo conjunto de locks.
+        
+        Con atomic=True se aplican todas o ninguna; con atomic=False cada línea
+        se aplica o falla de forma independiente. Los locks de los SKUs se
+        adquieren ordenados para que lotes concurrentes no se bloqueen entre sí.
+        """
+        start_time = time.time()
+        
+        # Un único retraso simulado por lote en vez de uno por línea
+        time.sleep(cls.processing_delay_seconds)
+        
+        stock_keys = [f"{item['producto_id']}_{item['ubicacion']}" for item in items]
+        results = []
+        planned = []
+        
+        with cls.storage.locked(stock_keys):
+            # 1. Planificar sobre saldos acumulados sin tocar el stock
+            balances = {}
+            reserved = {}
+            for index, (item, stock_key) in enumerate(zip(items, stock_keys)):
+                if stock_key not in balances:
+                    stock = cls.storage.get_stock(stock_key)
+                    if stock is None:
+                        results.append({
+                            'index': index,
+                            'success': False,
+                            'error': 'Producto no encontrado en la ubicación especificada'
+                        })
+                        continue
+                    balances[stock_key] = stock['cantidad']
+                    reserved[stock_key] = stock['reservada']
+                
+                cantidad_anterior = balances[stock_key]
+                delta = stock_delta(item['tipo_operacion'], item['cantidad'])
+                nueva_cantidad = cantidad_anterior + delta
+                if delta < 0 and nueva_cantidad < reserved[stock_key]:
+                    results.append({
+                        'index': index,
+                        'success': False,
+                        'error': 'Stock insuficiente',
+                        'stock_actual': cantidad_anterior,
+                        'cantidad_solicitada': item['cantidad']
+                    })
+                    continue
+                
+                balances[stock_key] = nueva_cantidad
+                planned.append((index, item, stock_key, cantidad_anterior, nueva_cantidad))
+                results.append(None)
+            
+            failed = len(items) - len(planned)
+            
+            # 2. Aplicar (en modo atómico, solo si ninguna línea falló)
+            if atomic and failed:
+                for index, _, _, _, _ in planned:
+                    results[index] = {
+                        'index': index,
+                        'success': False,
+                        'error': 'No aplicada: el lote es atómico y otra línea falló'
+                    }
+                planned = []
+            
+            for index, item, stock_key, cantidad_anterior, nueva_cantidad in planned:
+                transaction_id = _new_transaction_id()
+                cls.storage.adjust_stock(stock_key, nueva_cantidad - cantidad_anterior)
+                cls._record_transaction(
+                    transaction_id, item['producto_id'], item['tipo_operacion'], item['cantidad'],
+                    item['ubicacion'], item['operario_id'], cantidad_anterior, nueva_cantidad, start_time
+                )
+                results[index] = {
+                    'index': index,
+                    'success': True,
+                    'transaction_id': transaction_id,
+                    'stock_anterior': cantidad_anterior,
+                    'stock_nuevo': nueva_cantidad
+                }
+        
+        # Registrar métrica
+        processing_time = (time.time() - start_time) * 1000
+        METRICS.append({
+            'operation': 'CREATE_TRANSACTION_BATCH',
+            'processing_time_ms': processing_time,
+            'timestamp': datetime.now().isoformat(),
+            'success': failed == 0,
+            'asr_compliant': processing_time <= 500,
+            'batch_size': len(items)
+        })
+        
+        return {
+            'success': failed == 0,
+            'atomic': atomic,
+            'applied': len(planned),
+            'failed': len(items) - len(planned),
+            'results': results,
+            'processing_time_ms': processing_time,
+            'asr_compliant': processing_time <= 500
+        }
+    
+    @classmethod
+    def get_stock_status(cls, producto_id, ubicacion=None):
         """Obtiene el estado del stock de un producto"""
         start_time = time.time()
         
         if ubicacion:
             # Consultar stock específico por ubicación
-            stock_key = f"{producto_id}_{ubicacion}"
-            if stock_key in INVENTORY_STOCK:
-                stock = INVENTORY_STOCK[stock_key]
+            stock = cls.storage.get_stock(f"{producto_id}_{ubicacion}")
+            if stock is not None:
                 result = {
                     'producto_id': producto_id,
                     'ubicacion': ubicacion,
@@ -152,7 +426,7 @@ class InventoryServiceSimulator:
                 }
         else:
             # Consultar stock consolidado del producto
-            stock_items = [v for k, v in INVENTORY_STOCK.items() if v['producto_id'] == producto_id]
+            stock_items = cls.storage.stock_for_product(producto_id)
             if stock_items:
                 total_cantidad = sum(item['cantidad'] for item in stock_items)
                 total_reservada = sum(item['reservada'] for item in stock_items)
@@ -183,18 +457,15 @@ class InventoryServiceSimulator:
         
         return result
     
-    @staticmethod
-    def get_transaction_history(limit=50):
+    @classmethod
+    def get_transaction_history(cls, limit=50):
         """Obtiene el historial de transacciones"""
         start_time = time.time()
         
-        # Obtener las últimas transacciones
-        transactions = list(TRANSACTIONS.values())
-        transactions.sort(key=lambda x: x['timestamp'], reverse=True)
-        
+        # Obtener las últimas transacciones (el backend las mantiene en orden de registro)
         result = {
-            'transactions': transactions[:limit],
-            'total_count': len(transactions),
+            'transactions': cls.storage.recent_transactions(limit),
+            'total_count': cls.storage.count_transactions(),
             'processing_time_ms': (time.time() - start_time) * 1000
         }
         
@@ -210,13 +481,14 @@ class InventoryServiceSimulator:
         
         return result
     
-    @staticmethod
-    def update_transaction_flexible(transaction_id, data):
+    @classmethod
+    def update_transaction_flexible(cls, transaction_id, data):
         """Actualiza transacción existente o crea nueva si no existe - FLEXIBLE PARA JMETER"""
         start_time = time.time()
+        storage = cls.storage
         
         # Si la transacción no existe, crear una nueva con el ID proporcionado
-        if transaction_id not in TRANSACTIONS:
+        if storage.get_transaction(transaction_id) is None:
             # Crear nueva transacción con el ID específico (para JMeter)
             producto_id = data.get('producto_id', 'zapatos')
             tipo_operacion = data.get('tipo_operacion', 'RECEPCION')
@@ -224,109 +496,109 @@ class InventoryServiceSimulator:
             ubicacion = data.get('ubicacion', 'A1-B1')
             operario_id = data.get('operario_id', 'JMETER_USER')
             
-            # Inicializar stock si no existe
             stock_key = f"{producto_id}_{ubicacion}"
-            if stock_key not in INVENTORY_STOCK:
-                INVENTORY_STOCK[stock_key] = {
-                    'producto_id': producto_id,
-                    'ubicacion': ubicacion,
-                    'cantidad': 100,  # Stock inicial
-                    'reservada': 0
+            created = False
+            with storage.locked([stock_key]):
+                # Otra petición pudo crearla entre la comprobación y el lock: el alta
+                # (stock y transacción) se decide y se registra dentro del lock
+                if storage.get_transaction(transaction_id) is None:
+                    # Inicializar stock si no existe
+                    stock = storage.get_stock(stock_key)
+                    if stock is None:
+                        stock = storage.create_stock(stock_key, producto_id, ubicacion, cantidad=100)  # Stock inicial
+                    
+                    # Aplicar operación al stock
+                    cantidad_anterior = stock['cantidad']
+                    if tipo_operacion in ['RECEPCION', 'DEVOLUCION']:
+                        stock = storage.adjust_stock(stock_key, cantidad)
+                    elif tipo_operacion == 'PICKING':
+                        if cantidad_anterior < cantidad:
+                            # Ajustar cantidad para que no sea negativa
+                            cantidad = cantidad_anterior
+                        stock = storage.adjust_stock(stock_key, -cantidad)
+                    
+                    nueva_cantidad = stock['cantidad']
+                    
+                    # Crear nueva transacción
+                    transaction = {
+                        'id': transaction_id,
+                        'producto_id': producto_id,
+                        'tipo_operacion': tipo_operacion,
+                        'cantidad': cantidad,
+                        'cantidad_anterior': cantidad_anterior,
+                        'cantidad_nueva': nueva_cantidad,
+                        'ubicacion': ubicacion,
+                        'operario_id': operario_id,
+                        'estado': 'COMPLETADA_JMETER',
+                        'timestamp': time.time_ns(),
+                        'processing_time_ms': (time.time() - start_time) * 1000,
+                        'created_by_put': True  # Marca para identificar
+                    }
+                    
+                    storage.save_transaction(transaction)
+                    created = True
+            if created:
+                processing_time = (time.time() - start_time) * 1000
+                
+                # Registrar métrica
+                METRICS.append({
+                    'operation': 'UPDATE_TRANSACTION_FLEXIBLE_CREATE',
+                    'processing_time_ms': processing_time,
+                    'timestamp': datetime.now().isoformat(),
+                    'success': True,
+                    'asr_compliant': processing_time <= 500
+                })
+                
+                return {
+                    'success': True,
+                    'transaction_id': transaction_id,
+                    'processing_time_ms': processing_time,
+                    'stock_anterior': cantidad_anterior,
+                    'stock_nuevo': nueva_cantidad,
+                    'asr_compliant': processing_time <= 500,
+                    'message': 'Nueva transacción creada via PUT'
                 }
+        
+        # Si la transacción existe, usar lógica original pero más flexible
+        transaction = storage.get_transaction(transaction_id)
+        stock_key = f"{transaction['producto_id']}_{transaction['ubicacion']}"
+        
+        with storage.locked([stock_key]):
+            # Releer dentro del lock por si otra petición la modificó
+            transaction = storage.get_transaction(transaction_id)
             
-            # Aplicar operación al stock
-            cantidad_anterior = INVENTORY_STOCK[stock_key]['cantidad']
-            if tipo_operacion in ['RECEPCION', 'DEVOLUCION']:
-                INVENTORY_STOCK[stock_key]['cantidad'] += cantidad
-            elif tipo_operacion == 'PICKING':
-                if INVENTORY_STOCK[stock_key]['cantidad'] >= cantidad:
-                    INVENTORY_STOCK[stock_key]['cantidad'] -= cantidad
-                else:
-                    # Ajustar cantidad para que no sea negativa
-                    cantidad = INVENTORY_STOCK[stock_key]['cantidad']
-                    INVENTORY_STOCK[stock_key]['cantidad'] = 0
-            
-            nueva_cantidad = INVENTORY_STOCK[stock_key]['cantidad']
+            # Revertir operación anterior solo si no fue creada por PUT
+            if not transaction.get('created_by_put', False):
+                if storage.get_stock(stock_key) is not None:
+                    if transaction['tipo_operacion'] in ['RECEPCION', 'DEVOLUCION']:
+                        storage.adjust_stock(stock_key, -transaction['cantidad'])
+                    elif transaction['tipo_operacion'] == 'PICKING':
+                        storage.adjust_stock(stock_key, transaction['cantidad'])
             
-            # Crear nueva transacción
-            transaction = {
-                'id': transaction_id,
-                'producto_id': producto_id,
-                'tipo_operacion': tipo_operacion,
-                'cantidad': cantidad,
-                'cantidad_anterior': cantidad_anterior,
-                'cantidad_nueva': nueva_cantidad,
-                'ubicacion': ubicacion,
-                'operario_id': operario_id,
-                'estado': 'COMPLETADA_JMETER',
-                'timestamp': datetime.now().isoformat(),
-                'processing_time_ms': (time.time() - start_time) * 1000,
-                'created_by_put': True  # Marca para identificar
-            }
+            # Aplicar nueva operación
+            nueva_cantidad = data.get('cantidad', transaction['cantidad'])
+            nuevo_tipo = data.get('tipo_operacion', transaction['tipo_operacion'])
             
-            TRANSACTIONS[transaction_id] = transaction
-            processing_time = (time.time() - start_time) * 1000
+            stock = storage.get_stock(stock_key)
+            cantidad_anterior = stock['cantidad']
+            if nuevo_tipo in ['RECEPCION', 'DEVOLUCION']:
+                stock = storage.adjust_stock(stock_key, nueva_cantidad)
+            elif nuevo_tipo == 'PICKING':
+                if cantidad_anterior < nueva_cantidad:
+                    # Ajustar para evitar stock negativo
+                    nueva_cantidad = cantidad_anterior
+                stock = storage.adjust_stock(stock_key, -nueva_cantidad)
             
-            # Registrar métrica
-            METRICS.append({
-                'operation': 'UPDATE_TRANSACTION_FLEXIBLE_CREATE',
-                'processing_time_ms': processing_time,
-                'timestamp': datetime.now().isoformat(),
-                'success': True,
-                'asr_compliant': processing_time <= 500
+            # Actualizar transacción
+            storage.update_transaction(transaction, {
+                'cantidad': nueva_cantidad,
+                'tipo_operacion': nuevo_tipo,
+                'cantidad_anterior': cantidad_anterior,
+                'cantidad_nueva': stock['cantidad'],
+                'estado': 'ACTUALIZADA_FLEXIBLE',
+                'timestamp_actualizacion': time.time_ns(),
+                'operario_actualizacion': data.get('operario_id', transaction['operario_id'])
             })
-            
-            return {
-                'success': True,
-                'transaction_id': transaction_id,
-                'processing_time_ms': processing_time,
-                'stock_anterior': cantidad_anterior,
-                'stock_nuevo': nueva_cantidad,
-                'asr_compliant': processing_time <= 500,
-                'message': 'Nueva transacción creada via PUT'
-            }
-        
-        # Si la transacción existe, usar lógica original pero más flexible
-        transaction = TRANSACTIONS[transaction_id]
-        
-        # Permitir actualizar cualquier estado (más flexible)
-        producto_id = transaction['producto_id']
-        ubicacion = transaction['ubicacion']
-        stock_key = f"{producto_id}_{ubicacion}"
-        
-        # Revertir operación anterior solo si no fue creada por PUT
-        if not transaction.get('created_by_put', False):
-            if stock_key in INVENTORY_STOCK:
-                if transaction['tipo_operacion'] in ['RECEPCION', 'DEVOLUCION']:
-                    INVENTORY_STOCK[stock_key]['cantidad'] -= transaction['cantidad']
-                elif transaction['tipo_operacion'] == 'PICKING':
-                    INVENTORY_STOCK[stock_key]['cantidad'] += transaction['cantidad']
-        
-        # Aplicar nueva operación
-        nueva_cantidad = data.get('cantidad', transaction['cantidad'])
-        nuevo_tipo = data.get('tipo_operacion', transaction['tipo_operacion'])
-        
-        cantidad_anterior = INVENTORY_STOCK[stock_key]['cantidad']
-        if nuevo_tipo in ['RECEPCION', 'DEVOLUCION']:
-            INVENTORY_STOCK[stock_key]['cantidad'] += nueva_cantidad
-        elif nuevo_tipo == 'PICKING':
-            if INVENTORY_STOCK[stock_key]['cantidad'] >= nueva_cantidad:
-                INVENTORY_STOCK[stock_key]['cantidad'] -= nueva_cantidad
-            else:
-                # Ajustar para evitar stock negativo
-                nueva_cantidad = INVENTORY_STOCK[stock_key]['cantidad']
-                INVENTORY_STOCK[stock_key]['cantidad'] = 0
-        
-        # Actualizar transacción
-        transaction.update({
-            'cantidad': nueva_cantidad,
-            'tipo_operacion': nuevo_tipo,
-            'cantidad_anterior': cantidad_anterior,
-            'cantidad_nueva': INVENTORY_STOCK[stock_key]['cantidad'],
-            'estado': 'ACTUALIZADA_FLEXIBLE',
-            'timestamp_actualizacion': datetime.now().isoformat(),
-            'operario_actualizacion': data.get('operario_id', transaction['operario_id'])
-        })
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -344,18 +616,20 @@ class InventoryServiceSimulator:
             'transaction_id': transaction_id,
             'processing_time_ms': processing_time,
             'stock_anterior': cantidad_anterior,
-            'stock_nuevo': INVENTORY_STOCK[stock_key]['cantidad'],
+            'stock_nuevo': stock['cantidad'],
             'asr_compliant': processing_time <= 500,
             'message': 'Transacción existente actualizada'
         }
 
-    @staticmethod
-    def update_transaction(transaction_id, data):
+    @classmethod
+    def update_transaction(cls, transaction_id, data):
         """Actualiza una transacción existente de inventario"""
         start_time = time.time()
+        storage = cls.storage
         
         # Verificar que la transacción existe
-        if transaction_id not in TRANSACTIONS:
+        transaction = storage.get_transaction(transaction_id)
+        if transaction is None:
             processing_time = (time.time() - start_time) * 1000
             METRICS.append({
                 'operation': 'UPDATE_TRANSACTION',
@@ -371,64 +645,64 @@ class InventoryServiceSimulator:
                 'processing_time_ms': processing_time
             }
         
-        transaction = TRANSACTIONS[transaction_id]
-        
-        # Solo permitir actualizar transacciones en estado COMPLETADA
-        if transaction['estado'] != 'COMPLETADA':
-            processing_time = (time.time() - start_time) * 1000
-            return {
-                'success': False,
-                'error': 'Solo se pueden actualizar transacciones completadas',
-                'processing_time_ms': processing_time
-            }
-        
-        # Revertir la operación anterior en el stock
-        producto_id = transaction['producto_id']
-        ubicacion = transaction['ubicacion']
-        stock_key = f"{producto_id}_{ubicacion}"
+        stock_key = f"{transaction['producto_id']}_{transaction['ubicacion']}"
         
-        if stock_key in INVENTORY_STOCK:
-            # Revertir cambio anterior
-            if transaction['tipo_operacion'] in ['RECEPCION', 'DEVOLUCION']:
-                INVENTORY_STOCK[stock_key]['cantidad'] -= transaction['cantidad']
-            elif transaction['tipo_operacion'] == 'PICKING':
-                INVENTORY_STOCK[stock_key]['cantidad'] += transaction['cantidad']
-        
-        # Aplicar nueva cantidad si se proporciona
-        nueva_cantidad = data.get('cantidad', transaction['cantidad'])
-        nuevo_tipo = data.get('tipo_operacion', transaction['tipo_operacion'])
-        
-        # Aplicar nueva operación
-        cantidad_anterior = INVENTORY_STOCK[stock_key]['cantidad']
-        if nuevo_tipo in ['RECEPCION', 'DEVOLUCION']:
-            INVENTORY_STOCK[stock_key]['cantidad'] += nueva_cantidad
-        elif nuevo_tipo == 'PICKING':
-            if INVENTORY_STOCK[stock_key]['cantidad'] >= nueva_cantidad:
-                INVENTORY_STOCK[stock_key]['cantidad'] -= nueva_cantidad
-            else:
-                # Revertir cambio si no hay stock suficiente
-                if transaction['tipo_operacion'] in ['RECEPCION', 'DEVOLUCION']:
-                    INVENTORY_STOCK[stock_key]['cantidad'] += transaction['cantidad']
-                elif transaction['tipo_operacion'] == 'PICKING':
-                    INVENTORY_STOCK[stock_key]['cantidad'] -= transaction['cantidad']
-                
+        with storage.locked([stock_key]):
+            transaction = storage.get_transaction(transaction_id)
+            
+            # Solo permitir actualizar transacciones en estado COMPLETADA
+            if transaction['estado'] != 'COMPLETADA':
                 processing_time = (time.time() - start_time) * 1000
                 return {
                     'success': False,
-                    'error': 'Stock insuficiente para la actualización',
+                    'error': 'Solo se pueden actualizar transacciones completadas',
                     'processing_time_ms': processing_time
                 }
-        
-        # Actualizar la transacción
-        transaction.update({
-            'cantidad': nueva_cantidad,
-            'tipo_operacion': nuevo_tipo,
-            'cantidad_anterior': cantidad_anterior,
-            'cantidad_nueva': INVENTORY_STOCK[stock_key]['cantidad'],
-            'estado': 'ACTUALIZADA',
-            'timestamp_actualizacion': datetime.now().isoformat(),
-            'operario_actualizacion': data.get('operario_id', transaction['operario_id'])
-        })
+            
+            # Revertir la operación anterior en el stock
+            if storage.get_stock(stock_key) is not None:
+                # Revertir cambio anterior
+                if transaction['tipo_operacion'] in ['RECEPCION', 'DEVOLUCION']:
+                    storage.adjust_stock(stock_key, -transaction['cantidad'])
+                elif transaction['tipo_operacion'] == 'PICKING':
+                    storage.adjust_stock(stock_key, transaction['cantidad'])
+            
+            # Aplicar nueva cantidad si se proporciona
+            nueva_cantidad = data.get('cantidad', transaction['cantidad'])
+            nuevo_tipo = data.get('tipo_operacion', transaction['tipo_operacion'])
+            
+            # Aplicar nueva operación
+            stock = storage.get_stock(stock_key)
+            cantidad_anterior = stock['cantidad']
+            if nuevo_tipo in ['RECEPCION', 'DEVOLUCION']:
+                stock = storage.adjust_stock(stock_key, nueva_cantidad)
+            elif nuevo_tipo == 'PICKING':
+                if cantidad_anterior >= nueva_cantidad:
+                    stock = storage.adjust_stock(stock_key, -nueva_cantidad)
+                else:
+                    # Revertir cambio si no hay stock suficiente
+                    if transaction['tipo_operacion'] in ['RECEPCION', 'DEVOLUCION']:
+                        storage.adjust_stock(stock_key, transaction['cantidad'])
+                    elif transaction['tipo_operacion'] == 'PICKING':
+                        storage.adjust_stock(stock_key, -transaction['cantidad'])
+                    
+                    processing_time = (time.time() - start_time) * 1000
+                    return {
+                        'success': False,
+                        'error': 'Stock insuficiente para la actualización',
+                        'processing_time_ms': processing_time
+                    }
+            
+            # Actualizar la transacción
+            storage.update_transaction(transaction, {
+                'cantidad': nueva_cantidad,
+                'tipo_operacion': nuevo_tipo,
+                'cantidad_anterior': cantidad_anterior,
+                'cantidad_nueva': stock['cantidad'],
+                'estado': 'ACTUALIZADA',
+                'timestamp_actualizacion': time.time_ns(),
+                'operario_actualizacion': data.get('operario_id', transaction['operario_id'])
+            })
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -446,17 +720,19 @@ class InventoryServiceSimulator:
             'transaction_id': transaction_id,
             'processing_time_ms': processing_time,
             'stock_anterior': cantidad_anterior,
-            'stock_nuevo': INVENTORY_STOCK[stock_key]['cantidad'],
+            'stock_nuevo': stock['cantidad'],
             'asr_compliant': processing_time <= 500
         }
     
-    @staticmethod
-    def delete_transaction(transaction_id, operario_id):
+    @classmethod
+    def delete_transaction(cls, transaction_id, operario_id):
         """Cancela/elimina una transacción de inventario"""
         start_time = time.time()
+        storage = cls.storage
         
         # Verificar que la transacción existe
-        if transaction_id not in TRANSACTIONS:
+        transaction = storage.get_transaction(transaction_id)
+        if transaction is None:
             processing_time = (time.time() - start_time) * 1000
             METRICS.append({
                 'operation': 'DELETE_TRANSACTION',
@@ -472,39 +748,39 @@ class InventoryServiceSimulator:
                 'processing_time_ms': processing_time
             }
         
-        transaction = TRANSACTIONS[transaction_id]
-        
-        # Solo permitir cancelar transacciones COMPLETADAS o ACTUALIZADAS
-        if transaction['estado'] not in ['COMPLETADA', 'ACTUALIZADA']:
-            processing_time = (time.time() - start_time) * 1000
-            return {
-                'success': False,
-                'error': 'Solo se pueden cancelar transacciones completadas o actualizadas',
-                'processing_time_ms': processing_time
-            }
-        
-        # Revertir el impacto en el stock
-        producto_id = transaction['producto_id']
-        ubicacion = transaction['ubicacion']
-        stock_key = f"{producto_id}_{ubicacion}"
+        stock_key = f"{transaction['producto_id']}_{transaction['ubicacion']}"
         
-        if stock_key in INVENTORY_STOCK:
-            cantidad_anterior = INVENTORY_STOCK[stock_key]['cantidad']
-            
-            # Revertir operación
-            if transaction['tipo_operacion'] in ['RECEPCION', 'DEVOLUCION']:
-                INVENTORY_STOCK[stock_key]['cantidad'] -= transaction['cantidad']
-            elif transaction['tipo_operacion'] == 'PICKING':
-                INVENTORY_STOCK[stock_key]['cantidad'] += transaction['cantidad']
-            
-            # Marcar transacción como cancelada en lugar de eliminarla completamente
-            transaction.update({
-                'estado': 'CANCELADA',
-                'timestamp_cancelacion': datetime.now().isoformat(),
-                'operario_cancelacion': operario_id,
-                'stock_antes_cancelacion': cantidad_anterior,
-                'stock_despues_cancelacion': INVENTORY_STOCK[stock_key]['cantidad']
-            })
+        with storage.locked([stock_key]):
+            transaction = storage.get_transaction(transaction_id)
+            
+            # Solo permitir cancelar transacciones COMPLETADAS o ACTUALIZADAS
+            if transaction['estado'] not in ['COMPLETADA', 'ACTUALIZADA']:
+                processing_time = (time.time() - start_time) * 1000
+                return {
+                    'success': False,
+                    'error': 'Solo se pueden cancelar transacciones completadas o actualizadas',
+                    'processing_time_ms': processing_time
+                }
+            
+            # Revertir el impacto en el stock
+            stock = storage.get_stock(stock_key)
+            if stock is not None:
+                cantidad_anterior = stock['cantidad']
+                
+                # Revertir operación
+                if transaction['tipo_operacion'] in ['RECEPCION', 'DEVOLUCION']:
+                    stock = storage.adjust_stock(stock_key, -transaction['cantidad'])
+                elif transaction['tipo_operacion'] == 'PICKING':
+                    stock = storage.adjust_stock(stock_key, transaction['cantidad'])
+                
+                # Marcar transacción como cancelada en lugar de eliminarla completamente
+                storage.update_transaction(transaction, {
+                    'estado': 'CANCELADA',
+                    'timestamp_cancelacion': time.time_ns(),
+                    'operario_cancelacion': operario_id,
+                    'stock_antes_cancelacion': cantidad_anterior,
+                    'stock_despues_cancelacion': stock['cantidad']
+                })
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -523,38 +799,47 @@ class InventoryServiceSimulator:
             'processing_time_ms': processing_time,
             'estado_anterior': 'COMPLETADA' if 'timestamp_actualizacion' not in transaction else 'ACTUALIZADA',
             'estado_nuevo': 'CANCELADA',
-            'stock_revertido': INVENTORY_STOCK[stock_key]['cantidad'] if stock_key in INVENTORY_STOCK else 0,
+            'stock_revertido': stock['cantidad'] if stock is not None else 0,
             'asr_compliant': processing_time <= 500
         }
 
-    @staticmethod
-    def delete_transaction_flexible(transaction_id, operario_id):
+    @classmethod
+    def delete_transaction_flexible(cls, transaction_id, operario_id):
         """Cancela transacción existente o crea una dummy para cancelar - FLEXIBLE PARA JMETER"""
         start_time = time.time()
+        storage = cls.storage
         
         # Si la transacción no existe, crear una dummy y marcarla como cancelada
-        if transaction_id not in TRANSACTIONS:
+        transaction = storage.get_transaction(transaction_id)
+        created = False
+        if transaction is None:
             # Crear transacción dummy para cancelar
-            transaction = {
-                'id': transaction_id,
-                'producto_id': 'zapatos',
-                'tipo_operacion': 'RECEPCION',
-                'cantidad': 0,
-                'cantidad_anterior': 0,
-                'cantidad_nueva': 0,
-                'ubicacion': 'A1-B1',
-                'operario_id': operario_id,
-                'estado': 'CANCELADA_DUMMY',
-                'timestamp': datetime.now().isoformat(),
-                'timestamp_cancelacion': datetime.now().isoformat(),
-                'operario_cancelacion': operario_id,
-                'processing_time_ms': 0,
-                'created_by_delete': True,
-                'stock_antes_cancelacion': 0,
-                'stock_despues_cancelacion': 0
-            }
-            
-            TRANSACTIONS[transaction_id] = transaction
+            with storage.locked(['zapatos_A1-B1']):
+                # Registrarla dentro del lock y solo si nadie la creó mientras tanto
+                transaction = storage.get_transaction(transaction_id)
+                if transaction is None:
+                    transaction = {
+                        'id': transaction_id,
+                        'producto_id': 'zapatos',
+                        'tipo_operacion': 'RECEPCION',
+                        'cantidad': 0,
+                        'cantidad_anterior': 0,
+                        'cantidad_nueva': 0,
+                        'ubicacion': 'A1-B1',
+                        'operario_id': operario_id,
+                        'estado': 'CANCELADA_DUMMY',
+                        'timestamp': time.time_ns(),
+                        'timestamp_cancelacion': time.time_ns(),
+                        'operario_cancelacion': operario_id,
+                        'processing_time_ms': 0,
+                        'created_by_delete': True,
+                        'stock_antes_cancelacion': 0,
+                        'stock_despues_cancelacion': 0
+                    }
+                    
+                    storage.save_transaction(transaction)
+                    created = True
+        if created:
             processing_time = (time.time() - start_time) * 1000
             
             # Registrar métrica
@@ -578,48 +863,48 @@ class InventoryServiceSimulator:
             }
         
         # Si existe, usar lógica de cancelación normal pero más flexible
-        transaction = TRANSACTIONS[transaction_id]
-        
-        # Permitir cancelar cualquier estado (más flexible que la versión original)
-        if transaction['estado'] != 'CANCELADA':
-            # Revertir el impacto en el stock solo si no es dummy
-            if not transaction.get('created_by_delete', False):
-                producto_id = transaction['producto_id']
-                ubicacion = transaction['ubicacion']
-                stock_key = f"{producto_id}_{ubicacion}"
-                
-                if stock_key in INVENTORY_STOCK:
-                    cantidad_anterior = INVENTORY_STOCK[stock_key]['cantidad']
-                    
-                    # Revertir operación
-                    if transaction['tipo_operacion'] in ['RECEPCION', 'DEVOLUCION']:
-                        INVENTORY_STOCK[stock_key]['cantidad'] -= transaction['cantidad']
-                    elif transaction['tipo_operacion'] == 'PICKING':
-                        INVENTORY_STOCK[stock_key]['cantidad'] += transaction['cantidad']
-                    
-                    # Marcar transacción como cancelada
-                    transaction.update({
+        stock_key = f"{transaction['producto_id']}_{transaction['ubicacion']}"
+        
+        with storage.locked([stock_key]):
+            transaction = storage.get_transaction(transaction_id)
+            
+            # Permitir cancelar cualquier estado (más flexible que la versión original)
+            if transaction['estado'] != 'CANCELADA':
+                # Revertir el impacto en el stock solo si no es dummy
+                if not transaction.get('created_by_delete', False):
+                    stock = storage.get_stock(stock_key)
+                    if stock is not None:
+                        cantidad_anterior = stock['cantidad']
+                        
+                        # Revertir operación
+                        if transaction['tipo_operacion'] in ['RECEPCION', 'DEVOLUCION']:
+                            stock = storage.adjust_stock(stock_key, -transaction['cantidad'])
+                        elif transaction['tipo_operacion'] == 'PICKING':
+                            stock = storage.adjust_stock(stock_key, transaction['cantidad'])
+                        
+                        # Marcar transacción como cancelada
+                        storage.update_transaction(transaction, {
+                            'estado': 'CANCELADA_FLEXIBLE',
+                            'timestamp_cancelacion': time.time_ns(),
+                            'operario_cancelacion': operario_id,
+                            'stock_antes_cancelacion': cantidad_anterior,
+                            'stock_despues_cancelacion': stock['cantidad']
+                        })
+                        
+                        stock_final = stock['cantidad']
+                    else:
+                        stock_final = 0
+                else:
+                    # Ya era dummy, solo marcar como cancelada
+                    storage.update_transaction(transaction, {
                         'estado': 'CANCELADA_FLEXIBLE',
-                        'timestamp_cancelacion': datetime.now().isoformat(),
-                        'operario_cancelacion': operario_id,
-                        'stock_antes_cancelacion': cantidad_anterior,
-                        'stock_despues_cancelacion': INVENTORY_STOCK[stock_key]['cantidad']
+                        'timestamp_cancelacion': time.time_ns(),
+                        'operario_cancelacion': operario_id
                     })
-                    
-                    stock_final = INVENTORY_STOCK[stock_key]['cantidad']
-                else:
                     stock_final = 0
             else:
-                # Ya era dummy, solo marcar como cancelada
-                transaction.update({
-                    'estado': 'CANCELADA_FLEXIBLE',
-                    'timestamp_cancelacion': datetime.now().isoformat(),
-                    'operario_cancelacion': operario_id
-                })
-                stock_final = 0
-        else:
-            # Ya estaba cancelada
-            stock_final = transaction.get('stock_despues_cancelacion', 0)
+                # Ya estaba cancelada
+                stock_final = transaction.get('stock_despues_cancelacion', 0)
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -643,19 +928,203 @@ class InventoryServiceSimulator:
             'message': 'Transacción cancelada exitosamente'
         }
 
-# =============================================================================
-# VISTAS DEL API DEL MICROSERVICIO
-# =============================================================================
-
-@method_decorator(csrf_exempt, name='dispatch')
-class TransactionView(View):
-    """API para gestión de transacciones de inventario"""
-    
-    def get(self, request):
-        """Obtiene el historial de transacciones"""
-        try:
-            limit = int(request.GET.get('limit', 50))
-            result = InventoryServiceSimulator.get_transaction_history(limit)
+    @classmethod
+    def reserve_stock(cls, producto_id, ubicacion, cantidad, operario_id, ttl_seconds):
+        """Reserva unidades disponibles hasta que se confirmen, liberen o venza la reserva"""
+        start_time = time.time()
+        stock_key = f"{producto_id}_{ubicacion}"
+        
+        with cls.storage.locked([stock_key]):
+            stock = cls.storage.get_stock(stock_key)
+            if stock is None:
+                return {
+                    'success': False,
+                    'error': 'Producto no encontrado en la ubicación especificada',
+                    'processing_time_ms': (time.time() - start_time) * 1000
+                }
+            
+            disponible = stock['cantidad'] - stock['reservada']
+            if disponible < cantidad:
+                return {
+                    'success': False,
+                    'error': 'Stock insuficiente',
+                    'stock_disponible': disponible,
+                    'cantidad_solicitada': cantidad,
+                    'processing_time_ms': (time.time() - start_time) * 1000
+                }
+            
+            # Vencimiento en epoch: debe seguir valiendo tras un reinicio o en otro worker
+            expires_at = time.time() + ttl_seconds
+            reservation = {
+                'id': _new_reservation_id(),
+                'producto_id': producto_id,
+                'ubicacion': ubicacion,
+                'cantidad': cantidad,
+                'operario_id': operario_id,
+                'expires_at': expires_at,
+                'vence': datetime.fromtimestamp(expires_at).isoformat()
+            }
+            stock = cls.storage.create_hold(stock_key, reservation)
+            cls._schedule_expiry(reservation)
+        
+        processing_time = (time.time() - start_time) * 1000
+        METRICS.append({
+            'operation': 'RESERVE_STOCK',
+            'processing_time_ms': processing_time,
+            'timestamp': datetime.now().isoformat(),
+            'success': True,
+            'asr_compliant': processing_time <= 500
+        })
+        
+        return {
+            'success': True,
+            'reservation_id': reservation['id'],
+            'cantidad_reservada': cantidad,
+            'stock_disponible': stock['cantidad'] - stock['reservada'],
+            'expires_at': reservation['vence'],
+            'processing_time_ms': processing_time,
+            'asr_compliant': processing_time <= 500
+        }
+    
+    @classmethod
+    def _finish_reservation(cls, reservation_id, consume, operario_id=None):
+        """
+        Cierra una reserva activa bajo el lock de su SKU. Con consume=True las
+        unidades salen del stock (picking confirmado); si no, vuelven a estar
+        disponibles. Retorna (reserva, stock) o (None, None) si ya no está activa.
+        """
+        reservation = cls.storage.get_hold(reservation_id)
+        if reservation is None:
+            return None, None
+        stock_key = f"{reservation['producto_id']}_{reservation['ubicacion']}"
+        
+        with cls.storage.locked([stock_key]):
+            # Si otro hilo (u otro worker con SQLite) ya la cerró, no se aplica dos veces
+            reservation, stock = cls.storage.finish_hold(stock_key, reservation_id, consume)
+            if reservation is None:
+                return None, None
+            
+            if consume:
+                cantidad = reservation['cantidad']
+                cls._record_transaction(
+                    _new_transaction_id(), reservation['producto_id'], 'PICKING', cantidad,
+                    reservation['ubicacion'], operario_id or reservation['operario_id'],
+                    stock['cantidad'] + cantidad, stock['cantidad'], time.time(),
+                    extra={'reserva_id': reservation_id}
+                )
+        return reservation, stock
+    
+    @classmethod
+    def confirm_reservation(cls, reservation_id, operario_id):
+        """Confirma el picking de una reserva: descuenta stock y registra la transacción"""
+        start_time = time.time()
+        
+        reservation = cls.storage.get_hold(reservation_id)
+        if reservation is not None and reservation['expires_at'] <= time.time():
+            # Vencida pero aún no procesada por el planificador
+            cls.expire_reservation(reservation_id)
+            reservation = None
+        if reservation is not None:
+            reservation, stock = cls._finish_reservation(reservation_id, consume=True, operario_id=operario_id)
+        
+        processing_time = (time.time() - start_time) * 1000
+        METRICS.append({
+            'operation': 'CONFIRM_RESERVATION',
+            'processing_time_ms': processing_time,
+            'timestamp': datetime.now().isoformat(),
+            'success': reservation is not None,
+            'asr_compliant': processing_time <= 500
+        })
+        
+        if reservation is None:
+            return {
+                'success': False,
+                'error': 'Reserva no encontrada o vencida',
+                'processing_time_ms': processing_time
+            }
+        return {
+            'success': True,
+            'reservation_id': reservation_id,
+            'estado': 'CONFIRMADA',
+            'cantidad': reservation['cantidad'],
+            'stock_nuevo': stock['cantidad'],
+            'processing_time_ms': processing_time,
+            'asr_compliant': processing_time <= 500
+        }
+    
+    @classmethod
+    def release_reservation(cls, reservation_id):
+        """Libera una reserva antes de su vencimiento"""
+        start_time = time.time()
+        reservation, stock = cls._finish_reservation(reservation_id, consume=False)
+        
+        processing_time = (time.time() - start_time) * 1000
+        METRICS.append({
+            'operation': 'RELEASE_RESERVATION',
+            'processing_time_ms': processing_time,
+            'timestamp': datetime.now().isoformat(),
+            'success': reservation is not None,
+            'asr_compliant': processing_time <= 500
+        })
+        
+        if reservation is None:
+            return {
+                'success': False,
+                'error': 'Reserva no encontrada o vencida',
+                'processing_time_ms': processing_time
+            }
+        return {
+            'success': True,
+            'reservation_id': reservation_id,
+            'estado': 'LIBERADA',
+            'cantidad_liberada': reservation['cantidad'],
+            'stock_disponible': stock['cantidad'] - stock['reservada'],
+            'processing_time_ms': processing_time,
+            'asr_compliant': processing_time <= 500
+        }
+    
+    @classmethod
+    def expire_reservation(cls, reservation_id):
+        """Libera una reserva vencida (llamado por el planificador). True si seguía activa"""
+        reservation, _ = cls._finish_reservation(reservation_id, consume=False)
+        return reservation is not None
+    
+    @classmethod
+    def _schedule_expiry(cls, reservation):
+        # El planificador usa el reloj monótono; la reserva guarda epoch
+        remaining = reservation['expires_at'] - time.time()
+        cls.hold_scheduler.schedule(time.monotonic() + remaining, reservation['id'])
+    
+    @classmethod
+    def restore_reservations(cls):
+        """
+        Vuelve a agendar las reservas guardadas en el backend (al arrancar, tras
+        recuperar el estado). Las ya vencidas se liberan de inmediato, así sus
+        unidades no quedan apartadas tras un reinicio o la caída de un worker.
+        """
+        reservations = cls.storage.all_holds()
+        for reservation in reservations:
+            cls._schedule_expiry(reservation)
+        return len(reservations)
+
+# Planificador de vencimientos de reservas (min-heap + hilo de fondo)
+InventoryServiceSimulator.hold_scheduler = HoldScheduler(InventoryServiceSimulator.expire_reservation)
+InventoryServiceSimulator.restore_reservations()
+
+# =============================================================================
+# VISTAS DEL API DEL MICROSERVICIO
+# =============================================================================
+
+@method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(timed_endpoint('transactions'), name='dispatch')
+class TransactionView(View):
+    """API para gestión de transacciones de inventario"""
+    
+    def get(self, request):
+        """Obtiene el historial de transacciones"""
+        try:
+            limit = int(request.GET.get('limit', 50))
+            result = InventoryServiceSimulator.get_transaction_history(limit)
             
             return JsonResponse({
                 'status': 'success',
@@ -669,32 +1138,18 @@ class TransactionView(View):
                 'error': str(e)
             }, status=500)
     
+    @idempotent(IDEMPOTENCY_STORE)
     def post(self, request):
         """Crea una nueva transacción de inventario"""
         try:
             data = json.loads(request.body)
             
-            # Validar campos requeridos
-            required_fields = ['producto_id', 'tipo_operacion', 'cantidad', 'ubicacion', 'operario_id']
-            for field in required_fields:
-                if field not in data:
-                    return JsonResponse({
-                        'status': 'error',
-                        'error': f'Campo requerido faltante: {field}'
-                    }, status=400)
-            
-            # Validar tipo de operación
-            if data['tipo_operacion'] not in ['RECEPCION', 'PICKING', 'DEVOLUCION']:
+            # Validar campos requeridos, tipo de operación y cantidad
+            validation_error = _validate_transaction_data(data)
+            if validation_error:
                 return JsonResponse({
                     'status': 'error',
-                    'error': 'Tipo de operación inválido. Debe ser: RECEPCION, PICKING, o DEVOLUCION'
-                }, status=400)
-            
-            # Validar cantidad
-            if not isinstance(data['cantidad'], int) or data['cantidad'] <= 0:
-                return JsonResponse({
-                    'status': 'error',
-                    'error': 'La cantidad debe ser un número entero positivo'
+                    'error': validation_error
                 }, status=400)
             
             # Crear transacción
@@ -729,6 +1184,7 @@ class TransactionView(View):
                 'error': str(e)
             }, status=500)
     
+    @idempotent(IDEMPOTENCY_STORE)
     def put(self, request):
         """Actualiza una transacción existente de inventario - VERSIÓN FLEXIBLE PARA JMETER"""
         try:
@@ -742,7 +1198,7 @@ class TransactionView(View):
                 }, status=400)
             
             # Validar tipo de operación si se proporciona
-            if 'tipo_operacion' in data and data['tipo_operacion'] not in ['RECEPCION', 'PICKING', 'DEVOLUCION']:
+            if 'tipo_operacion' in data and data['tipo_operacion'] not in VALID_OPERATION_TYPES:
                 return JsonResponse({
                     'status': 'error',
                     'error': 'Tipo de operación inválido. Debe ser: RECEPCION, PICKING, o DEVOLUCION'
@@ -778,6 +1234,7 @@ class TransactionView(View):
                 'error': str(e)
             }, status=500)
     
+    @idempotent(IDEMPOTENCY_STORE)
     def delete(self, request):
         """Cancela/elimina una transacción de inventario - VERSIÓN FLEXIBLE PARA JMETER"""
         try:
@@ -820,6 +1277,442 @@ class TransactionView(View):
             }, status=500)
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(timed_endpoint('transactions_batch'), name='dispatch')
+class BatchTransactionView(View):
+    """API para registrar lotes de transacciones en una sola petición"""
+    
+    def post(self, request):
+        """
+        Crea un lote de transacciones de inventario.
+        
+        Cuerpo: {"transactions": [...], "atomic": true} o directamente una lista.
+        Con atomic=true (por defecto) se aplican todas o ninguna.
+        """
+        try:
+            data = json.loads(request.body)
+            
+            if isinstance(data, list):
+                items, atomic = data, True
+            elif isinstance(data, dict):
+                items, atomic = data.get('transactions'), data.get('atomic', True)
+            else:
+                items, atomic = None, True
+            
+            # "false" (string) sería verdadero: solo se aceptan booleanos JSON
+            if not isinstance(atomic, bool):
+                return JsonResponse({
+                    'status': 'error',
+                    'error': 'El campo atomic debe ser true o false'
+                }, status=400)
+            
+            if not isinstance(items, list) or not items:
+                return JsonResponse({
+                    'status': 'error',
+                    'error': 'Se requiere una lista no vacía de transacciones'
+                }, status=400)
+            
+            if len(items) > MAX_BATCH_SIZE:
+                return JsonResponse({
+                    'status': 'error',
+                    'error': f'El lote excede el máximo de {MAX_BATCH_SIZE} transacciones'
+                }, status=400)
+            
+            # Validar todo el lote antes de tocar el stock
+            validation_errors = []
+            for index, item in enumerate(items):
+                error = _validate_transaction_data(item)
+                if error:
+                    validation_errors.append({'index': index, 'success': False, 'error': error})
+            
+            if validation_errors and atomic:
+                return JsonResponse({
+                    'status': 'error',
+                    'error': 'El lote contiene transacciones inválidas',
+                    'results': validation_errors
+                }, status=400)
+            
+            invalid_indexes = {error['index'] for error in validation_errors}
+            valid_items = [item for index, item in enumerate(items) if index not in invalid_indexes]
+            valid_indexes = [index for index in range(len(items)) if index not in invalid_indexes]
+            
+            if valid_items:
+                result = InventoryServiceSimulator.create_transactions_batch(valid_items, atomic=atomic)
+            else:
+                result = {'results': [], 'processing_time_ms': 0, 'asr_compliant': True}
+            
+            # Reubicar los resultados en las posiciones originales del lote
+            results = validation_errors[:]
+            for original_index, item_result in zip(valid_indexes, result['results']):
+                item_result['index'] = original_index
+                results.append(item_result)
+            results.sort(key=lambda r: r['index'])
+            
+            applied = sum(1 for r in results if r['success'])
+            if applied == len(items):
+                status_code = 201
+            elif applied:
+                status_code = 207
+            else:
+                status_code = 400
+            
+            return JsonResponse({
+                'status': 'success' if applied == len(items) else ('partial' if applied else 'error'),
+                'data': {
+                    'atomic': atomic,
+                    'total': len(items),
+                    'applied': applied,
+                    'failed': len(items) - applied,
+                    'results': results,
+                    'processing_time_ms': result['processing_time_ms'],
+                    'asr_compliant': result['asr_compliant']
+                }
+            }, status=status_code)
+            
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'status': 'error',
+                'error': 'JSON inválido'
+            }, status=400)
+        except Exception as e:
+            return JsonResponse({
+                'status': 'error',
+                'error': str(e)
+            }, status=500)
+
+@method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(timed_endpoint('reservations'), name='dispatch')
+class ReservationView(View):
+    """API para reservar stock antes del picking"""
+    
+    @idempotent(IDEMPOTENCY_STORE)
+    def post(self, request):
+        """Reserva stock disponible con vencimiento (ttl_seconds opcional)"""
+        try:
+            data = json.loads(request.body)
+            if not isinstance(data, dict):
+                data = {}
+            
+            required_fields = ['producto_id', 'ubicacion', 'cantidad', 'operario_id']
+            for field in required_fields:
+                if field not in data:
+                    return JsonResponse({
+                        'status': 'error',
+                        'error': f'Campo requerido faltante: {field}'
+                    }, status=400)
+            
+            if not isinstance(data['cantidad'], int) or data['cantidad'] <= 0:
+                return JsonResponse({
+                    'status': 'error',
+                    'error': 'La cantidad debe ser un número entero positivo'
+                }, status=400)
+            
+            ttl_seconds = data.get('ttl_seconds', INVENTORY_RESERVATION_CONFIG['default_ttl_seconds'])
+            if (not isinstance(ttl_seconds, (int, float)) or ttl_seconds <= 0
+                    or ttl_seconds > INVENTORY_RESERVATION_CONFIG['max_ttl_seconds']):
+                return JsonResponse({
+                    'status': 'error',
+                    'error': f"ttl_seconds debe estar entre 0 y {INVENTORY_RESERVATION_CONFIG['max_ttl_seconds']}"
+                }, status=400)
+            
+            result = InventoryServiceSimulator.reserve_stock(
+                producto_id=data['producto_id'],
+                ubicacion=data['ubicacion'],
+                cantidad=data['cantidad'],
+                operario_id=data['operario_id'],
+                ttl_seconds=ttl_seconds
+            )
+            
+            if result['success']:
+                return JsonResponse({
+                    'status': 'success',
+                    'data': result
+                }, status=201)
+            return JsonResponse({
+                'status': 'error',
+                'error': result['error'],
+                'data': result
+            }, status=409 if 'stock_disponible' in result else 404)
+            
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'status': 'error',
+                'error': 'JSON inválido'
+            }, status=400)
+        except Exception as e:
+            return JsonResponse({
+                'status': 'error',
+                'error': str(e)
+            }, status=500)
+    
+    @idempotent(IDEMPOTENCY_STORE)
+    def put(self, request):
+        """Confirma una reserva: el picking consume las unidades reservadas"""
+        return self._finish(request, confirm=True)
+    
+    def delete(self, request):
+        """Libera una reserva"""
+        return self._finish(request, confirm=False)
+    
+    def _finish(self, request, confirm):
+        try:
+            data = json.loads(request.body)
+            if not isinstance(data, dict) or 'reservation_id' not in data:
+                return JsonResponse({
+                    'status': 'error',
+                    'error': 'Campo requerido faltante: reservation_id'
+                }, status=400)
+            
+            if confirm:
+                if 'operario_id' not in data:
+                    return JsonResponse({
+                        'status': 'error',
+                        'error': 'Campo requerido faltante: operario_id'
+                    }, status=400)
+                result = InventoryServiceSimulator.confirm_reservation(data['reservation_id'], data['operario_id'])
+            else:
+                result = InventoryServiceSimulator.release_reservation(data['reservation_id'])
+            
+            if result['success']:
+                return JsonResponse({
+                    'status': 'success',
+                    'data': result
+                })
+            return JsonResponse({
+                'status': 'error',
+                'error': result['error'],
+                'processing_time_ms': result['processing_time_ms']
+            }, status=404)
+            
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'status': 'error',
+                'error': 'JSON inválido'
+            }, status=400)
+        except Exception as e:
+            return JsonResponse({
+                'status': 'error',
+                'error': str(e)
+            }, status=500)
+
+@method_decorator(timed_endpoint('stream'), name='dispatch')
+class ChangeStreamView(View):
+    """
+    Stream de cambios de stock y transacciones.
+    
+    - Server-Sent Events (Accept: text/event-stream): cada evento lleva el id
+      `epoch:secuencia` y se reanuda desde el header Last-Event-ID que envía
+      EventSource al reconectar
+    - Long-poll JSON (?poll=1&last_event_id=N&epoch=E&timeout=S): responde
+      apenas hay eventos posteriores a N o al vencer el timeout
+    Sin id de partida se envían solo los cambios nuevos. Si el epoch no es el
+    del flujo actual (el servicio reinició, u otro worker con el backend en
+    memoria) o los eventos pedidos ya no están, se envía un reset con el
+    stock completo y se continúa desde su versión.
+    """
+    
+    def get(self, request):
+        try:
+            epoch, last_event_id = self._parse_event_id(
+                request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'),
+                request.GET.get('epoch')
+            )
+            
+            if request.GET.get('poll') or 'text/event-stream' not in request.headers.get('Accept', ''):
+                timeout = min(float(request.GET.get('timeout', INVENTORY_STREAM_CONFIG['max_poll_seconds'])),
+                              INVENTORY_STREAM_CONFIG['max_poll_seconds'])
+                return self._long_poll(epoch, last_event_id, timeout)
+            
+            response = StreamingHttpResponse(self._event_stream(epoch, last_event_id),
+                                             content_type='text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'  # Evitar buffering en nginx
+            return response
+            
+        except ValueError:
+            return JsonResponse({
+                'status': 'error',
+                'error': 'last_event_id y timeout deben ser numéricos'
+            }, status=400)
+        except Exception as e:
+            return JsonResponse({
+                'status': 'error',
+                'error': str(e)
+            }, status=500)
+    
+    @staticmethod
+    def _parse_event_id(value, epoch=None):
+        """'epoch:N' o N (con el epoch aparte) -> (epoch, N). Sin id: desde el último evento"""
+        if not value:
+            return CHANGE_FEED.epoch, CHANGE_FEED.last_id
+        if ':' in value:
+            epoch, value = value.rsplit(':', 1)
+        return epoch, int(value)
+    
+    @staticmethod
+    def _snapshot():
+        """Stock completo y la versión desde la que siguen los eventos (tomada antes de leer)"""
+        version = CHANGE_FEED.last_id
+        stock = [dict(stock, stock_key=stock_key) for stock_key, stock in
+                 InventoryServiceSimulator.storage.all_stock()]
+        return version, {'epoch': CHANGE_FEED.epoch, 'version': version, 'stock': stock}
+    
+    def _long_poll(self, epoch, last_event_id, timeout):
+        snapshot = None
+        if epoch is not None and epoch != CHANGE_FEED.epoch:
+            events, reset = [], True
+        else:
+            events, reset = CHANGE_FEED.since(last_event_id)
+            if not events and not reset and timeout > 0:
+                CHANGE_FEED.wait(last_event_id, timeout)
+                events, reset = CHANGE_FEED.since(last_event_id)
+        if reset:
+            last_event_id, snapshot = self._snapshot()
+            events, _ = CHANGE_FEED.since(last_event_id)
+        
+        # Los payloads ya están serializados: se concatenan sin volver a codificarlos
+        body = b','.join(
+            b'{"id":%d,"type":"%s","data":%s}' % (event_id, event_type.encode(), payload)
+            for event_id, event_type, payload in events
+        )
+        last = events[-1][0] if events else last_event_id
+        return HttpResponse(
+            b'{"status":"success","data":{"epoch":"%s","last_event_id":%d,"reset":%s,"snapshot":%s,"events":[%s]}}'
+            % (CHANGE_FEED.epoch.encode(), last, b'true' if reset else b'false',
+               dumps(snapshot), body),
+            content_type='application/json'
+        )
+    
+    def _event_stream(self, epoch, last_event_id):
+        deadline = time.monotonic() + INVENTORY_STREAM_CONFIG['max_stream_seconds']
+        current_epoch = CHANGE_FEED.epoch.encode()
+        reset = epoch != CHANGE_FEED.epoch
+        yield b'retry: 3000\n\n'
+        
+        while time.monotonic() < deadline:
+            if reset:
+                last_event_id, snapshot = self._snapshot()
+                yield b'id: %s:%d\nevent: reset\ndata: %s\n\n' % (current_epoch, last_event_id, dumps(snapshot))
+            events, reset = CHANGE_FEED.since(last_event_id)
+            if reset:
+                continue
+            if events:
+                yield b''.join(
+                    b'id: %s:%d\nevent: %s\ndata: %s\n\n' % (current_epoch, event_id, event_type.encode(), payload)
+                    for event_id, event_type, payload in events
+                )
+                last_event_id = events[-1][0]
+            elif not CHANGE_FEED.wait(last_event_id, INVENTORY_STREAM_CONFIG['heartbeat_seconds']):
+                yield b': keepalive\n\n'
+
+@method_decorator(timed_endpoint('stock_changes'), name='dispatch')
+class StockChangesView(View):
+    """
+    Sincronización incremental de stock para réplicas e integraciones.
+    
+    GET ?since=N&epoch=E devuelve solo las SKU-ubicaciones modificadas después
+    de la versión N. Con since=0, si el epoch no coincide (el servicio
+    reinició) o si la versión ya salió del historial, devuelve el inventario
+    completo con full=true, en páginas de `limit` claves: mientras has_more
+    sea true se pide la siguiente con ?since=0&after=<next_after>. Después se
+    sigue con deltas desde la versión de la primera página.
+    """
+    
+    def get(self, request):
+        start_time = time.time()
+        try:
+            since = int(request.GET.get('since', 0))
+            limit = int(request.GET.get('limit', 1000))
+            if since < 0 or limit <= 0:
+                raise ValueError
+        except ValueError:
+            return JsonResponse({
+                'status': 'error',
+                'error': 'since debe ser un entero >= 0 y limit un entero positivo'
+            }, status=400)
+        
+        storage = InventoryServiceSimulator.storage
+        epoch = request.GET.get('epoch')
+        full = since == 0 or (epoch is not None and epoch != CHANGE_FEED.epoch) or not CHANGE_FEED.covers(since)
+        has_more = False
+        next_after = None
+        
+        if full:
+            # La versión se toma antes de leer: lo que cambie durante la lectura vuelve en el siguiente delta
+            version = CHANGE_FEED.last_id
+            page = storage.stock_page(request.GET.get('after'), limit + 1)
+            if len(page) > limit:
+                page, has_more = page[:limit], True
+                next_after = page[-1][0]
+            changes = [dict(stock, stock_key=stock_key) for stock_key, stock in page]
+        else:
+            changed, version = CHANGE_FEED.stock_changes_since(since)
+            if len(changed) > limit:
+                changed, has_more = changed[:limit], True
+                version = changed[-1][1]
+            changes = []
+            for stock_key, stock_version in changed:
+                stock = storage.get_stock(stock_key)
+                if stock is not None:
+                    changes.append({
+                        'stock_key': stock_key,
+                        'producto_id': stock['producto_id'],
+                        'ubicacion': stock['ubicacion'],
+                        'cantidad': stock['cantidad'],
+                        'reservada': stock['reservada'],
+                        'version': stock_version
+                    })
+        
+        processing_time = (time.time() - start_time) * 1000
+        METRICS.append({
+            'operation': 'GET_STOCK_CHANGES',
+            'processing_time_ms': processing_time,
+            'timestamp': datetime.now().isoformat(),
+            'success': True,
+            'asr_compliant': processing_time <= 500
+        })
+        
+        return JsonResponse({
+            'status': 'success',
+            'data': {
+                'epoch': CHANGE_FEED.epoch,
+                'version': version,
+                'full': full,
+                'has_more': has_more,
+                'next_after': next_after,
+                'changes': changes,
+                'processing_time_ms': processing_time
+            }
+        })
+
+@method_decorator(timed_endpoint('low_stock'), name='dispatch')
+class LowStockView(View):
+    """API de SKUs bajo su umbral de stock (STOCK_LOW_WARNING)"""
+    
+    def get(self, request):
+        start_time = time.time()
+        try:
+            limit = int(request.GET.get('limit', 100))
+        except ValueError:
+            return JsonResponse({
+                'status': 'error',
+                'error': 'limit debe ser un entero'
+            }, status=400)
+        
+        skus = LOW_STOCK_DETECTOR.below_threshold(limit)
+        processing_time = (time.time() - start_time) * 1000
+        
+        return JsonResponse({
+            'status': 'success',
+            'data': {
+                'skus': skus,
+                'total': LOW_STOCK_DETECTOR.stats()['skus_below_threshold'],
+                'recent_alerts': list(STOCK_ALERTS)[-20:],
+                'processing_time_ms': processing_time
+            }
+        })
+
+@method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(timed_endpoint('stock_status'), name='dispatch')
 class StockStatusView(View):
     """API para consulta de estado de stock"""
     
@@ -847,6 +1740,7 @@ class StockStatusView(View):
                 'error': str(e)
             }, status=500)
 
+@method_decorator(timed_endpoint('health'), name='dispatch')
 class HealthCheckView(View):
     """Health check del microservicio"""
     
@@ -855,7 +1749,7 @@ class HealthCheckView(View):
         start_time = time.time()
         
         # Calcular estadísticas rápidas
-        recent_metrics = [m for m in METRICS if 'timestamp' in m][-100:]  # Últimas 100 operaciones
+        recent_metrics = [m for m in METRICS[-100:] if 'timestamp' in m]  # Últimas 100 operaciones
         
         if recent_metrics:
             avg_response_time = sum(m['processing_time_ms'] for m in recent_metrics) / len(recent_metrics)
@@ -876,7 +1770,7 @@ class HealthCheckView(View):
             'processing_time_ms': processing_time,
             'asr_compliant': processing_time <= 500,
             'stats': {
-                'total_transactions': len(TRANSACTIONS),
+                'total_transactions': InventoryServiceSimulator.storage.count_transactions(),
                 'total_operations': len(METRICS),
                 'avg_response_time_ms': round(avg_response_time, 2),
                 'success_rate_percent': round(success_rate, 2),
@@ -884,14 +1778,19 @@ class HealthCheckView(View):
                 'asr_target_ms': 500,
                 'concurrent_users_target': 1500
             },
-            'inventory_summary': {
-                'total_products': len(set(v['producto_id'] for v in INVENTORY_STOCK.values())),
-                'total_locations': len(INVENTORY_STOCK),
-                'total_stock': sum(v['cantidad'] for v in INVENTORY_STOCK.values()),
-                'total_reserved': sum(v['reservada'] for v in INVENTORY_STOCK.values())
-            }
+            'inventory_summary': get_inventory_summary(),
+            'storage_backend': InventoryServiceSimulator.storage.name,
+            'persistence': PERSISTENCE.stats() if PERSISTENCE else {'enabled': False},
+            'retention': InventoryServiceSimulator.storage.retention_stats()
+                         if isinstance(InventoryServiceSimulator.storage, MemoryInventoryBackend) else {'enabled': False},
+            'idempotency': IDEMPOTENCY_STORE.stats(),
+            'reservations': dict(InventoryServiceSimulator.hold_scheduler.stats(),
+                                 active=InventoryServiceSimulator.storage.count_holds()),
+            'change_stream': CHANGE_FEED.stats(),
+            'low_stock': LOW_STOCK_DETECTOR.stats()
         })
 
+@method_decorator(timed_endpoint('metrics'), name='dispatch')
 class MetricsView(View):
     """API para métricas del microservicio"""
     
@@ -935,7 +1834,8 @@ class MetricsView(View):
                     'operations': operations,
                     'recent_metrics': recent_metrics,
                     'total_operations': len(METRICS),
-                    'asr_target_ms': 500
+                    'asr_target_ms': 500,
+                    'serialization': serialization_stats()
                 }
             })
             
@@ -0,0 +1,151 @@
+"""
+Tipos de Operación de Inventario
+================================
+
+Reglas comunes al simulador (inventory_microservice_simple.py) y a los
+servicios MySQL síncrono y async (inventory_microservice.py,
+inventory_async.py): qué operaciones existen y cuánto mueven el stock.
+"""
+
+VALID_OPERATION_TYPES = ['RECEPCION', 'PICKING', 'DEVOLUCION']
+
+
+def stock_delta(tipo_operacion, cantidad):
+    """Cambio de stock que produce una operación (None si el tipo es inválido)"""
+    if tipo_operacion in ('RECEPCION', 'DEVOLUCION'):
+        return cantidad
+    if tipo_operacion == 'PICKING':
+        return -cantidad
+    return None
+
+
+def available_stock(cantidad, reservada):
+    """
+    Nivel de stock de una SKU: las unidades disponibles. Es el que ven los
+    pickings y las alertas de stock bajo en los tres servicios
+    """
+    return cantidad - reservada
+
+
+# =============================================================================
+# ESCRITURA DE STOCK EN MYSQL
+# =============================================================================
+
+# Entradas: upsert (crea la SKU si no existe). Salidas: UPDATE condicional y
+# relativo, que no aplica si el disponible no alcanza. En ambos casos la cantidad
+# anterior y la reservada quedan en @cantidad_anterior / @reservada, leídas bajo
+# el mismo lock de fila
+_STOCK_IN_STATEMENT = """
+INSERT INTO productos_inventario (producto_id, ubicacion, cantidad, fecha_creacion)
+VALUES (%(producto_id)s, %(ubicacion)s, %(delta)s, %(timestamp)s)
+ON DUPLICATE KEY UPDATE cantidad = (@cantidad_anterior := cantidad) + VALUES(cantidad),
+                        cantidad_reservada = (@reservada := cantidad_reservada),
+                        fecha_actualizacion = VALUES(fecha_creacion)
+"""
+
+_STOCK_OUT_STATEMENT = """
+UPDATE productos_inventario 
+SET cantidad = (@cantidad_anterior := cantidad) + %(delta)s,
+    cantidad_reservada = (@reservada := cantidad_reservada),
+    fecha_actualizacion = %(timestamp)s 
+WHERE producto_id = %(producto_id)s AND ubicacion = %(ubicacion)s
+  AND cantidad - cantidad_reservada >= %(cantidad)s
+"""
+
+# Evento de alerta en el outbox, solo si la sentencia anterior abrió o cerró la
+# alerta (ROW_COUNT). El nivel evaluado queda en @nivel
+_ALERT_EVENT = """
+INSERT INTO outbox_inventario (evento_id, tipo_evento, datos, creado)
+SELECT %(alert_event_id)s, '{event_type}', JSON_OBJECT(
+           'stock_key', CONCAT(%(producto_id)s, '_', %(ubicacion)s),
+           'producto_id', %(producto_id)s,
+           'ubicacion', %(ubicacion)s,
+           'nivel', @nivel,
+           'umbral', %(umbral)s,
+           'timestamp', %(timestamp_iso)s),
+       %(timestamp)s
+FROM DUAL WHERE ROW_COUNT() > 0
+"""
+
+# Stock, transacción (ya en estado final), evento y alerta de stock bajo en una
+# sola transacción de BD, enviados en un único viaje. Todo depende de @aplicada
+# (filas que tocó la sentencia de stock). La alerta se decide con el estado de
+# alertas_stock_bajo, bajo el lock de fila de la SKU: las escrituras de una SKU
+# se serializan y cada cruce del umbral produce un solo evento, sin importar
+# cuántos workers escriban. INSERT IGNORE (y no ON DUPLICATE KEY UPDATE) porque
+# con CLIENT_FOUND_ROWS un nivel repetido también contaría como fila afectada.
+# Umbral e histéresis: LowStockDetector.threshold_for
+_STOCK_WRITE_BATCH = """
+START TRANSACTION;
+SET @cantidad_anterior = 0, @reservada = 0;
+{stock_statement};
+SET @aplicada = ROW_COUNT();
+INSERT INTO transacciones_inventario 
+(id, producto_id, tipo_operacion, cantidad, cantidad_anterior, cantidad_nueva, 
+ ubicacion, operario_id, timestamp, estado)
+SELECT %(transaction_id)s, %(producto_id)s, %(tipo_operacion)s, %(cantidad)s,
+       @cantidad_anterior, @cantidad_anterior + %(delta)s,
+       %(ubicacion)s, %(operario_id)s, %(timestamp)s, 'COMPLETADA'
+FROM DUAL WHERE @aplicada > 0;
+INSERT INTO outbox_inventario (evento_id, tipo_evento, datos, creado)
+SELECT %(event_id)s, 'INVENTORY_CHANGED', JSON_OBJECT(
+           'transaction_id', %(transaction_id)s,
+           'producto_id', %(producto_id)s,
+           'tipo_operacion', %(tipo_operacion)s,
+           'cantidad_anterior', @cantidad_anterior,
+           'cantidad_nueva', @cantidad_anterior + %(delta)s,
+           'ubicacion', %(ubicacion)s,
+           'timestamp', %(timestamp_iso)s),
+       %(timestamp)s
+FROM DUAL WHERE @aplicada > 0;
+SET @nivel = @cantidad_anterior + %(delta)s - @reservada;
+INSERT IGNORE INTO alertas_stock_bajo (producto_id, ubicacion, nivel, umbral, creada)
+SELECT %(producto_id)s, %(ubicacion)s, @nivel, %(umbral)s, %(timestamp)s
+FROM DUAL WHERE @aplicada > 0 AND @nivel < %(umbral)s;
+{warning_event};
+UPDATE alertas_stock_bajo SET nivel = @nivel
+WHERE producto_id = %(producto_id)s AND ubicacion = %(ubicacion)s
+  AND @aplicada > 0 AND @nivel < %(umbral)s + %(histeresis)s;
+DELETE FROM alertas_stock_bajo
+WHERE producto_id = %(producto_id)s AND ubicacion = %(ubicacion)s
+  AND @aplicada > 0 AND @nivel >= %(umbral)s + %(histeresis)s;
+{resolved_event};
+SELECT @aplicada AS aplicada, @cantidad_anterior AS cantidad_anterior
+"""
+
+
+def stock_write_batch(delta):
+    """
+    Lote MySQL de una transacción de inventario (InventoryService y
+    AsyncInventoryService). El SELECT final retorna (aplicada, cantidad_anterior)
+    """
+    stock_statement = _STOCK_IN_STATEMENT if delta > 0 else _STOCK_OUT_STATEMENT
+    return _STOCK_WRITE_BATCH.format(
+        stock_statement=stock_statement.strip(),
+        warning_event=_ALERT_EVENT.format(event_type='STOCK_LOW_WARNING').strip(),
+        resolved_event=_ALERT_EVENT.format(event_type='STOCK_LOW_RESOLVED').strip()
+    )
+
+
+# Carga inicial de una SKU que ya estaba bajo el umbral al arrancar (stock
+# sembrado o escrito antes de que existieran las alertas). Relee el nivel bajo
+# lock (INSERT ... SELECT bloquea la fila de origen) y, como el lote de
+# escritura, solo emite si INSERT IGNORE abrió la alerta: varios workers pueden
+# correrla a la vez
+_LOW_STOCK_LOAD_BATCH = """
+START TRANSACTION;
+INSERT IGNORE INTO alertas_stock_bajo (producto_id, ubicacion, nivel, umbral, creada)
+SELECT producto_id, ubicacion, (@nivel := cantidad - cantidad_reservada), %(umbral)s, %(timestamp)s
+FROM productos_inventario
+WHERE producto_id = %(producto_id)s AND ubicacion = %(ubicacion)s
+  AND cantidad - cantidad_reservada < %(umbral)s;
+{warning_event};
+SELECT ROW_COUNT() AS abierta
+"""
+
+
+def low_stock_load_batch():
+    """Lote MySQL de la carga inicial de alertas de una SKU. El SELECT final retorna (abierta,)"""
+    return _LOW_STOCK_LOAD_BATCH.format(
+        warning_event=_ALERT_EVENT.format(event_type='STOCK_LOW_WARNING').strip()
+    )
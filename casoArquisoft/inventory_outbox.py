@@ -0,0 +1,250 @@
+"""
+Outbox Transaccional de Eventos de Inventario
+=============================================
+
+Los eventos del servicio MySQL se escriben en la tabla outbox_inventario en
+la misma transacción de BD que el cambio de stock (ver
+InventoryService.create_inventory_transaction), así no pueden perderse ni
+publicarse eventos de cambios revertidos.
+
+OutboxRelay lleva los eventos de la tabla al broker:
+
+- Reclama lotes con SELECT ... FOR UPDATE SKIP LOCKED, por lo que pueden
+  correr varios relays en paralelo sin repartirse el mismo evento
+- Publica el lote en el adaptador de broker y lo marca entregado en la misma
+  transacción. Entrega al menos una vez: si el commit falla después de
+  publicar, el lote se reenvía (los consumidores deduplican por evento_id)
+- Métricas de eventos/segundo sostenidos y de lag (creado -> entregado)
+
+Adaptadores: FileBroker (JSON por línea en un archivo) y SocketBroker (JSON
+por línea sobre TCP) sirven de reemplazo local de RabbitMQ/Kafka/SQS; otro
+broker solo necesita implementar publish_batch().
+
+Ejecución como proceso independiente:
+    python inventory_outbox.py
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from inventory_config import INVENTORY_DATABASE_CONFIG, OUTBOX_CONFIG
+
+
+# =============================================================================
+# ADAPTADORES DE BROKER
+# =============================================================================
+
+def _event_message(event):
+    return json.dumps({
+        'evento_id': event['evento_id'],
+        'tipo_evento': event['tipo_evento'],
+        'datos': json.loads(event['datos']) if isinstance(event['datos'], str) else event['datos'],
+        'creado': event['creado'].isoformat() if isinstance(event['creado'], datetime) else event['creado'],
+    }, default=str)
+
+
+class BrokerAdapter:
+    """Interfaz de un broker: publica un lote completo o lanza una excepción"""
+
+    def publish_batch(self, events):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FileBroker(BrokerAdapter):
+    """Agrega cada evento como una línea JSON y hace fsync por lote"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def publish_batch(self, events):
+        self._file.write(''.join(_event_message(event) + '\n' for event in events))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class SocketBroker(BrokerAdapter):
+    """Envía cada evento como una línea JSON por una conexión TCP persistente"""
+
+    def __init__(self, host, port, timeout=5):
+        self.address = (host, port)
+        self.timeout = timeout
+        self._socket = None
+
+    def publish_batch(self, events):
+        if self._socket is None:
+            self._socket = socket.create_connection(self.address, timeout=self.timeout)
+        try:
+            self._socket.sendall(''.join(_event_message(event) + '\n' for event in events).encode('utf-8'))
+        except OSError:
+            # Reconectar en el siguiente lote; este se reintenta desde el outbox
+            self.close()
+            raise
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+def create_broker(config=OUTBOX_CONFIG):
+    if config['broker'] == 'file':
+        return FileBroker(config['file_path'])
+    if config['broker'] == 'socket':
+        return SocketBroker(config['socket_host'], config['socket_port'])
+    raise ValueError(f"Broker de eventos desconocido: {config['broker']}")
+
+
+# =============================================================================
+# RELAY
+# =============================================================================
+
+class OutboxRelay:
+    """Lleva los eventos pendientes de outbox_inventario al broker"""
+
+    CLAIM_QUERY = """
+    SELECT id, evento_id, tipo_evento, datos, creado
+    FROM outbox_inventario
+    WHERE entregado IS NULL
+    ORDER BY id
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+    """
+
+    def __init__(self, get_connection, broker, batch_size=500, poll_interval_ms=200, rate_window_seconds=60):
+        self.get_connection = get_connection
+        self.broker = broker
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval_ms / 1000.0
+        self.rate_window_seconds = rate_window_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._deliveries = deque()  # (instante, eventos) dentro de la ventana de tasa
+        self._stats = {'delivered': 0, 'batches': 0, 'errors': 0, 'lag_ms_total': 0.0,
+                       'max_lag_ms': 0.0, 'last_lag_ms': None, 'last_error': None}
+
+    def relay_once(self):
+        """Entrega un lote. Retorna cuántos eventos se entregaron"""
+        connection = self.get_connection()
+        cursor = connection.cursor(dictionary=True)
+        try:
+            connection.start_transaction()
+            cursor.execute(self.CLAIM_QUERY, (self.batch_size,))
+            events = cursor.fetchall()
+            if not events:
+                connection.rollback()
+                return 0
+
+            self.broker.publish_batch(events)
+            ids = [event['id'] for event in events]
+            cursor.execute(
+                f"UPDATE outbox_inventario SET entregado = NOW(6) WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                ids
+            )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            connection.close()
+
+        self._record(events)
+        return len(events)
+
+    def _record(self, events):
+        now = datetime.now()
+        lags = [(now - event['creado']).total_seconds() * 1000 for event in events]
+        with self._lock:
+            self._deliveries.append((time.monotonic(), len(events)))
+            self._stats['delivered'] += len(events)
+            self._stats['batches'] += 1
+            self._stats['lag_ms_total'] += sum(lags)
+            self._stats['max_lag_ms'] = max(self._stats['max_lag_ms'], max(lags))
+            self._stats['last_lag_ms'] = round(lags[-1], 3)
+
+    def run(self):
+        """Bucle del relay: lotes seguidos mientras haya pendientes, si no espera poll_interval"""
+        while not self._stop.is_set():
+            try:
+                delivered = self.relay_once()
+            except Exception as e:
+                with self._lock:
+                    self._stats['errors'] += 1
+                    self._stats['last_error'] = str(e)
+                delivered = 0
+            if delivered < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name='inventory-outbox-relay', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.broker.close()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._deliveries and self._deliveries[0][0] < now - self.rate_window_seconds:
+                self._deliveries.popleft()
+            recent = sum(count for _, count in self._deliveries)
+            stats = dict(self._stats)
+        lag_ms_total = stats.pop('lag_ms_total')
+        stats.update({
+            'events_per_second': round(recent / self.rate_window_seconds, 2),
+            'rate_window_seconds': self.rate_window_seconds,
+            'avg_lag_ms': round(lag_ms_total / stats['delivered'], 3) if stats['delivered'] else None,
+            'max_lag_ms': round(stats['max_lag_ms'], 3),
+            'running': self._thread is not None,
+        })
+        return stats
+
+
+def main():
+    import mysql.connector
+
+    def connect():
+        return mysql.connector.connect(
+            host=INVENTORY_DATABASE_CONFIG['HOST'],
+            port=int(INVENTORY_DATABASE_CONFIG['PORT']),
+            database=INVENTORY_DATABASE_CONFIG['NAME'],
+            user=INVENTORY_DATABASE_CONFIG['USER'],
+            password=INVENTORY_DATABASE_CONFIG['PASSWORD']
+        )
+
+    relay = OutboxRelay(connect, create_broker(), batch_size=OUTBOX_CONFIG['batch_size'],
+                        poll_interval_ms=OUTBOX_CONFIG['poll_interval_ms'],
+                        rate_window_seconds=OUTBOX_CONFIG['rate_window_seconds'])
+    print(f"📤 Relay del outbox de inventario -> {OUTBOX_CONFIG['broker']}")
+    relay.start()
+    try:
+        while True:
+            time.sleep(OUTBOX_CONFIG['rate_window_seconds'])
+            print(relay.stats())
+    except KeyboardInterrupt:
+        relay.stop()
+
+
+if __name__ == '__main__':
+    main()
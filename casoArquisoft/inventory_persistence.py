@@ -0,0 +1,457 @@
+"""
+Persistencia del Simulador de Inventario
+========================================
+
+Durabilidad para el estado en memoria de inventory_microservice_simple:
+- WAL binario de solo-anexado con group commit (un fsync por grupo de escrituras)
+- Snapshots compactos periódicos escritos de forma atómica
+- Recuperación al iniciar: mmap del último snapshot + replay de la cola del WAL
+
+Cada registro del WAL es la imagen posterior (after-image) de un registro de
+stock, de una transacción o de una reserva junto con el stock que aparta, por
+lo que el replay es idempotente y permite tomar snapshots "fuzzy" sin detener
+las escrituras.
+"""
+
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+# Tipos de registro
+RECORD_STOCK = 1
+RECORD_TRANSACTION = 2
+RECORD_HOLD = 3  # Reserva creada o cerrada + stock resultante, en un solo registro
+
+# Cabecera de cada registro del WAL: longitud payload, crc32, lsn, tipo
+_RECORD_HEADER = struct.Struct('<IIQB')
+
+# Cabecera del snapshot: magic, lsn, número de registros de stock, de transacciones y
+# de reservas. INVSNAP1 (sin reservas) se sigue pudiendo leer
+_SNAPSHOT_MAGIC = b'INVSNAP2'
+_SNAPSHOT_HEADER = struct.Struct('<8sQIII')
+_SNAPSHOT_V1_MAGIC = b'INVSNAP1'
+_SNAPSHOT_V1_HEADER = struct.Struct('<8sQII')
+
+_STR_LEN = struct.Struct('<H')
+_STOCK_VALUES = struct.Struct('<qq')
+_BLOB_LEN = struct.Struct('<I')
+
+WAL_PATTERN = 'inventory-*.wal'
+SNAPSHOT_NAME = 'inventory.snapshot'
+
+
+# =============================================================================
+# CODIFICACIÓN DE REGISTROS
+# =============================================================================
+
+def _pack_str(value):
+    data = value.encode('utf-8')
+    return _STR_LEN.pack(len(data)) + data
+
+def _unpack_str(buffer, offset):
+    (length,) = _STR_LEN.unpack_from(buffer, offset)
+    offset += _STR_LEN.size
+    return bytes(buffer[offset:offset + length]).decode('utf-8'), offset + length
+
+def encode_stock(stock_key, stock):
+    """Codifica un registro de stock en formato binario compacto"""
+    return (_pack_str(stock_key) + _pack_str(stock['producto_id']) + _pack_str(stock['ubicacion'])
+            + _STOCK_VALUES.pack(stock['cantidad'], stock['reservada']))
+
+def decode_stock(buffer, offset=0):
+    """Decodifica un registro de stock. Retorna (clave, stock, nuevo offset)"""
+    stock_key, offset = _unpack_str(buffer, offset)
+    producto_id, offset = _unpack_str(buffer, offset)
+    ubicacion, offset = _unpack_str(buffer, offset)
+    cantidad, reservada = _STOCK_VALUES.unpack_from(buffer, offset)
+    stock = {'producto_id': producto_id, 'ubicacion': ubicacion,
+             'cantidad': cantidad, 'reservada': reservada}
+    return stock_key, stock, offset + _STOCK_VALUES.size
+
+def encode_transaction(transaction):
+    """Codifica una transacción (JSON compacto, timestamps en ns)"""
+    if hasattr(transaction, 'to_raw'):
+        transaction = transaction.to_raw()
+    return json.dumps(transaction, separators=(',', ':')).encode('utf-8')
+
+def decode_transaction(buffer):
+    """Decodifica una transacción"""
+    return json.loads(bytes(buffer).decode('utf-8'))
+
+def encode_hold(stock_key, stock, hold=None, released=None):
+    """Codifica una reserva creada (hold) o cerrada (released, su id) con el stock resultante"""
+    stock = {field: stock[field] for field in ('producto_id', 'ubicacion', 'cantidad', 'reservada')}
+    record = {'stock_key': stock_key, 'stock': stock}
+    if hold is not None:
+        record['hold'] = hold
+    else:
+        record['released'] = released
+    return json.dumps(record, separators=(',', ':')).encode('utf-8')
+
+
+# =============================================================================
+# WRITE-AHEAD LOG
+# =============================================================================
+
+class WriteAheadLog:
+    """
+    WAL de solo-anexado con group commit.
+
+    append() solo encola el registro en memoria (microsegundos). Un hilo de
+    fondo escribe y hace fsync de todo lo pendiente cada group_commit_ms, de
+    modo que muchas mutaciones comparten un único fsync. Con sync_commit=True
+    append() espera a que su grupo quede en disco.
+    """
+
+    def __init__(self, directory, next_lsn=1, group_commit_ms=5, sync_commit=False):
+        self.directory = directory
+        self.group_commit_interval = group_commit_ms / 1000.0
+        self.sync_commit = sync_commit
+
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._io_lock = threading.Lock()
+        self._buffer = []
+        self._next_lsn = next_lsn
+        self._flushed_lsn = next_lsn - 1
+        self._fsync_count = 0
+        self._file = self._open_segment(next_lsn)
+
+        self._running = True
+        self._stopping = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name='inventory-wal-flusher', daemon=True)
+        self._flusher.start()
+
+    def _open_segment(self, first_lsn):
+        self.segment_path = os.path.join(self.directory, f'inventory-{first_lsn:020d}.wal')
+        return open(self.segment_path, 'ab')
+
+    @property
+    def last_lsn(self):
+        return self._next_lsn - 1
+
+    def append(self, record_type, payload):
+        """Encola un registro y retorna su LSN"""
+        with self._lock:
+            lsn = self._next_lsn
+            self._next_lsn += 1
+            self._buffer.append(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload), lsn, record_type))
+            self._buffer.append(payload)
+
+            if self.sync_commit:
+                while self._flushed_lsn < lsn and self._running:
+                    self._flushed.wait()
+        return lsn
+
+    def flush(self):
+        """Escribe y sincroniza a disco los registros pendientes"""
+        with self._io_lock:
+            self._write_pending()
+
+    def _write_pending(self):
+        # Llamar con _io_lock tomado
+        if self._file.closed:
+            return
+        with self._lock:
+            if not self._buffer:
+                return
+            data = b''.join(self._buffer)
+            self._buffer = []
+            lsn = self._next_lsn - 1
+
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        with self._lock:
+            self._fsync_count += 1
+            self._flushed_lsn = lsn
+            self._flushed.notify_all()
+
+    def rotate(self):
+        """
+        Cierra el segmento actual y abre uno nuevo.
+        Retorna el último LSN del segmento cerrado.
+        """
+        with self._io_lock:
+            with self._lock:
+                data = b''.join(self._buffer)
+                self._buffer = []
+                last_lsn = self._next_lsn - 1
+
+                if data:
+                    self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = self._open_segment(self._next_lsn)
+
+                self._flushed_lsn = last_lsn
+                self._flushed.notify_all()
+        return last_lsn
+
+    def _flush_loop(self):
+        while not self._stopping.wait(self.group_commit_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # Un error aislado no debe detener el group commit de los registros siguientes
+                print(f"Error sincronizando WAL de inventario: {e}")
+
+    def close(self):
+        """Detiene el hilo de group commit, vacía lo pendiente y cierra el segmento"""
+        self._running = False
+        self._stopping.set()
+        self._flusher.join()
+        with self._io_lock:
+            try:
+                self._write_pending()
+            finally:
+                self._file.close()
+        with self._lock:
+            self._flushed.notify_all()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'last_lsn': self._next_lsn - 1,
+                'flushed_lsn': self._flushed_lsn,
+                'pending_records': len(self._buffer) // 2,
+                'fsync_count': self._fsync_count,
+            }
+
+    @staticmethod
+    def read_segment(path):
+        """
+        Itera (lsn, tipo, payload) de un segmento. Se detiene en la primera
+        cola truncada o corrupta (escritura interrumpida por un crash).
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        offset = 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            length, crc, lsn, record_type = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            yield lsn, record_type, payload
+            offset = start + length
+
+
+# =============================================================================
+# PERSISTENCIA DEL SIMULADOR (WAL + SNAPSHOTS)
+# =============================================================================
+
+class InventoryPersistence:
+    """Coordina WAL, snapshots periódicos y recuperación del simulador"""
+
+    def __init__(self, directory, group_commit_ms=5, sync_commit=False, snapshot_every_records=50000):
+        self.directory = directory
+        self.group_commit_ms = group_commit_ms
+        self.sync_commit = sync_commit
+        self.snapshot_every_records = snapshot_every_records
+        self.wal = None
+        self.state_provider = None
+
+        self._records_since_snapshot = 0
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_running = False
+        self._snapshot_count = 0
+        self._last_snapshot_lsn = 0
+        self._recovery_time_ms = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    # -------------------------------------------------------------------------
+    # Recuperación
+    # -------------------------------------------------------------------------
+
+    def recover(self):
+        """
+        Reconstruye el estado desde disco y abre el WAL para nuevas escrituras.
+        Retorna (stock, transacciones, reservas) o (None, None, None) si no hay
+        estado previo.
+        """
+        start_time = time.time()
+        stock, transactions, holds = {}, {}, {}
+        snapshot_lsn = self._load_snapshot(stock, transactions, holds)
+        found_state = snapshot_lsn > 0
+        last_lsn = snapshot_lsn
+
+        for path in self._wal_segments():
+            for lsn, record_type, payload in WriteAheadLog.read_segment(path):
+                last_lsn = max(last_lsn, lsn)
+                if lsn <= snapshot_lsn:
+                    continue
+                found_state = True
+                if record_type == RECORD_STOCK:
+                    stock_key, record, _ = decode_stock(payload)
+                    stock[stock_key] = record
+                elif record_type == RECORD_TRANSACTION:
+                    transaction = decode_transaction(payload)
+                    transactions[transaction['id']] = transaction
+                elif record_type == RECORD_HOLD:
+                    record = json.loads(bytes(payload).decode('utf-8'))
+                    stock[record['stock_key']] = record['stock']
+                    if 'hold' in record:
+                        holds[record['hold']['id']] = record['hold']
+                    else:
+                        holds.pop(record['released'], None)
+
+        self._last_snapshot_lsn = snapshot_lsn
+        self.wal = WriteAheadLog(self.directory, next_lsn=last_lsn + 1,
+                                 group_commit_ms=self.group_commit_ms, sync_commit=self.sync_commit)
+        self._recovery_time_ms = (time.time() - start_time) * 1000
+
+        if not found_state:
+            return None, None, None
+        return stock, transactions, holds
+
+    def _wal_segments(self):
+        return sorted(glob.glob(os.path.join(self.directory, WAL_PATTERN)))
+
+    def _load_snapshot(self, stock, transactions, holds):
+        """Carga el snapshot vía mmap. Retorna su LSN (0 si no existe)"""
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        if not os.path.exists(path) or os.path.getsize(path) < _SNAPSHOT_V1_HEADER.size:
+            return 0
+
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            buffer = memoryview(mapped)
+            try:
+                magic = bytes(buffer[:len(_SNAPSHOT_MAGIC)])
+                if magic == _SNAPSHOT_MAGIC:
+                    _, lsn, stock_count, transaction_count, hold_count = _SNAPSHOT_HEADER.unpack_from(buffer, 0)
+                    offset = _SNAPSHOT_HEADER.size
+                elif magic == _SNAPSHOT_V1_MAGIC:
+                    _, lsn, stock_count, transaction_count = _SNAPSHOT_V1_HEADER.unpack_from(buffer, 0)
+                    hold_count = 0
+                    offset = _SNAPSHOT_V1_HEADER.size
+                else:
+                    return 0
+
+                for _ in range(stock_count):
+                    stock_key, record, offset = decode_stock(buffer, offset)
+                    stock[stock_key] = record
+
+                offset = self._load_blobs(buffer, offset, transaction_count, transactions)
+                self._load_blobs(buffer, offset, hold_count, holds)
+            finally:
+                buffer.release()
+        return lsn
+
+    @staticmethod
+    def _load_blobs(buffer, offset, count, target):
+        """Lee `count` registros JSON con prefijo de longitud en target[id]. Retorna el offset final"""
+        for _ in range(count):
+            (length,) = _BLOB_LEN.unpack_from(buffer, offset)
+            offset += _BLOB_LEN.size
+            record = decode_transaction(buffer[offset:offset + length])
+            target[record['id']] = record
+            offset += length
+        return offset
+
+    # -------------------------------------------------------------------------
+    # Registro de mutaciones
+    # -------------------------------------------------------------------------
+
+    def log_stock(self, stock_key, stock):
+        self.wal.append(RECORD_STOCK, encode_stock(stock_key, stock))
+        self._after_append()
+
+    def log_transaction(self, transaction):
+        self.wal.append(RECORD_TRANSACTION, encode_transaction(transaction))
+        self._after_append()
+
+    def log_hold(self, stock_key, stock, hold=None, released=None):
+        self.wal.append(RECORD_HOLD, encode_hold(stock_key, stock, hold, released))
+        self._after_append()
+
+    def _after_append(self):
+        self._records_since_snapshot += 1
+        if (self._records_since_snapshot >= self.snapshot_every_records
+                and self.state_provider and not self._snapshot_running):
+            self._snapshot_running = True
+            threading.Thread(target=self._background_snapshot, name='inventory-snapshot', daemon=True).start()
+
+    def _background_snapshot(self):
+        try:
+            self.snapshot(*self.state_provider())
+        except OSError as e:
+            print(f"Error generando snapshot de inventario: {e}")
+        finally:
+            self._snapshot_running = False
+
+    # -------------------------------------------------------------------------
+    # Snapshots
+    # -------------------------------------------------------------------------
+
+    def snapshot(self, stock, transactions, holds=None):
+        """
+        Escribe un snapshot compacto y descarta los segmentos de WAL cubiertos.
+
+        Se rota el WAL antes de copiar el estado: toda mutación con LSN mayor
+        al del snapshot queda en el segmento nuevo y se reaplica al recuperar.
+        """
+        with self._snapshot_lock:
+            snapshot_lsn = self.wal.rotate()
+            old_segments = [path for path in self._wal_segments() if path != self.wal.segment_path]
+            self._records_since_snapshot = 0
+
+            stock = dict(stock)
+            transactions = list(transactions.values())
+            holds = list((holds or {}).values())
+
+            path = os.path.join(self.directory, SNAPSHOT_NAME)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, snapshot_lsn, len(stock), len(transactions),
+                                              len(holds)))
+                for stock_key, record in stock.items():
+                    f.write(encode_stock(stock_key, record))
+                for record in transactions + holds:
+                    payload = encode_transaction(record)
+                    f.write(_BLOB_LEN.pack(len(payload)))
+                    f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            self._fsync_directory()
+
+            for segment in old_segments:
+                os.remove(segment)
+
+            self._snapshot_count += 1
+            self._last_snapshot_lsn = snapshot_lsn
+        return snapshot_lsn
+
+    def _fsync_directory(self):
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        if self.wal:
+            self.wal.close()
+
+    def stats(self):
+        stats = self.wal.stats() if self.wal else {}
+        stats.update({
+            'snapshots': self._snapshot_count,
+            'last_snapshot_lsn': self._last_snapshot_lsn,
+            'records_since_snapshot': self._records_since_snapshot,
+            'recovery_time_ms': round(self._recovery_time_ms, 2),
+            'sync_commit': self.sync_commit,
+        })
+        return stats
@@ -0,0 +1,200 @@
+"""
+Pool Elástico de Conexiones MySQL del Microservicio de Inventario
+=================================================================
+
+Reemplaza al MySQLConnectionPool fijo (que lanza un error apenas se agota)
+aplicando INVENTORY_CONNECTION_POOL:
+
+- Hasta pool_size conexiones persistentes y max_overflow adicionales bajo
+  picos; las de overflow se cierran al devolverse si ya hay pool_size ociosas
+- Con todas en uso, get_connection() espera hasta pool_timeout segundos y
+  recién entonces lanza PoolTimeoutError
+- Pre-ping de las conexiones que estuvieron ociosas más de pre_ping_idle_seconds
+  y reciclado de las que superan pool_recycle segundos de vida
+- Métricas públicas (stats): en uso, ociosas, en espera e histograma de
+  tiempos de espera
+
+Las conexiones se abren bajo demanda y las ociosas se reutilizan en orden
+LIFO, así las más usadas se mantienen calientes.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+# Límites superiores (ms) de los buckets del histograma de espera
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+
+class PoolTimeoutError(Exception):
+    """No se liberó ninguna conexión dentro de pool_timeout"""
+
+
+class PooledConnection:
+    """Conexión prestada por el pool: close() la devuelve en lugar de cerrarla"""
+
+    def __init__(self, pool, connection, created_at):
+        self._pool = pool
+        self._connection = connection
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool._release(connection, self._created_at)
+
+
+class ElasticConnectionPool:
+    """Pool de conexiones con overflow, espera acotada, pre-ping y reciclado"""
+
+    def __init__(self, connect, pool_size=20, max_overflow=10, pool_timeout=1.0, pre_ping=True,
+                 pre_ping_idle_seconds=5, pool_recycle=3600, reset_session=True):
+        self.connect = connect
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pre_ping = pre_ping
+        self.pre_ping_idle_seconds = pre_ping_idle_seconds
+        self.pool_recycle = pool_recycle
+        self.reset_session = reset_session
+        self._condition = threading.Condition()
+        self._idle = deque()  # (conexión, creada, ociosa desde)
+        self._open = 0
+        self._waiters = 0
+        self._wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._stats = {'checkouts': 0, 'timeouts': 0, 'opened': 0, 'recycled': 0,
+                       'ping_failures': 0, 'overflow_closed': 0, 'max_in_use': 0}
+
+    @property
+    def max_connections(self):
+        return self.pool_size + self.max_overflow
+
+    def get_connection(self):
+        """Conexión del pool (ociosa, nueva o liberada dentro de pool_timeout)"""
+        start = time.monotonic()
+        deadline = start + self.pool_timeout
+        with self._condition:
+            while not self._idle and self._open >= self.max_connections:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"Sin conexiones libres tras {self.pool_timeout}s ({self.max_connections} en uso)"
+                    )
+                self._waiters += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiters -= 1
+
+            waited_ms = (time.monotonic() - start) * 1000
+            self._wait_histogram[bisect_left(WAIT_BUCKETS_MS, waited_ms)] += 1
+            self._stats['checkouts'] += 1
+            if self._idle:
+                connection, created_at, idle_since = self._idle.pop()
+            else:
+                connection = None
+                self._open += 1
+            self._stats['max_in_use'] = max(self._stats['max_in_use'], self._open - len(self._idle))
+
+        # Validación y apertura fuera del lock (cuestan un viaje a la BD)
+        try:
+            if connection is not None:
+                connection, created_at = self._validate(connection, created_at, idle_since)
+            if connection is None:
+                connection, created_at = self._open_connection()
+        except BaseException:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        return PooledConnection(self, connection, created_at)
+
+    def _open_connection(self):
+        connection = self.connect()
+        with self._condition:
+            self._stats['opened'] += 1
+        return connection, time.monotonic()
+
+    def _validate(self, connection, created_at, idle_since):
+        """Retorna (conexión, creada) o (None, None) si hay que abrir una nueva"""
+        now = time.monotonic()
+        if self.pool_recycle is not None and now - created_at > self.pool_recycle:
+            self._discard(connection)
+            with self._condition:
+                self._stats['recycled'] += 1
+            return None, None
+        if self.pre_ping and now - idle_since > self.pre_ping_idle_seconds:
+            try:
+                connection.ping(reconnect=False)
+            except Exception:
+                self._discard(connection)
+                with self._condition:
+                    self._stats['ping_failures'] += 1
+                return None, None
+        return connection, created_at
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _release(self, connection, created_at):
+        if self.reset_session:
+            try:
+                connection.reset_session()
+            except Exception:
+                # Conexión rota: cerrarla y liberar su lugar
+                self._discard(connection)
+                with self._condition:
+                    self._open -= 1
+                    self._condition.notify()
+                return
+
+        with self._condition:
+            if len(self._idle) >= self.pool_size and not self._waiters:
+                # Overflow: no se conserva más allá de pool_size ociosas
+                self._open -= 1
+                self._stats['overflow_closed'] += 1
+                close = True
+            else:
+                self._idle.append((connection, created_at, time.monotonic()))
+                close = False
+            self._condition.notify()
+        if close:
+            self._discard(connection)
+
+    def warm(self, count=None):
+        """Abre hasta `count` conexiones (por defecto pool_size) y las deja ociosas"""
+        connections = []
+        try:
+            for _ in range(min(self.pool_size if count is None else count, self.max_connections)):
+                connections.append(self.get_connection())
+        finally:
+            for connection in connections:
+                connection.close()
+        return len(connections)
+
+    def stats(self):
+        with self._condition:
+            idle = len(self._idle)
+            stats = dict(self._stats)
+            stats.update({
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'in_use': self._open - idle,
+                'idle': idle,
+                'waiters': self._waiters,
+                'wait_histogram_ms': {
+                    **{f'<={bound}': count for bound, count in zip(WAIT_BUCKETS_MS, self._wait_histogram)},
+                    f'>{WAIT_BUCKETS_MS[-1]}': self._wait_histogram[-1],
+                },
+            })
+        return stats
@@ -0,0 +1,170 @@
+"""
+Publicador Asíncrono de Eventos de Inventario
+=============================================
+
+Saca la escritura de eventos sin transacción de stock propia (alertas de
+stock bajo) del camino de la petición: publish() solo encola y un pool de
+hilos de fondo vacía la cola escribiendo lotes con executemany (un INSERT
+multi-fila por lote) en la tabla outbox_inventario, desde donde el relay de
+inventory_outbox los lleva al broker. Los eventos de las transacciones de
+stock no pasan por aquí: se escriben en el outbox en la misma transacción de BD.
+
+- Cola acotada (inventory_queue): si está llena, publish() espera hasta
+  put_timeout_ms y luego escribe el evento en el hilo de la petición, así la
+  presión se traslada al productor en lugar de perder eventos
+- Cada lote se toma de la cola en orden FIFO
+- Un lote fallido se reintenta solo si `retryable(error)` lo permite; la
+  escritura debe tolerar repetir un lote cuyo commit sí se aplicó (el servicio
+  MySQL usa INSERT IGNORE sobre evento_id)
+- stop() deja de aceptar eventos, espera a los hilos y escribe lo que quede
+  en la cola en orden
+- Métricas de profundidad de la cola y de lag (encolado -> escrito)
+"""
+
+import threading
+import time
+from queue import Empty, Full
+
+_STOP = object()
+
+
+class EventPublisher:
+    """Pool de hilos que vacía una cola acotada de eventos en lotes"""
+
+    def __init__(self, event_queue, write_batch, workers=2, batch_size=200, flush_interval_ms=50,
+                 put_timeout_ms=50, write_retries=3, retryable=None):
+        self.queue = event_queue
+        self.write_batch = write_batch
+        self.workers = workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.put_timeout = put_timeout_ms / 1000.0
+        self.write_retries = write_retries
+        # Sin clasificador se reintenta cualquier error
+        self.retryable = retryable or (lambda error: True)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._accepting = True
+        self._stats = {'published': 0, 'written': 0, 'batches': 0, 'sync_writes': 0, 'failed': 0,
+                       'max_depth': 0, 'lag_ms_total': 0.0, 'max_lag_ms': 0.0, 'last_lag_ms': None}
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if not self._threads:
+                for index in range(self.workers):
+                    thread = threading.Thread(target=self._run, name=f'inventory-events-{index}', daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def publish(self, row):
+        """Encola una fila de outbox_inventario. Retorna False si tuvo que escribirse en línea"""
+        item = (time.monotonic(), row)
+        if self._accepting:
+            self._ensure_started()
+            try:
+                self.queue.put(item, timeout=self.put_timeout)
+            except Full:
+                pass
+            else:
+                with self._stats_lock:
+                    self._stats['published'] += 1
+                    self._stats['max_depth'] = max(self._stats['max_depth'], self.queue.qsize())
+                return True
+
+        # Cola llena (o publicador detenido): escribir en el hilo del productor
+        with self._stats_lock:
+            self._stats['published'] += 1
+            self._stats['sync_writes'] += 1
+        self._write([item])
+        return False
+
+    def _next_batch(self):
+        """Bloquea hasta el primer evento y completa el lote hasta batch_size o flush_interval"""
+        item = self.queue.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except Empty:
+                break
+            if item is _STOP:
+                # Devolver la señal para que este hilo termine tras escribir el lote
+                self.queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._write(batch)
+
+    def _write(self, batch):
+        rows = [row for _, row in batch]
+        for attempt in range(self.write_retries):
+            try:
+                self.write_batch(rows)
+                break
+            except Exception as e:
+                if attempt == self.write_retries - 1 or not self.retryable(e):
+                    print(f"Error publicando {len(rows)} eventos: {e}")
+                    with self._stats_lock:
+                        self._stats['failed'] += len(rows)
+                    return
+                time.sleep(0.1 * (attempt + 1))
+
+        now = time.monotonic()
+        lags = [(now - enqueued_at) * 1000 for enqueued_at, _ in batch]
+        with self._stats_lock:
+            self._stats['written'] += len(rows)
+            self._stats['batches'] += 1
+            self._stats['lag_ms_total'] += sum(lags)
+            self._stats['max_lag_ms'] = max(self._stats['max_lag_ms'], max(lags))
+            self._stats['last_lag_ms'] = round(lags[-1], 3)
+
+    def stop(self, timeout=10):
+        """Deja de aceptar eventos y escribe en orden todos los pendientes"""
+        self._accepting = False
+        for _ in self._threads:
+            try:
+                self.queue.put(_STOP, timeout=timeout)
+            except Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+        # Lo que quede (encolado en paralelo con stop o tras hilos que no terminaron)
+        pending = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except Empty:
+                break
+            if item is not _STOP:
+                pending.append(item)
+        for start in range(0, len(pending), self.batch_size):
+            self._write(pending[start:start + self.batch_size])
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lag_ms_total = stats.pop('lag_ms_total')
+        stats.update({
+            'queue_depth': self.queue.qsize(),
+            'queue_capacity': self.queue.maxsize,
+            'workers': len(self._threads),
+            'avg_batch_size': round(stats['written'] / stats['batches'], 2) if stats['batches'] else None,
+            'avg_lag_ms': round(lag_ms_total / stats['written'], 3) if stats['written'] else None,
+            'max_lag_ms': round(stats['max_lag_ms'], 3),
+        })
+        return stats
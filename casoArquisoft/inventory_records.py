@@ -0,0 +1,228 @@
+"""
+Registros Compactos del Simulador de Inventario
+===============================================
+
+Representación en memoria de stock y transacciones pensada para millones de
+registros por worker:
+
+- Clases con __slots__ en lugar de dicts (sin diccionario por instancia)
+- Campos categóricos (producto, ubicación, tipo de operación, estado, operario)
+  internados como códigos enteros pequeños en tablas compartidas
+- Timestamps guardados como epoch en nanosegundos (time.time_ns()); solo se
+  formatean a ISO 8601 al serializar la respuesta
+
+Los registros exponen una interfaz de mapping de solo los campos conocidos
+(record['estado'], record.get(...), 'campo' in record, record.update(...)),
+así el código del simulador los usa igual que los dicts anteriores.
+"""
+
+import sys
+import threading
+from datetime import datetime
+
+
+# =============================================================================
+# INTERNADO DE CAMPOS CATEGÓRICOS
+# =============================================================================
+
+class Interner:
+    """Tabla bidireccional valor <-> código entero"""
+
+    def __init__(self, name):
+        self.name = name
+        self._codes = {}
+        self._values = []
+        self._lock = threading.Lock()
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self._values)
+                    self._values.append(sys.intern(value) if isinstance(value, str) else value)
+                    self._codes[value] = code
+        return code
+
+    def value(self, code):
+        return self._values[code]
+
+    def __len__(self):
+        return len(self._values)
+
+
+PRODUCTOS = Interner('producto_id')
+UBICACIONES = Interner('ubicacion')
+OPERACIONES = Interner('tipo_operacion')
+ESTADOS = Interner('estado')
+OPERARIOS = Interner('operario_id')
+
+
+def interner_stats():
+    """Cantidad de valores distintos por campo internado"""
+    return {interner.name: len(interner) for interner in (PRODUCTOS, UBICACIONES, OPERACIONES, ESTADOS, OPERARIOS)}
+
+
+# =============================================================================
+# TIMESTAMPS
+# =============================================================================
+
+def format_timestamp_ns(timestamp_ns):
+    """Epoch en nanosegundos -> ISO 8601 en hora local (mismo formato que datetime.now().isoformat())"""
+    return datetime.fromtimestamp(timestamp_ns / 1e9).isoformat()
+
+def _to_timestamp_ns(value):
+    """Acepta epoch en ns o un ISO 8601 (registros de WAL/SQLite anteriores)"""
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value).timestamp() * 1e9)
+    return value
+
+def _is_timestamp_field(key):
+    return key.startswith('timestamp')
+
+
+# =============================================================================
+# REGISTRO DE STOCK
+# =============================================================================
+
+class StockRecord:
+    """Stock de un producto en una ubicación"""
+
+    __slots__ = ('_producto', '_ubicacion', 'cantidad', 'reservada')
+
+    def __init__(self, producto_id, ubicacion, cantidad=0, reservada=0):
+        self._producto = PRODUCTOS.code(producto_id)
+        self._ubicacion = UBICACIONES.code(ubicacion)
+        self.cantidad = cantidad
+        self.reservada = reservada
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        return cls(data['producto_id'], data['ubicacion'], data['cantidad'], data['reservada'])
+
+    def __getitem__(self, key):
+        if key == 'producto_id':
+            return PRODUCTOS.value(self._producto)
+        if key == 'ubicacion':
+            return UBICACIONES.value(self._ubicacion)
+        if key in ('cantidad', 'reservada'):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        return {
+            'producto_id': PRODUCTOS.value(self._producto),
+            'ubicacion': UBICACIONES.value(self._ubicacion),
+            'cantidad': self.cantidad,
+            'reservada': self.reservada
+        }
+
+
+# =============================================================================
+# REGISTRO DE TRANSACCIÓN
+# =============================================================================
+
+# Campo público -> (slot, tabla de internado)
+_TRANSACTION_FIELDS = {
+    'id': ('id', None),
+    'producto_id': ('_producto', PRODUCTOS),
+    'tipo_operacion': ('_tipo', OPERACIONES),
+    'cantidad': ('cantidad', None),
+    'cantidad_anterior': ('cantidad_anterior', None),
+    'cantidad_nueva': ('cantidad_nueva', None),
+    'ubicacion': ('_ubicacion', UBICACIONES),
+    'operario_id': ('_operario', OPERARIOS),
+    'estado': ('_estado', ESTADOS),
+    'timestamp': ('timestamp_ns', None),
+    'processing_time_ms': ('processing_time_ms', None),
+}
+
+class TransactionRecord:
+    """
+    Transacción de inventario. Los campos poco frecuentes (actualización,
+    cancelación, marcas de JMeter) van en `extra`, que es None en la mayoría
+    de los registros.
+    """
+
+    __slots__ = tuple(slot for slot, _ in _TRANSACTION_FIELDS.values()) + ('extra',)
+
+    def __init__(self):
+        self.extra = None
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        record = cls()
+        for slot, _ in _TRANSACTION_FIELDS.values():
+            setattr(record, slot, None)
+        record.update(data)
+        return record
+
+    def __getitem__(self, key):
+        field = _TRANSACTION_FIELDS.get(key)
+        if field is None:
+            if self.extra is None or key not in self.extra:
+                raise KeyError(key)
+            value = self.extra[key]
+        else:
+            slot, interner = field
+            value = getattr(self, slot)
+            if interner is not None and value is not None:
+                value = interner.value(value)
+        if _is_timestamp_field(key) and isinstance(value, int):
+            return format_timestamp_ns(value)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in _TRANSACTION_FIELDS or (self.extra is not None and key in self.extra)
+
+    def update(self, changes):
+        for key, value in changes.items():
+            if _is_timestamp_field(key):
+                value = _to_timestamp_ns(value)
+            field = _TRANSACTION_FIELDS.get(key)
+            if field is None:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[sys.intern(key)] = sys.intern(value) if isinstance(value, str) else value
+                continue
+            slot, interner = field
+            if interner is not None and value is not None:
+                value = interner.code(value)
+            setattr(self, slot, value)
+
+    def _items(self):
+        for key, (slot, interner) in _TRANSACTION_FIELDS.items():
+            value = getattr(self, slot)
+            if interner is not None and value is not None:
+                value = interner.value(value)
+            yield key, value
+        if self.extra:
+            yield from self.extra.items()
+
+    def to_raw(self):
+        """Dict con timestamps en ns (para WAL, snapshots y SQLite)"""
+        return dict(self._items())
+
+    def to_dict(self):
+        """Dict para la respuesta del API: aquí se formatean los timestamps"""
+        return {
+            key: format_timestamp_ns(value) if _is_timestamp_field(key) and isinstance(value, int) else value
+            for key, value in self._items()
+        }
@@ -0,0 +1,200 @@
+"""
+Réplicas de Lectura de la Base de Datos de Inventario
+=====================================================
+
+Piezas que usa InventoryDatabaseRouter (inventory_config.py) para enviar las
+lecturas a réplicas y las escrituras al primario:
+
+- ReplicaMonitor: lag de replicación y latencia de cada réplica, medidos
+  como mucho una vez por intervalo (nunca en cada consulta)
+- Read-your-writes: después de una escritura, las lecturas de la misma
+  sesión van al primario durante read_your_writes_seconds. Dentro de la
+  petición el estado vive en un contextvar; entre peticiones viaja en una
+  cookie firmada (InventoryReadYourWritesMiddleware), así no hace falta
+  escribir en la tabla de sesiones
+"""
+
+import contextvars
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from inventory_config import INVENTORY_REPLICA_CONFIG
+
+
+# =============================================================================
+# LAG Y LATENCIA DE LAS RÉPLICAS
+# =============================================================================
+
+def probe_replica(alias):
+    """Lag de la réplica en segundos (None si la replicación está detenida)"""
+    from django.db import DatabaseError, connections
+
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor != 'mysql':
+            # Motores sin replicación (SQLite en desarrollo y tests): solo verificar conexión
+            cursor.execute('SELECT 1')
+            return 0.0
+        try:
+            cursor.execute('SHOW REPLICA STATUS')
+            lag_column = 'Seconds_Behind_Source'
+        except DatabaseError:
+            # MySQL anterior a 8.0.22
+            cursor.execute('SHOW SLAVE STATUS')
+            lag_column = 'Seconds_Behind_Master'
+        row = cursor.fetchone()
+        if row is None:
+            return 0.0  # No es réplica (p. ej. el mismo servidor en desarrollo)
+        lag = dict(zip([column[0] for column in cursor.description], row)).get(lag_column)
+        return None if lag is None else float(lag)
+
+
+class ReplicaMonitor:
+    """Lag y latencia (EWMA) por réplica, refrescados cada interval_seconds"""
+
+    def __init__(self, probe=probe_replica, interval_seconds=5, latency_alpha=0.3, clock=time.monotonic):
+        self.probe = probe
+        self.interval_seconds = interval_seconds
+        self.latency_alpha = latency_alpha
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._probing = set()
+        self._state = {}  # alias -> {'lag_seconds', 'latency_ms', 'checked_at', 'error'}
+
+    def record(self, alias, lag_seconds, latency_ms=None, error=None):
+        with self._lock:
+            state = self._state.setdefault(alias, {'lag_seconds': None, 'latency_ms': None,
+                                                   'checked_at': None, 'error': None})
+            state['lag_seconds'] = lag_seconds
+            state['error'] = error
+            state['checked_at'] = self._clock()
+            if latency_ms is not None:
+                previous = state['latency_ms']
+                state['latency_ms'] = latency_ms if previous is None else (
+                    self.latency_alpha * latency_ms + (1 - self.latency_alpha) * previous
+                )
+
+    def _refresh(self, alias):
+        with self._lock:
+            state = self._state.get(alias)
+            due = state is None or self._clock() - state['checked_at'] >= self.interval_seconds
+            if not due or alias in self._probing:
+                return  # Otro hilo ya la está midiendo: usar el último valor
+            self._probing.add(alias)
+        try:
+            start = time.perf_counter()
+            try:
+                lag = self.probe(alias)
+            except Exception as e:
+                self.record(alias, None, error=str(e))
+            else:
+                self.record(alias, lag, (time.perf_counter() - start) * 1000)
+        finally:
+            with self._lock:
+                self._probing.discard(alias)
+
+    def eligible(self, aliases, max_lag_seconds):
+        """Réplicas conectadas cuyo lag no supera max_lag_seconds"""
+        for alias in aliases:
+            self._refresh(alias)
+        with self._lock:
+            return [alias for alias in aliases
+                    if alias in self._state and self._state[alias]['lag_seconds'] is not None
+                    and self._state[alias]['lag_seconds'] <= max_lag_seconds]
+
+    def latency_ms(self, alias):
+        with self._lock:
+            state = self._state.get(alias)
+            latency = state['latency_ms'] if state else None
+        return float('inf') if latency is None else latency
+
+    def stats(self):
+        with self._lock:
+            return {alias: {
+                'lag_seconds': state['lag_seconds'],
+                'latency_ms': None if state['latency_ms'] is None else round(state['latency_ms'], 3),
+                'error': state['error'],
+            } for alias, state in self._state.items()}
+
+
+# =============================================================================
+# READ-YOUR-WRITES
+# =============================================================================
+
+# Estado de la sesión en la petición en curso: {'last_write': epoch o None, 'wrote': bool}.
+# Es un dict mutable para que las escrituras hechas en hilos de sync_to_async (copias
+# del contexto) sean visibles para el middleware
+_session = contextvars.ContextVar('inventory_read_your_writes', default=None)
+
+PIN_COOKIE = 'inventory_last_write'
+PIN_COOKIE_SALT = 'inventory.read_your_writes'
+
+
+def _current_session():
+    state = _session.get()
+    if state is None:
+        # Fuera de una petición (scripts, shell): el contexto actual hace de sesión
+        state = {'last_write': None, 'wrote': False}
+        _session.set(state)
+    return state
+
+
+def mark_write():
+    """Registra una escritura al primario en la sesión actual"""
+    state = _current_session()
+    state['last_write'] = time.time()
+    state['wrote'] = True
+
+
+def pinned_to_primary(window_seconds):
+    """True si la sesión escribió hace menos de window_seconds"""
+    last_write = _current_session()['last_write']
+    return last_write is not None and time.time() - last_write < window_seconds
+
+
+class InventoryReadYourWritesMiddleware:
+    """Lleva el pin de read-your-writes entre las peticiones de un mismo cliente"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response, config=INVENTORY_REPLICA_CONFIG):
+        self.get_response = get_response
+        self.window_seconds = config['read_your_writes_seconds']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        last_write = request.get_signed_cookie(PIN_COOKIE, default=None, salt=PIN_COOKIE_SALT,
+                                               max_age=self.window_seconds)
+        state = {'last_write': float(last_write) if last_write else None, 'wrote': False}
+        return state, _session.set(state)
+
+    def _finish(self, state, token, response):
+        _session.reset(token)
+        if state['wrote']:
+            response.set_signed_cookie(PIN_COOKIE, str(state['last_write']), salt=PIN_COOKIE_SALT,
+                                       max_age=self.window_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            _session.reset(token)
+            raise
+        return self._finish(state, token, response)
+
+    async def __acall__(self, request):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            _session.reset(token)
+            raise
+        return self._finish(state, token, response)
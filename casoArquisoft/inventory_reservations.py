@@ -0,0 +1,81 @@
+"""
+Reservas de Stock con Vencimiento
+=================================
+
+Planificador de vencimientos para las reservas (holds) del simulador de
+inventario. Cada reserva se agenda en un min-heap por instante de
+vencimiento; un hilo de fondo duerme hasta el próximo vencimiento y libera
+solo las reservas vencidas, así cada vencimiento cuesta O(log n) y nunca se
+recorre el stock completo.
+
+Las reservas confirmadas o liberadas antes de vencer no se borran del heap
+(borrarlas costaría O(n)); su entrada se descarta al salir del heap.
+"""
+
+import heapq
+import threading
+import time
+
+
+class HoldScheduler:
+    """Min-heap de (vencimiento, id de reserva) atendido por un hilo de fondo"""
+
+    def __init__(self, on_expire):
+        self.on_expire = on_expire
+        self._heap = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._expired = 0
+
+    def schedule(self, expires_at, hold_id):
+        """Agenda el vencimiento de una reserva (expires_at en time.monotonic())"""
+        with self._condition:
+            heapq.heappush(self._heap, (expires_at, hold_id))
+            if self._heap[0][1] == hold_id:
+                # Nuevo vencimiento más próximo: despertar al hilo para que recalcule la espera
+                self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='inventory-holds', daemon=True)
+                self._thread.start()
+
+    def pop_due(self, now=None):
+        """Saca del heap las reservas vencidas y retorna sus ids"""
+        now = time.monotonic() if now is None else now
+        due = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def expire_due(self, now=None):
+        """Libera las reservas vencidas. Retorna cuántas seguían activas"""
+        expired = 0
+        for hold_id in self.pop_due(now):
+            if self.on_expire(hold_id):
+                expired += 1
+        with self._condition:
+            self._expired += expired
+        return expired
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+            try:
+                self.expire_due()
+            except Exception as e:
+                print(f"Error liberando reservas vencidas: {e}")
+
+    def stats(self):
+        with self._condition:
+            return {
+                'scheduled': len(self._heap),
+                'expired': self._expired,
+                'next_expiry_in_seconds': round(max(self._heap[0][0] - time.monotonic(), 0), 3)
+                                          if self._heap else None,
+            }
@@ -0,0 +1,131 @@
+"""
+Política de Reintentos del Servicio MySQL de Inventario
+=======================================================
+
+Reintenta unidades de trabajo completas (obtener conexión, ejecutar,
+commit), no sentencias sueltas:
+
+- Solo errores clasificados como transitorios: deadlock (1213), lock wait
+  timeout (1205) y conexión perdida (2006, 2013, 2055)
+- Backoff exponencial con full jitter: espera aleatoria entre 0 y
+  min(max_delay, base * 2^intento), así los reintentos de transacciones que
+  chocaron no vuelven a chocar sincronizados
+- Presupuesto total de latencia (por defecto ASR_CONFIG['max_response_time_ms']):
+  no se reintenta si la espera haría superarlo
+- Contadores de reintentos por motivo para el health check
+
+Un error durante el commit no se reintenta: no se sabe si la transacción
+quedó aplicada (ver CommitOutcomeUnknown).
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+# errno de MySQL -> motivo del reintento
+RETRYABLE_ERRORS = {
+    1213: 'deadlock',
+    1205: 'lock_wait_timeout',
+    2006: 'lost_connection',
+    2013: 'lost_connection',
+    2055: 'lost_connection',
+}
+
+
+class CommitOutcomeUnknown(Exception):
+    """Falló el commit: la transacción pudo o no haberse aplicado"""
+
+
+class RetryPolicy:
+    """Reintentos con backoff exponencial, full jitter y presupuesto de latencia"""
+
+    def __init__(self, max_attempts=4, base_delay_ms=5, max_delay_ms=100, budget_ms=500,
+                 rng=random.random, sleep=time.sleep, clock=time.monotonic):
+        self.max_attempts = max_attempts
+        self.base_delay_ms = base_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.budget_ms = budget_ms
+        self._rng = rng
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats = {'units': 0, 'retries': 0, 'succeeded_after_retry': 0,
+                       'gave_up': 0, 'budget_exhausted': 0}
+        self._retries_by_reason = {}
+
+    @staticmethod
+    def classify(error):
+        """Motivo de reintento del error, o None si no es transitorio"""
+        return RETRYABLE_ERRORS.get(getattr(error, 'errno', None))
+
+    def backoff_ms(self, attempt):
+        """Full jitter: uniforme entre 0 y el tope exponencial del intento (0, 1, 2...)"""
+        return self._rng() * min(self.max_delay_ms, self.base_delay_ms * (2 ** attempt))
+
+    def run(self, unit_of_work):
+        """Ejecuta unit_of_work() reintentándola ante errores transitorios"""
+        start = self._start()
+        attempt = 0
+        while True:
+            try:
+                result = unit_of_work()
+            except Exception as error:
+                attempt += 1
+                self._sleep(self._retry_delay_ms(error, attempt, start) / 1000.0)
+                continue
+            return self._succeeded(result, attempt)
+
+    async def run_async(self, unit_of_work):
+        """Igual que run() para corrutinas: unit_of_work() retorna un awaitable y se espera sin bloquear"""
+        start = self._start()
+        attempt = 0
+        while True:
+            try:
+                result = await unit_of_work()
+            except Exception as error:
+                attempt += 1
+                await asyncio.sleep(self._retry_delay_ms(error, attempt, start) / 1000.0)
+                continue
+            return self._succeeded(result, attempt)
+
+    def _start(self):
+        with self._lock:
+            self._stats['units'] += 1
+        return self._clock()
+
+    def _retry_delay_ms(self, error, attempt, start):
+        """Espera antes de reintentar tras el fallo número `attempt`; relanza el error si no se reintenta"""
+        reason = self.classify(error)
+        if reason is None:
+            raise error
+        if attempt >= self.max_attempts:
+            self._count('gave_up')
+            raise error
+        delay_ms = self.backoff_ms(attempt - 1)
+        if (self._clock() - start) * 1000 + delay_ms > self.budget_ms:
+            self._count('budget_exhausted')
+            raise error
+        with self._lock:
+            self._stats['retries'] += 1
+            self._retries_by_reason[reason] = self._retries_by_reason.get(reason, 0) + 1
+        return delay_ms
+
+    def _succeeded(self, result, attempt):
+        if attempt:
+            self._count('succeeded_after_retry')
+        return result
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['retries_by_reason'] = dict(self._retries_by_reason)
+        stats.update({
+            'max_attempts': self.max_attempts,
+            'budget_ms': self.budget_ms,
+        })
+        return stats
@@ -0,0 +1,757 @@
+"""
+Backends de Almacenamiento del Simulador de Inventario
+======================================================
+
+InventoryServiceSimulator accede al stock y a las transacciones a través de
+un backend intercambiable:
+
+- MemoryInventoryBackend: dicts privados del proceso (comportamiento original,
+  opcionalmente durable con el WAL de inventory_persistence)
+- SQLiteInventoryBackend: base SQLite en modo WAL compartida por todos los
+  workers de gunicorn del nodo, así todos ven un único inventario consistente
+
+Ambos exponen la misma API, incluidas las reservas de stock (holds): cada una
+se guarda junto con las unidades que aparta, así sobreviven a un reinicio y
+las ve cualquier worker. Las secciones que leen y luego modifican stock se
+ejecutan dentro de backend.locked(claves): locks por SKU en memoria, o una
+transacción BEGIN IMMEDIATE en SQLite (serializa escritores entre procesos).
+"""
+
+import bisect
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from inventory_events import stock_event, transaction_event
+from inventory_json import dumps
+from inventory_records import StockRecord, TransactionRecord
+
+
+class MemoryInventoryBackend:
+    """Estado de inventario en memoria del proceso (registros compactos de inventory_records)"""
+
+    name = 'memory'
+
+    def __init__(self, stock, transactions, holds=None):
+        self.stock = stock
+        self.transactions = transactions
+        self.holds = {} if holds is None else holds
+        self.persistence = None
+        self.listeners = []  # Reciben stock_changed/transaction_changed (flujo de cambios, alertas)
+        self._compact_in_place()
+
+        # Retención: orden de llegada de las transacciones calientes y archivo frío
+        self.archive = None
+        self.max_hot_transactions = None
+        self.max_age_seconds = None
+        self.eviction_batch = 1000
+        self._hot_order = deque()
+        self._retention_lock = threading.Lock()
+        self._retention_stop = threading.Event()
+        self._retention_thread = None
+        # Protege altas y bajas en self.transactions (no el contenido de los registros):
+        # recorrer el dict mientras otro hilo inserta o archiva lanza RuntimeError
+        self._transactions_lock = threading.Lock()
+        self._evicted = 0
+
+        # Locks por SKU-ubicación. Se adquieren siempre ordenados por clave, así
+        # operaciones que tocan varios SKUs (lotes) no pueden caer en deadlock
+        self._stock_locks = {}
+        self._stock_locks_guard = threading.Lock()
+
+        # Resumen mantenido incrementalmente en cada mutación de stock
+        self._summary_lock = threading.Lock()
+        self._locations_per_product = {}
+        self._total_stock = 0
+        self._total_reserved = 0
+        self.rebuild_summary()
+
+    def _compact_in_place(self):
+        for stock_key, stock in self.stock.items():
+            self.stock[stock_key] = StockRecord.from_dict(stock)
+        for transaction_id, transaction in self.transactions.items():
+            self.transactions[transaction_id] = TransactionRecord.from_dict(transaction)
+
+    def load(self, stock, transactions, holds=None):
+        """Reemplaza el estado completo (recuperación desde WAL/snapshot)"""
+        self.stock.clear()
+        self.stock.update(stock)
+        self.transactions.clear()
+        self.transactions.update(transactions)
+        self.holds.clear()
+        self.holds.update(holds or {})
+        self._compact_in_place()
+        if self.archive is not None:
+            self._hot_order = deque(self.transactions)
+        self.rebuild_summary()
+
+    def enable_retention(self, archive, max_hot_transactions, max_age_seconds, eviction_batch=1000,
+                         eviction_interval_seconds=None):
+        """
+        Acota las transacciones en memoria; las más viejas pasan a `archive`.
+        Con eviction_interval_seconds un hilo de fondo archiva periódicamente
+        (fuera del camino de las peticiones); si no, se llama enforce_retention().
+        """
+        self.archive = archive
+        self.max_hot_transactions = max_hot_transactions
+        self.max_age_seconds = max_age_seconds
+        self.eviction_batch = eviction_batch
+        self._hot_order = deque(self.transactions)
+        if eviction_interval_seconds and self._retention_thread is None:
+            self._retention_stop.clear()
+            self._retention_thread = threading.Thread(
+                target=self._retention_loop, args=(eviction_interval_seconds,),
+                name='inventory-retention', daemon=True
+            )
+            self._retention_thread.start()
+
+    def stop_retention(self, timeout=10):
+        """Detiene el hilo de archivado de fondo"""
+        self._retention_stop.set()
+        if self._retention_thread is not None:
+            self._retention_thread.join(timeout)
+            self._retention_thread = None
+
+    # -------------------------------------------------------------------------
+    # Concurrencia
+    # -------------------------------------------------------------------------
+
+    def _get_stock_lock(self, stock_key):
+        lock = self._stock_locks.get(stock_key)
+        if lock is None:
+            with self._stock_locks_guard:
+                lock = self._stock_locks.setdefault(stock_key, threading.Lock())
+        return lock
+
+    @contextmanager
+    def locked(self, stock_keys):
+        """Adquiere los locks de varias claves de stock en orden determinista"""
+        locks = [self._get_stock_lock(key) for key in sorted(set(stock_keys))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    # -------------------------------------------------------------------------
+    # Stock
+    # -------------------------------------------------------------------------
+
+    def get_stock(self, stock_key):
+        return self.stock.get(stock_key)
+
+    def stock_for_product(self, producto_id):
+        return [v.to_dict() for v in list(self.stock.values()) if v['producto_id'] == producto_id]
+
+    def all_stock(self):
+        """Todas las SKU-ubicaciones: [(clave, stock)] (sincronización completa)"""
+        return [(stock_key, stock.to_dict()) for stock_key, stock in list(self.stock.items())]
+
+    def stock_page(self, after, limit):
+        """Hasta `limit` SKU-ubicaciones con clave mayor a `after`, ordenadas por clave"""
+        keys = sorted(self.stock)
+        page = []
+        for stock_key in keys[bisect.bisect_right(keys, after) if after else 0:]:
+            stock = self.stock.get(stock_key)
+            if stock is not None:
+                page.append((stock_key, stock.to_dict()))
+                if len(page) == limit:
+                    break
+        return page
+
+    def create_stock(self, stock_key, producto_id, ubicacion, cantidad=0, reservada=0):
+        stock = StockRecord(producto_id, ubicacion, cantidad, reservada)
+        self.stock[stock_key] = stock
+        with self._summary_lock:
+            self._summary_add_record(stock)
+        if self.persistence:
+            self.persistence.log_stock(stock_key, stock)
+        for listener in self.listeners:
+            listener.stock_changed(stock_key, stock)
+        return stock
+
+    def _apply_stock_delta(self, stock_key, delta_cantidad, delta_reservada):
+        stock = self.stock[stock_key]
+        stock.cantidad += delta_cantidad
+        stock.reservada += delta_reservada
+        with self._summary_lock:
+            self._total_stock += delta_cantidad
+            self._total_reserved += delta_reservada
+        return stock
+
+    def adjust_stock(self, stock_key, delta_cantidad=0, delta_reservada=0):
+        stock = self._apply_stock_delta(stock_key, delta_cantidad, delta_reservada)
+        if self.persistence:
+            self.persistence.log_stock(stock_key, stock)
+        for listener in self.listeners:
+            listener.stock_changed(stock_key, stock)
+        return stock
+
+    # -------------------------------------------------------------------------
+    # Reservas (la reserva y su stock van en un mismo registro del WAL)
+    # -------------------------------------------------------------------------
+
+    def get_hold(self, hold_id):
+        return self.holds.get(hold_id)
+
+    def all_holds(self):
+        return list(self.holds.values())
+
+    def count_holds(self):
+        return len(self.holds)
+
+    def create_hold(self, stock_key, hold):
+        """Guarda la reserva y aparta sus unidades (llamar dentro de locked()). Retorna el stock"""
+        stock = self._apply_stock_delta(stock_key, 0, hold['cantidad'])
+        self.holds[hold['id']] = hold
+        if self.persistence:
+            self.persistence.log_hold(stock_key, stock, hold=hold)
+        for listener in self.listeners:
+            listener.stock_changed(stock_key, stock)
+        return stock
+
+    def finish_hold(self, stock_key, hold_id, consume=False):
+        """
+        Cierra la reserva (llamar dentro de locked()): con consume=True sus
+        unidades salen del stock, si no vuelven a estar disponibles. Retorna
+        (reserva, stock) o (None, None) si ya no existe.
+        """
+        hold = self.holds.pop(hold_id, None)
+        if hold is None:
+            return None, None
+        cantidad = hold['cantidad']
+        stock = self._apply_stock_delta(stock_key, -cantidad if consume else 0, -cantidad)
+        if self.persistence:
+            self.persistence.log_hold(stock_key, stock, released=hold_id)
+        for listener in self.listeners:
+            listener.stock_changed(stock_key, stock)
+        return hold, stock
+
+    # -------------------------------------------------------------------------
+    # Transacciones
+    # -------------------------------------------------------------------------
+
+    def get_transaction(self, transaction_id):
+        record = self.transactions.get(transaction_id)
+        if record is None and self.archive is not None:
+            archived = self.archive.get(transaction_id)
+            if archived is not None:
+                record = TransactionRecord.from_dict(archived)
+        return record
+
+    def save_transaction(self, transaction):
+        record = TransactionRecord.from_dict(transaction)
+        with self._transactions_lock:
+            if self.archive is not None and record.id not in self.transactions:
+                self._hot_order.append(record.id)
+            self.transactions[record.id] = record
+        if self.persistence:
+            self.persistence.log_transaction(record.to_raw())
+        for listener in self.listeners:
+            listener.transaction_changed(record)
+        return record
+
+    def update_transaction(self, transaction, changes):
+        transaction.update(changes)
+        # Una transacción leída del archivo vuelve al conjunto caliente al modificarse
+        if self.archive is not None and transaction.id not in self.transactions:
+            with self._transactions_lock:
+                self.transactions[transaction.id] = transaction
+                self._hot_order.append(transaction.id)
+                self._evicted -= 1
+        if self.persistence:
+            self.persistence.log_transaction(transaction.to_raw())
+        for listener in self.listeners:
+            listener.transaction_changed(transaction)
+        return transaction
+
+    def recent_transactions(self, limit):
+        """Últimas transacciones por timestamp, de la más reciente a la más antigua"""
+        # El orden del dict es el de inserción: una transacción archivada que se
+        # modifica vuelve al final aunque sea vieja. Copiar las referencias bajo
+        # el lock y ordenar y serializar fuera de él
+        with self._transactions_lock:
+            records = list(self.transactions.values())
+        records = heapq.nlargest(limit, records, key=lambda record: record.timestamp_ns or 0)
+        return [record.to_dict() for record in records]
+
+    def count_transactions(self):
+        return len(self.transactions) + self._evicted
+
+    # -------------------------------------------------------------------------
+    # Retención
+    # -------------------------------------------------------------------------
+
+    def _must_evict(self, record, cutoff_ns):
+        if len(self.transactions) > self.max_hot_transactions:
+            return True
+        return cutoff_ns is not None and record.timestamp_ns is not None and record.timestamp_ns < cutoff_ns
+
+    def enforce_retention(self):
+        """
+        Mueve al archivo las transacciones más viejas mientras se exceda el
+        límite de cantidad o la de la cabeza supere la antigüedad máxima (se
+        comprueba registro a registro). Se archivan en lotes (un bloque
+        comprimido por lote); si otro hilo ya está archivando no se espera.
+        """
+        if not self._retention_lock.acquire(blocking=False):
+            return 0
+        evicted = 0
+        try:
+            cutoff_ns = time.time_ns() - int(self.max_age_seconds * 1e9) if self.max_age_seconds else None
+            while True:
+                batch = []
+                with self._transactions_lock:
+                    while self._hot_order and len(batch) < self.eviction_batch:
+                        record = self.transactions.get(self._hot_order[0])
+                        if record is not None and not self._must_evict(record, cutoff_ns):
+                            break
+                        self._hot_order.popleft()
+                        if record is not None:
+                            del self.transactions[record.id]
+                            batch.append(record)
+                    self._evicted += len(batch)
+                if not batch:
+                    break
+                self.archive.append([record.to_raw() for record in batch])
+                evicted += len(batch)
+        finally:
+            self._retention_lock.release()
+        return evicted
+
+    def _retention_loop(self, interval_seconds):
+        while not self._retention_stop.wait(interval_seconds):
+            try:
+                self.enforce_retention()
+            except Exception as e:
+                print(f"Error archivando transacciones de inventario: {e}")
+
+    def retention_stats(self):
+        if self.archive is None:
+            return {'enabled': False}
+        stats = {
+            'enabled': True,
+            'hot_transactions': len(self.transactions),
+            'max_hot_transactions': self.max_hot_transactions,
+            'max_age_seconds': self.max_age_seconds,
+            'evicted_transactions': self._evicted,
+        }
+        stats.update(self.archive.stats())
+        return stats
+
+    # -------------------------------------------------------------------------
+    # Resumen
+    # -------------------------------------------------------------------------
+
+    def _summary_add_record(self, stock):
+        producto_id = stock['producto_id']
+        self._locations_per_product[producto_id] = self._locations_per_product.get(producto_id, 0) + 1
+        self._total_stock += stock['cantidad']
+        self._total_reserved += stock['reservada']
+
+    def rebuild_summary(self):
+        """Recalcula el resumen completo (solo al iniciar o tras cargar estado)"""
+        with self._summary_lock:
+            self._locations_per_product = {}
+            self._total_stock = 0
+            self._total_reserved = 0
+            for stock in self.stock.values():
+                self._summary_add_record(stock)
+
+    def summary(self):
+        return {
+            'total_products': len(self._locations_per_product),
+            'total_locations': len(self.stock),
+            'total_stock': self._total_stock,
+            'total_reserved': self._total_reserved
+        }
+
+
+class SQLiteInventoryBackend:
+    """
+    Estado de inventario en SQLite (modo WAL) compartido entre procesos.
+
+    Cada hilo usa su propia conexión. El resumen se mantiene con triggers en
+    la misma transacción que cada cambio de stock, así sigue siendo O(1).
+    Dentro de locked() los listeners se notifican después del COMMIT (y no se
+    notifican si hay ROLLBACK): nunca ven un cambio que no se confirmó.
+
+    Cada cambio se registra además en la tabla `cambios` dentro de la misma
+    transacción: su versión AUTOINCREMENT es la versión del inventario que
+    comparten todos los workers (ver SQLiteChangeFeed en inventory_events).
+    """
+
+    name = 'sqlite'
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS stock (
+        stock_key TEXT PRIMARY KEY,
+        producto_id TEXT NOT NULL,
+        ubicacion TEXT NOT NULL,
+        cantidad INTEGER NOT NULL,
+        reservada INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_stock_producto ON stock (producto_id);
+
+    CREATE TABLE IF NOT EXISTS transacciones (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        id TEXT NOT NULL UNIQUE,
+        datos TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS reservas (
+        id TEXT PRIMARY KEY,
+        datos TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS cambios (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL,
+        stock_key TEXT,
+        datos BLOB NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS meta (
+        clave TEXT PRIMARY KEY,
+        valor TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS resumen (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_productos INTEGER NOT NULL DEFAULT 0,
+        total_ubicaciones INTEGER NOT NULL DEFAULT 0,
+        total_stock INTEGER NOT NULL DEFAULT 0,
+        total_reservada INTEGER NOT NULL DEFAULT 0,
+        total_transacciones INTEGER NOT NULL DEFAULT 0
+    );
+    INSERT OR IGNORE INTO resumen (id) VALUES (1);
+
+    CREATE TABLE IF NOT EXISTS resumen_productos (
+        producto_id TEXT PRIMARY KEY,
+        ubicaciones INTEGER NOT NULL
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_stock_insert AFTER INSERT ON stock
+    BEGIN
+        UPDATE resumen SET
+            total_productos = total_productos + NOT EXISTS (
+                SELECT 1 FROM resumen_productos WHERE producto_id = NEW.producto_id),
+            total_ubicaciones = total_ubicaciones + 1,
+            total_stock = total_stock + NEW.cantidad,
+            total_reservada = total_reservada + NEW.reservada
+        WHERE id = 1;
+        INSERT INTO resumen_productos (producto_id, ubicaciones) VALUES (NEW.producto_id, 1)
+            ON CONFLICT (producto_id) DO UPDATE SET ubicaciones = ubicaciones + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stock_update AFTER UPDATE OF cantidad, reservada ON stock
+    BEGIN
+        UPDATE resumen SET
+            total_stock = total_stock + NEW.cantidad - OLD.cantidad,
+            total_reservada = total_reservada + NEW.reservada - OLD.reservada
+        WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_transacciones_insert AFTER INSERT ON transacciones
+    BEGIN
+        UPDATE resumen SET total_transacciones = total_transacciones + 1 WHERE id = 1;
+    END;
+    """
+
+    def __init__(self, path, seed_stock=None, busy_timeout_ms=5000, change_log_events=10000):
+        self.path = path
+        self.busy_timeout = busy_timeout_ms / 1000.0
+        self.change_log_events = change_log_events
+        self._local = threading.local()
+        self.listeners = []  # Reciben stock_changed/transaction_changed (flujo de cambios, alertas)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        # El epoch identifica la secuencia de versiones de esta base (no de un proceso)
+        conn.execute("INSERT OR IGNORE INTO meta (clave, valor) VALUES ('epoch', ?)", (uuid.uuid4().hex[:12],))
+        if seed_stock:
+            with self.locked([]):
+                if conn.execute("SELECT COUNT(*) FROM stock").fetchone()[0] == 0:
+                    for stock_key, stock in seed_stock.items():
+                        self.create_stock(stock_key, stock['producto_id'], stock['ubicacion'],
+                                          stock['cantidad'], stock['reservada'])
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.pending = []
+        return conn
+
+    def _notify(self, method, *args):
+        """Notifica a los listeners, o lo deja pendiente hasta el COMMIT si hay una transacción abierta"""
+        self._connection()
+        if self._local.depth:
+            self._local.pending.append((method, args))
+            return
+        for listener in self.listeners:
+            getattr(listener, method)(*args)
+
+    def _flush_notifications(self):
+        pending, self._local.pending = self._local.pending, []
+        for method, args in pending:
+            for listener in self.listeners:
+                try:
+                    getattr(listener, method)(*args)
+                except Exception as e:
+                    # El cambio ya está confirmado: un listener con error no debe ocultarlo
+                    print(f"Error notificando cambio de inventario: {e}")
+
+    @contextmanager
+    def locked(self, stock_keys):
+        """
+        Ejecuta el bloque en una transacción BEGIN IMMEDIATE. El lock de
+        escritura de SQLite cubre todas las claves, por lo que no hay orden
+        de adquisición que pueda producir deadlocks.
+        """
+        conn = self._connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield
+        except BaseException:
+            self._local.pending = []
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            try:
+                conn.execute("COMMIT")
+            except BaseException:
+                self._local.pending = []
+                raise
+        finally:
+            self._local.depth = 0
+        self._flush_notifications()
+
+    @contextmanager
+    def snapshot(self):
+        """Lecturas consistentes: una transacción de solo lectura (o la ya abierta por locked())"""
+        conn = self._connection()
+        if self._local.depth:
+            yield
+            return
+        conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            conn.execute("COMMIT")
+
+    def log_change(self, event_type, data, stock_key=None):
+        """Registra un evento en `cambios` (llamar dentro de locked()). Retorna su versión"""
+        version = self._connection().execute(
+            "INSERT INTO cambios (tipo, stock_key, datos) VALUES (?, ?, ?)",
+            (event_type, stock_key, dumps(data))
+        ).lastrowid
+        # Se conservan los últimos change_log_events eventos
+        self._connection().execute("DELETE FROM cambios WHERE version <= ?", (version - self.change_log_events,))
+        return version
+
+    def execute(self, sql, params=()):
+        """
+        Sentencia sobre la conexión de este hilo, para componentes que guardan
+        su estado en la misma base (idempotencia); dentro de locked() forma
+        parte de la misma transacción que los cambios de stock.
+        """
+        return self._connection().execute(sql, params)
+
+    def executescript(self, script):
+        self._connection().executescript(script)
+
+    # -------------------------------------------------------------------------
+    # Stock
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _stock_row(row):
+        if row is None:
+            return None
+        return {'producto_id': row[0], 'ubicacion': row[1], 'cantidad': row[2], 'reservada': row[3]}
+
+    def get_stock(self, stock_key):
+        row = self._connection().execute(
+            "SELECT producto_id, ubicacion, cantidad, reservada FROM stock WHERE stock_key = ?",
+            (stock_key,)
+        ).fetchone()
+        return self._stock_row(row)
+
+    def stock_for_product(self, producto_id):
+        rows = self._connection().execute(
+            "SELECT producto_id, ubicacion, cantidad, reservada FROM stock WHERE producto_id = ?",
+            (producto_id,)
+        ).fetchall()
+        return [self._stock_row(row) for row in rows]
+
+    def all_stock(self):
+        rows = self._connection().execute(
+            "SELECT stock_key, producto_id, ubicacion, cantidad, reservada FROM stock"
+        ).fetchall()
+        return [(row[0], self._stock_row(row[1:])) for row in rows]
+
+    def stock_page(self, after, limit):
+        rows = self._connection().execute(
+            "SELECT stock_key, producto_id, ubicacion, cantidad, reservada FROM stock "
+            "WHERE stock_key > ? ORDER BY stock_key LIMIT ?",
+            (after or '', limit)
+        ).fetchall()
+        return [(row[0], self._stock_row(row[1:])) for row in rows]
+
+    def create_stock(self, stock_key, producto_id, ubicacion, cantidad=0, reservada=0):
+        stock = {'producto_id': producto_id, 'ubicacion': ubicacion, 'cantidad': cantidad, 'reservada': reservada}
+        with self.locked([stock_key]):
+            self._connection().execute(
+                "INSERT INTO stock (stock_key, producto_id, ubicacion, cantidad, reservada) VALUES (?, ?, ?, ?, ?)",
+                (stock_key, producto_id, ubicacion, cantidad, reservada)
+            )
+            self.log_change('stock', stock_event(stock_key, stock), stock_key)
+            self._notify('stock_changed', stock_key, stock)
+        return stock
+
+    def adjust_stock(self, stock_key, delta_cantidad=0, delta_reservada=0):
+        with self.locked([stock_key]):
+            row = self._connection().execute(
+                "UPDATE stock SET cantidad = cantidad + ?, reservada = reservada + ? WHERE stock_key = ? "
+                "RETURNING producto_id, ubicacion, cantidad, reservada",
+                (delta_cantidad, delta_reservada, stock_key)
+            ).fetchone()
+            if row is None:
+                raise KeyError(stock_key)
+            stock = self._stock_row(row)
+            self.log_change('stock', stock_event(stock_key, stock), stock_key)
+            self._notify('stock_changed', stock_key, stock)
+        return stock
+
+    # -------------------------------------------------------------------------
+    # Reservas (en la misma transacción de BD que el stock que apartan)
+    # -------------------------------------------------------------------------
+
+    def get_hold(self, hold_id):
+        row = self._connection().execute("SELECT datos FROM reservas WHERE id = ?", (hold_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def all_holds(self):
+        return [json.loads(row[0]) for row in self._connection().execute("SELECT datos FROM reservas")]
+
+    def count_holds(self):
+        return self._connection().execute("SELECT COUNT(*) FROM reservas").fetchone()[0]
+
+    def create_hold(self, stock_key, hold):
+        """Guarda la reserva y aparta sus unidades (llamar dentro de locked()). Retorna el stock"""
+        self._connection().execute(
+            "INSERT INTO reservas (id, datos) VALUES (?, ?)",
+            (hold['id'], json.dumps(hold, separators=(',', ':')))
+        )
+        return self.adjust_stock(stock_key, delta_reservada=hold['cantidad'])
+
+    def finish_hold(self, stock_key, hold_id, consume=False):
+        """Cierra la reserva (llamar dentro de locked()). Retorna (reserva, stock) o (None, None)"""
+        row = self._connection().execute(
+            "DELETE FROM reservas WHERE id = ? RETURNING datos", (hold_id,)
+        ).fetchone()
+        if row is None:
+            return None, None  # Ya la cerró otro worker
+        hold = json.loads(row[0])
+        cantidad = hold['cantidad']
+        return hold, self.adjust_stock(stock_key, -cantidad if consume else 0, -cantidad)
+
+    # -------------------------------------------------------------------------
+    # Transacciones
+    # -------------------------------------------------------------------------
+
+    def get_transaction(self, transaction_id):
+        row = self._connection().execute(
+            "SELECT datos FROM transacciones WHERE id = ?", (transaction_id,)
+        ).fetchone()
+        return TransactionRecord.from_dict(json.loads(row[0])) if row else None
+
+    def save_transaction(self, transaction):
+        transaction = TransactionRecord.from_dict(transaction)
+        with self.locked([]):
+            self._connection().execute(
+                "INSERT INTO transacciones (id, datos) VALUES (?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET datos = excluded.datos",
+                (transaction.id, json.dumps(transaction.to_raw(), separators=(',', ':')))
+            )
+            self.log_change('transaction', transaction_event(transaction))
+            self._notify('transaction_changed', transaction)
+        return transaction
+
+    def update_transaction(self, transaction, changes):
+        transaction.update(changes)
+        with self.locked([]):
+            self._connection().execute(
+                "UPDATE transacciones SET datos = ? WHERE id = ?",
+                (json.dumps(transaction.to_raw(), separators=(',', ':')), transaction.id)
+            )
+            self.log_change('transaction', transaction_event(transaction))
+            self._notify('transaction_changed', transaction)
+        return transaction
+
+    def recent_transactions(self, limit):
+        rows = self._connection().execute(
+            "SELECT datos FROM transacciones ORDER BY seq DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [TransactionRecord.from_dict(json.loads(row[0])).to_dict() for row in rows]
+
+    def count_transactions(self):
+        return self._connection().execute(
+            "SELECT total_transacciones FROM resumen WHERE id = 1"
+        ).fetchone()[0]
+
+    # -------------------------------------------------------------------------
+    # Resumen
+    # -------------------------------------------------------------------------
+
+    def rebuild_summary(self):
+        """El resumen lo mantienen los triggers; no requiere reconstrucción"""
+
+    def summary(self):
+        row = self._connection().execute(
+            "SELECT total_productos, total_ubicaciones, total_stock, total_reservada FROM resumen WHERE id = 1"
+        ).fetchone()
+        return {
+            'total_products': row[0],
+            'total_locations': row[1],
+            'total_stock': row[2],
+            'total_reserved': row[3]
+        }
+
+
+def create_backend(config, seed_stock, transactions, holds=None):
+    """Crea el backend configurado en INVENTORY_STORAGE_CONFIG"""
+    if config['backend'] == 'sqlite':
+        return SQLiteInventoryBackend(config['sqlite_path'], seed_stock=seed_stock,
+                                      busy_timeout_ms=config['busy_timeout_ms'],
+                                      change_log_events=config['change_log_events'])
+    if config['backend'] == 'memory':
+        return MemoryInventoryBackend(seed_stock, transactions, holds)
+    raise ValueError(f"Backend de inventario desconocido: {config['backend']}")
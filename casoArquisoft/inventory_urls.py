@@ -12,10 +12,19 @@ app_name = 'inventory'
 urlpatterns = [
     # API endpoints para transacciones de inventario
     path('transactions/', inventory_views.TransactionView.as_view(), name='transactions'),
+    path('transactions/batch/', inventory_views.BatchTransactionView.as_view(), name='transactions_batch'),
+    
+    # API endpoints para reservas de stock (reservar, confirmar, liberar)
+    path('reservations/', inventory_views.ReservationView.as_view(), name='reservations'),
     
     # API endpoints para consulta de stock
     path('status/<str:producto_id>/', inventory_views.StockStatusView.as_view(), name='stock_status'),
     path('status/<str:producto_id>/<str:ubicacion>/', inventory_views.StockStatusView.as_view(), name='stock_status_location'),
+    path('stock/changes/', inventory_views.StockChangesView.as_view(), name='stock_changes'),
+    path('alerts/low-stock/', inventory_views.LowStockView.as_view(), name='low_stock'),
+    
+    # Flujo de cambios en vivo para el dashboard (SSE o long-poll)
+    path('stream/', inventory_views.ChangeStreamView.as_view(), name='change_stream'),
     
     # API endpoints para métricas y salud del sistema
     path('health/', inventory_views.HealthCheckView.as_view(), name='health_check'),
@@ -52,6 +52,7 @@ CREATE TABLE IF NOT EXISTS productos_inventario (
     ubicacion VARCHAR(20) NOT NULL,
     cantidad INT NOT NULL DEFAULT 0,
     cantidad_reservada INT NOT NULL DEFAULT 0,
+    pendientes INT NOT NULL DEFAULT 0,  -- Transacciones en PROCESANDO (mantenido por el servicio)
     fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
     UNIQUE KEY uk_producto_ubicacion (producto_id, ubicacion),
@@ -72,9 +73,53 @@ CREATE TABLE IF NOT EXISTS transacciones_inventario (
     tiempo_procesamiento_ms INT,
     
     INDEX idx_producto_fecha (producto_id, timestamp),
+    INDEX idx_timestamp (timestamp),
     INDEX idx_estado (estado)
 );
 
+-- Bases creadas antes del contador pendientes: agregarlo y recalcularlo una sola
+-- vez (MySQL no tiene ADD COLUMN IF NOT EXISTS: se consulta information_schema)
+SET @agregar_pendientes = (
+    SELECT COUNT(*) = 0 FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'productos_inventario' AND COLUMN_NAME = 'pendientes');
+SET @sql_pendientes = IF(@agregar_pendientes,
+    'ALTER TABLE productos_inventario ADD COLUMN pendientes INT NOT NULL DEFAULT 0 AFTER cantidad_reservada',
+    'DO 0');
+PREPARE agregar_pendientes FROM @sql_pendientes;
+EXECUTE agregar_pendientes;
+DEALLOCATE PREPARE agregar_pendientes;
+UPDATE productos_inventario pi SET pendientes = (
+    SELECT COUNT(*) FROM transacciones_inventario ti
+    WHERE ti.producto_id = pi.producto_id AND ti.ubicacion = pi.ubicacion AND ti.estado = 'PROCESANDO')
+WHERE @agregar_pendientes;
+
+-- Outbox de eventos: se escribe en la misma transacción que el stock y el
+-- relay (inventory_outbox.py) lo lleva al broker
+CREATE TABLE IF NOT EXISTS outbox_inventario (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    evento_id VARCHAR(50) NOT NULL,
+    tipo_evento VARCHAR(50) NOT NULL,
+    datos JSON NOT NULL,
+    creado TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    entregado TIMESTAMP(6) NULL,
+    
+    UNIQUE KEY uk_evento (evento_id),
+    INDEX idx_pendientes (entregado, id)
+);
+
+-- SKUs en alerta de stock bajo (disponible bajo el umbral). La mantiene el lote
+-- de escritura del servicio, que emite STOCK_LOW_WARNING / STOCK_LOW_RESOLVED
+-- en el outbox al abrir o cerrar la alerta
+CREATE TABLE IF NOT EXISTS alertas_stock_bajo (
+    producto_id VARCHAR(50) NOT NULL,
+    ubicacion VARCHAR(20) NOT NULL,
+    nivel INT NOT NULL,
+    umbral INT NOT NULL,
+    creada TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    
+    PRIMARY KEY (producto_id, ubicacion)
+);
+
 -- Datos iniciales
 INSERT INTO productos_inventario (producto_id, ubicacion, cantidad) VALUES
 ('zapatos', 'A1-B1', 100),
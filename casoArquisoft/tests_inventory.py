@@ -0,0 +1,1831 @@
+import asyncio
+import json
+import os
+import queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.db import connections, models
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, RequestFactory, override_settings
+from django.views import View
+
+import inventory_async
+import inventory_json
+import inventory_microservice_simple as simulator
+from inventory_alerts import LowStockDetector
+from inventory_archive import TransactionArchive
+from inventory_cache import PolicyCache
+from inventory_engines import InventoryEngine, create_engine
+from inventory_events import ChangeFeed, SQLiteChangeFeed
+from inventory_config import InventoryDatabaseRouter
+from inventory_idempotency import create_idempotency_store, idempotent
+from inventory_ids import IdGenerator, id_timestamp_ms, new_id
+from inventory_outbox import FileBroker, OutboxRelay, SocketBroker
+from inventory_persistence import InventoryPersistence
+from inventory_pool import ElasticConnectionPool, PoolTimeoutError
+from inventory_publisher import EventPublisher
+from inventory_records import TransactionRecord, format_timestamp_ns
+from inventory_replicas import PIN_COOKIE, InventoryReadYourWritesMiddleware, ReplicaMonitor, _session
+from inventory_reservations import HoldScheduler
+from inventory_retry import CommitOutcomeUnknown, RetryPolicy
+from inventory_storage import MemoryInventoryBackend, SQLiteInventoryBackend
+
+
+class InventorySummaryTests(TestCase):
+    """Tests del resumen incremental del inventario usado por el health check"""
+
+    def _brute_force_summary(self):
+        stock = simulator.INVENTORY_STOCK.values()
+        return {
+            'total_products': len(set(v['producto_id'] for v in stock)),
+            'total_locations': len(simulator.INVENTORY_STOCK),
+            'total_stock': sum(v['cantidad'] for v in stock),
+            'total_reserved': sum(v['reservada'] for v in stock),
+        }
+
+    def test_summary_matches_full_scan_after_mutations(self):
+        """El resumen incremental coincide con recorrer todo el stock"""
+        simulator.InventoryServiceSimulator.create_transaction(
+            'zapatos', 'RECEPCION', 5, 'A1-B1', 'TEST_USER'
+        )
+        simulator.InventoryServiceSimulator.update_transaction_flexible(
+            'TXN_TEST_SUMMARY', {'producto_id': 'resumen_test', 'ubicacion': 'Z9-B9',
+                                 'tipo_operacion': 'PICKING', 'cantidad': 150}
+        )
+
+        self.assertEqual(simulator.get_inventory_summary(), self._brute_force_summary())
+
+
+class BatchTransactionTests(TestCase):
+    """Tests del endpoint de lotes de transacciones"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        storage = simulator.InventoryServiceSimulator.storage
+        stock = storage.get_stock('lote_B1-B1')
+        if stock is None:
+            stock = storage.create_stock('lote_B1-B1', 'lote', 'B1-B1')
+        storage.adjust_stock('lote_B1-B1', 10 - stock['cantidad'])
+
+    def _post_batch(self, payload):
+        request = self.factory.post('/api/inventory/transactions/batch/',
+                                    data=json.dumps(payload), content_type='application/json')
+        response = simulator.BatchTransactionView.as_view()(request)
+        return response, json.loads(response.content)
+
+    def _line(self, tipo_operacion, cantidad):
+        return {'producto_id': 'lote', 'ubicacion': 'B1-B1', 'tipo_operacion': tipo_operacion,
+                'cantidad': cantidad, 'operario_id': 'TEST_USER'}
+
+    def test_atomic_batch_applies_nothing_when_a_line_fails(self):
+        """En modo atómico una línea sin stock revierte todo el lote"""
+        response, body = self._post_batch({'transactions': [
+            self._line('PICKING', 8), self._line('PICKING', 5)
+        ]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(body['data']['applied'], 0)
+        self.assertEqual(simulator.InventoryServiceSimulator.storage.get_stock('lote_B1-B1')['cantidad'], 10)
+
+    def test_best_effort_batch_uses_running_balance(self):
+        """Sin atomicidad se aplican las líneas válidas sobre el saldo acumulado"""
+        response, body = self._post_batch({'atomic': False, 'transactions': [
+            self._line('RECEPCION', 5), self._line('PICKING', 20), self._line('PICKING', 15),
+            {'producto_id': 'lote'}
+        ]})
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r['success'] for r in body['data']['results']], [True, False, True, False])
+        self.assertEqual(simulator.InventoryServiceSimulator.storage.get_stock('lote_B1-B1')['cantidad'], 0)
+
+    def test_atomic_flag_must_be_boolean(self):
+        """Un atomic que no es booleano (p. ej. el string "false") se rechaza sin tocar el stock"""
+        response, body = self._post_batch({'atomic': 'false', 'transactions': [self._line('PICKING', 3)]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('atomic', body['error'])
+        self.assertEqual(simulator.InventoryServiceSimulator.storage.get_stock('lote_B1-B1')['cantidad'], 10)
+
+    def test_validation_errors_skip_simulated_latency(self):
+        """Solo las escrituras aplicadas pagan el retraso simulado"""
+        with mock.patch.object(simulator.time, 'sleep') as sleep:
+            failed = simulator.InventoryServiceSimulator.create_transaction('lote', 'PICKING', 500, 'B1-B1', 'OP')
+            self.assertFalse(failed['success'])
+            sleep.assert_not_called()
+            simulator.InventoryServiceSimulator.create_transaction('lote', 'PICKING', 1, 'B1-B1', 'OP')
+            sleep.assert_called_once()
+
+
+class InventoryPersistenceTests(TestCase):
+    """Tests del WAL y los snapshots del simulador"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _stock(self, cantidad):
+        return {'producto_id': 'wal', 'ubicacion': 'W1-B1', 'cantidad': cantidad, 'reservada': 1}
+
+    def test_recovers_snapshot_plus_wal_tail(self):
+        """Tras reiniciar se recupera el snapshot y se reaplica la cola del WAL"""
+        persistence = InventoryPersistence(self.tmp.name, group_commit_ms=1)
+        self.assertEqual(persistence.recover(), (None, None, None))
+
+        persistence.log_stock('wal_W1-B1', self._stock(10))
+        persistence.snapshot({'wal_W1-B1': self._stock(10)}, {})
+        persistence.log_stock('wal_W1-B1', self._stock(7))
+        persistence.log_transaction({'id': 'TXN_WAL', 'estado': 'COMPLETADA'})
+        persistence.close()
+
+        recovered = InventoryPersistence(self.tmp.name)
+        stock, transactions, _ = recovered.recover()
+        recovered.close()
+
+        self.assertEqual(stock['wal_W1-B1']['cantidad'], 7)
+        self.assertEqual(transactions['TXN_WAL']['estado'], 'COMPLETADA')
+
+
+    def test_close_joins_flusher_and_flushes_pending_records(self):
+        """close() detiene el hilo de group commit antes de escribir lo pendiente y cerrar el segmento"""
+        persistence = InventoryPersistence(self.tmp.name, group_commit_ms=60000)
+        persistence.recover()
+        persistence.log_stock('wal_W1-B1', self._stock(3))
+        self.assertEqual(persistence.wal.stats()['pending_records'], 1)
+
+        started = time.time()
+        persistence.close()
+        self.assertLess(time.time() - started, 5)
+        self.assertFalse(persistence.wal._flusher.is_alive())
+        persistence.wal.flush()  # Tras cerrar no hay nada que escribir ni falla
+
+        recovered = InventoryPersistence(self.tmp.name)
+        stock, _, _ = recovered.recover()
+        recovered.close()
+        self.assertEqual(stock['wal_W1-B1']['cantidad'], 3)
+
+    def test_concurrent_put_on_new_id_applies_stock_once(self):
+        """Varios PUT simultáneos sobre un ID nuevo: uno la crea, el resto la actualiza, y el WAL coincide con la memoria"""
+        persistence = InventoryPersistence(self.tmp.name, group_commit_ms=1)
+        persistence.recover()
+        backend = MemoryInventoryBackend({}, {})
+        backend.persistence = persistence
+        service = type('WalWorker', (simulator.InventoryServiceSimulator,), {'storage': backend})
+        barrier = threading.Barrier(8)
+        results = []
+
+        def put():
+            barrier.wait()
+            results.append(service.update_transaction_flexible('TXN_WAL_PUT', {
+                'producto_id': 'wal', 'ubicacion': 'W1-B1', 'tipo_operacion': 'RECEPCION', 'cantidad': 5}))
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, switch_interval)
+        threads = [threading.Thread(target=put) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        persistence.close()
+
+        created = [result for result in results if result.get('message') == 'Nueva transacción creada via PUT']
+        self.assertEqual(len(created), 1)
+        transaction = backend.get_transaction('TXN_WAL_PUT')
+        self.assertEqual(transaction['estado'], 'ACTUALIZADA_FLEXIBLE')
+        self.assertEqual(transaction['cantidad_nueva'], backend.get_stock('wal_W1-B1')['cantidad'])
+
+        recovered = InventoryPersistence(self.tmp.name)
+        stock, transactions, _ = recovered.recover()
+        recovered.close()
+        self.assertEqual(stock['wal_W1-B1']['cantidad'], backend.get_stock('wal_W1-B1')['cantidad'])
+        self.assertEqual(transactions['TXN_WAL_PUT']['cantidad_nueva'], transaction['cantidad_nueva'])
+
+class SQLiteStorageTests(TestCase):
+    """Tests del backend SQLite compartido entre procesos"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = f"{self.tmp.name}/inventory.sqlite3"
+
+    def test_workers_share_stock_and_summary(self):
+        """Dos instancias sobre el mismo archivo ven el mismo inventario"""
+        seed = {'sql_S1-B1': {'producto_id': 'sql', 'ubicacion': 'S1-B1', 'cantidad': 10, 'reservada': 2}}
+        worker_a = SQLiteInventoryBackend(self.path, seed_stock=seed)
+        worker_b = SQLiteInventoryBackend(self.path, seed_stock=seed)
+
+        class WorkerB(simulator.InventoryServiceSimulator):
+            storage = worker_b
+
+        result = WorkerB.create_transaction('sql', 'PICKING', 4, 'S1-B1', 'TEST_USER')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(worker_a.get_stock('sql_S1-B1')['cantidad'], 6)
+        self.assertEqual(worker_a.get_transaction(result['transaction_id'])['cantidad_nueva'], 6)
+        self.assertEqual(worker_a.summary(), {
+            'total_products': 1, 'total_locations': 1, 'total_stock': 6, 'total_reserved': 2
+        })
+        self.assertEqual(worker_a.count_transactions(), 1)
+
+
+class CompactRecordTests(TestCase):
+    """Tests de los registros compactos de transacciones"""
+
+    def _transaction(self, index, timestamp):
+        # Strings nuevos en cada registro, como los que produce json.loads del request
+        return {
+            'id': f'TXN_{index}', 'producto_id': ''.join(['zapa', 'tos']), 'tipo_operacion': 'PICKING',
+            'cantidad': 1, 'cantidad_anterior': 10, 'cantidad_nueva': 9,
+            'ubicacion': ''.join(['A1-', 'B1']), 'operario_id': ''.join(['OP_', '01']),
+            'estado': 'COMPLETADA', 'timestamp': timestamp, 'processing_time_ms': 12.5
+        }
+
+    def _allocated(self, build):
+        tracemalloc.start()
+        try:
+            records = [build(i) for i in range(2000)]
+            size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        del records
+        return size
+
+    def test_round_trip_formats_timestamps_on_serialization(self):
+        """El registro guarda ns y devuelve el mismo dict con ISO 8601"""
+        now_ns = time.time_ns()
+        record = TransactionRecord.from_dict(self._transaction(1, now_ns))
+        record.update({'estado': 'ACTUALIZADA', 'timestamp_actualizacion': now_ns})
+
+        data = record.to_dict()
+        self.assertEqual(data['timestamp'], format_timestamp_ns(now_ns))
+        self.assertEqual(data['timestamp_actualizacion'], format_timestamp_ns(now_ns))
+        self.assertEqual(record['estado'], 'ACTUALIZADA')
+        self.assertEqual(record.to_raw()['timestamp'], now_ns)
+        self.assertIn('timestamp_actualizacion', record)
+
+    def test_records_are_much_smaller_than_dicts(self):
+        """Los registros compactos ocupan varias veces menos que los dicts"""
+        dict_size = self._allocated(lambda i: self._transaction(i, datetime.now().isoformat()))
+        record_size = self._allocated(
+            lambda i: TransactionRecord.from_dict(self._transaction(i, time.time_ns())))
+
+        self.assertLess(record_size * 3, dict_size)
+
+
+class TransactionRetentionTests(TestCase):
+    """Tests de la retención de transacciones y el archivo comprimido"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _transaction(self, index):
+        return {'id': f'TXN_RET_{index}', 'producto_id': 'ret', 'tipo_operacion': 'RECEPCION',
+                'cantidad': index, 'ubicacion': 'R1-B1', 'operario_id': 'TEST_USER',
+                'estado': 'COMPLETADA', 'timestamp': time.time_ns()}
+
+    def test_hot_set_is_bounded_and_archived_ids_are_found(self):
+        """La memoria queda acotada y las transacciones archivadas se encuentran por id"""
+        archive = TransactionArchive(self.tmp.name, segment_max_bytes=2048)
+        backend = MemoryInventoryBackend({}, {})
+        backend.enable_retention(archive, max_hot_transactions=50, max_age_seconds=None, eviction_batch=20)
+
+        for index in range(500):
+            backend.save_transaction(self._transaction(index))
+            if index % 50 == 0:
+                backend.enforce_retention()
+        backend.enforce_retention()
+
+        self.assertLessEqual(len(backend.transactions), 50)
+        self.assertEqual(backend.count_transactions(), 500)
+        self.assertGreater(archive.stats()['segments'], 1)
+        self.assertEqual(backend.get_transaction('TXN_RET_3')['cantidad'], 3)
+        self.assertEqual(backend.get_transaction('TXN_RET_250')['cantidad'], 250)
+        self.assertIsNone(backend.get_transaction('TXN_RET_NO_EXISTE'))
+
+        # Un registro archivado que se modifica vuelve al conjunto caliente
+        backend.update_transaction(backend.get_transaction('TXN_RET_3'), {'estado': 'CANCELADA'})
+        self.assertEqual(backend.get_transaction('TXN_RET_3')['estado'], 'CANCELADA')
+        self.assertEqual(backend.count_transactions(), 500)
+        # ...pero el historial sigue ordenado por timestamp, no por orden de inserción
+        self.assertEqual([t['id'] for t in backend.recent_transactions(3)],
+                         ['TXN_RET_499', 'TXN_RET_498', 'TXN_RET_497'])
+
+        # El índice en disco sobrevive a un reinicio
+        archive.close()
+        reopened = TransactionArchive(self.tmp.name)
+        self.assertEqual(reopened.get('TXN_RET_100')['cantidad'], 100)
+        reopened.close()
+
+    def test_age_limit_is_checked_per_record(self):
+        """Solo se archivan las transacciones vencidas, aunque compartan lote con otras recientes"""
+        archive = TransactionArchive(self.tmp.name)
+        self.addCleanup(archive.close)
+        backend = MemoryInventoryBackend({}, {})
+        backend.enable_retention(archive, max_hot_transactions=1000, max_age_seconds=60, eviction_batch=100)
+
+        for index in range(10):
+            transaction = self._transaction(index)
+            if index < 4:
+                transaction['timestamp'] -= 120 * 10**9
+            backend.save_transaction(transaction)
+
+        self.assertEqual(backend.enforce_retention(), 4)
+        self.assertEqual(sorted(backend.transactions), [f'TXN_RET_{index}' for index in range(4, 10)])
+        self.assertEqual(backend.count_transactions(), 10)
+
+    def test_recent_transactions_while_saving_and_archiving(self):
+        """Listar las últimas transacciones no falla mientras otro hilo guarda y archiva"""
+        archive = TransactionArchive(self.tmp.name)
+        self.addCleanup(archive.close)
+        backend = MemoryInventoryBackend({}, {})
+        backend.enable_retention(archive, max_hot_transactions=200, max_age_seconds=None, eviction_batch=50,
+                                 eviction_interval_seconds=0.001)
+        self.addCleanup(backend.stop_retention)
+        stop = threading.Event()
+        errors = []
+
+        def writer():
+            index = 0
+            while not stop.is_set():
+                backend.save_transaction(self._transaction(index))
+                index += 1
+
+        def reader():
+            while not stop.is_set():
+                try:
+                    backend.recent_transactions(100)
+                except RuntimeError as e:
+                    errors.append(e)
+
+        # Cambios de hilo muy frecuentes para que la carrera aparezca en pocas iteraciones
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, switch_interval)
+        threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.5)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertGreater(archive.stats()['segments'], 0)
+
+
+class IdempotencyKeyTests(TestCase):
+    """Tests del header Idempotency-Key en las escrituras de transacciones"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.payload = json.dumps({'producto_id': 'libro', 'tipo_operacion': 'PICKING', 'cantidad': 1,
+                                   'ubicacion': 'A3-B1', 'operario_id': 'TEST_USER'})
+
+    def _post(self, key, payload=None):
+        request = self.factory.post('/api/inventory/transactions/', data=payload or self.payload,
+                                    content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+        return simulator.TransactionView.as_view()(request)
+
+    def _stock(self):
+        return simulator.InventoryServiceSimulator.storage.get_stock('libro_A3-B1')['cantidad']
+
+    def test_retry_returns_stored_response_without_touching_stock(self):
+        """Un reintento con la misma clave devuelve la misma respuesta y no descuenta stock"""
+        before = self._stock()
+        first = self._post('retry-1')
+        retry = self._post('retry-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(self._stock(), before - 1)
+
+    def test_key_reused_with_different_body_is_rejected(self):
+        """Reusar la clave con otro cuerpo responde 422"""
+        self._post('retry-2')
+        other = json.dumps({'producto_id': 'libro', 'tipo_operacion': 'PICKING', 'cantidad': 2,
+                            'ubicacion': 'A3-B1', 'operario_id': 'TEST_USER'})
+
+        self.assertEqual(self._post('retry-2', other).status_code, 422)
+
+    def _sqlite_worker(self, path):
+        """Vista de picking sobre un backend SQLite propio, como la de otro worker de gunicorn"""
+        backend = SQLiteInventoryBackend(path)
+        store = create_idempotency_store(backend)
+
+        class PickingView(View):
+            @idempotent(store)
+            def post(self, request):
+                with backend.locked(['idem_I1-B1']):
+                    stock = backend.adjust_stock('idem_I1-B1', -1)
+                if stock['cantidad'] < 0:
+                    raise RuntimeError('Stock negativo')
+                return inventory_json.JsonResponse({'stock': stock['cantidad']}, status=201)
+
+        return backend, PickingView.as_view()
+
+    def test_sqlite_keys_are_shared_between_workers(self):
+        """Con SQLite un reintento que llega a otro worker se reconoce y no vuelve a descontar stock"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'idem.sqlite3')
+        backend_a, view_a = self._sqlite_worker(path)
+        backend_b, view_b = self._sqlite_worker(path)
+        with backend_a.locked([]):
+            backend_a.create_stock('idem_I1-B1', 'idem', 'I1-B1', cantidad=1)
+
+        def post(view, key):
+            return view(self.factory.post('/api/inventory/transactions/', data=self.payload,
+                                          content_type='application/json', HTTP_IDEMPOTENCY_KEY=key))
+
+        first = post(view_a, 'shared-1')
+        retry = post(view_b, 'shared-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(backend_b.get_stock('idem_I1-B1')['cantidad'], 0)
+
+        # Si la petición falla, la clave y el cambio de stock se descartan juntos
+        with self.assertRaises(RuntimeError):
+            post(view_a, 'shared-2')
+        self.assertEqual(backend_b.get_stock('idem_I1-B1')['cantidad'], 0)
+        self.assertEqual(backend_b.execute(
+            "SELECT COUNT(*) FROM idempotencia WHERE clave = 'shared-2'").fetchone()[0], 0)
+
+
+class StockReservationTests(TestCase):
+    """Tests de reservas de stock con vencimiento"""
+
+    def setUp(self):
+        storage = simulator.InventoryServiceSimulator.storage
+        stock = storage.get_stock('reserva_R1-B1')
+        if stock is None:
+            stock = storage.create_stock('reserva_R1-B1', 'reserva', 'R1-B1')
+        storage.adjust_stock('reserva_R1-B1', 10 - stock['cantidad'], -stock['reservada'])
+        self.addCleanup(self._release_all)
+
+    def _release_all(self):
+        for reservation in simulator.InventoryServiceSimulator.storage.all_holds():
+            if reservation['producto_id'] == 'reserva':
+                simulator.InventoryServiceSimulator.release_reservation(reservation['id'])
+
+    def _stock(self):
+        return simulator.InventoryServiceSimulator.storage.get_stock('reserva_R1-B1')
+
+    def test_reserved_units_cannot_be_picked_by_others(self):
+        """Las unidades reservadas no están disponibles para otro picking y se consumen al confirmar"""
+        service = simulator.InventoryServiceSimulator
+        hold = service.reserve_stock('reserva', 'R1-B1', 8, 'OP_1', ttl_seconds=60)
+
+        picking = service.create_transaction('reserva', 'PICKING', 5, 'R1-B1', 'OP_2')
+        self.assertFalse(picking['success'])
+        self.assertEqual(picking['stock_disponible'], 2)
+
+        confirmed = service.confirm_reservation(hold['reservation_id'], 'OP_1')
+        self.assertTrue(confirmed['success'])
+        self.assertEqual((self._stock()['cantidad'], self._stock()['reservada']), (2, 0))
+        self.assertFalse(service.release_reservation(hold['reservation_id'])['success'])
+
+    def test_expired_holds_are_released_by_scheduler(self):
+        """Al vencer, el planificador devuelve las unidades reservadas"""
+        service = simulator.InventoryServiceSimulator
+        service.reserve_stock('reserva', 'R1-B1', 4, 'OP_1', ttl_seconds=60)
+        service.reserve_stock('reserva', 'R1-B1', 3, 'OP_1', ttl_seconds=0.05)
+        self.assertEqual(self._stock()['reservada'], 7)
+
+        deadline = time.time() + 2
+        while self._stock()['reservada'] != 4 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self._stock()['reservada'], 4)
+
+    def _worker(self, backend, scheduler=True):
+        """Simulador sobre `backend`; sin scheduler simula un proceso que cae antes de vencer sus reservas"""
+        service = type('ReservationWorker', (simulator.InventoryServiceSimulator,),
+                       {'storage': backend, 'processing_delay_seconds': 0})
+        service.hold_scheduler = HoldScheduler(service.expire_reservation) if scheduler else mock.Mock()
+        return service
+
+    def _wait_for_reserved(self, backend, stock_key, expected):
+        deadline = time.time() + 2
+        while backend.get_stock(stock_key)['reservada'] != expected and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(backend.get_stock(stock_key)['reservada'], expected)
+
+    def test_holds_survive_restart_with_wal(self):
+        """Tras reiniciar desde snapshot + WAL las reservas siguen activas y las vencidas se liberan"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        persistence = InventoryPersistence(tmp.name, group_commit_ms=1)
+        persistence.recover()
+        backend = MemoryInventoryBackend({}, {})
+        backend.persistence = persistence
+        backend.create_stock('reinicio_R1-B1', 'reinicio', 'R1-B1', 10)
+        before = self._worker(backend, scheduler=False)
+
+        live = before.reserve_stock('reinicio', 'R1-B1', 3, 'OP_1', ttl_seconds=60)
+        persistence.snapshot(backend.stock, backend.transactions, backend.holds)
+        before.reserve_stock('reinicio', 'R1-B1', 4, 'OP_1', ttl_seconds=0.05)
+        persistence.close()
+
+        recovered = InventoryPersistence(tmp.name)
+        stock, transactions, holds = recovered.recover()
+        self.addCleanup(recovered.close)
+        backend = MemoryInventoryBackend({}, {})
+        backend.load(stock, transactions, holds)
+        backend.persistence = recovered
+        after = self._worker(backend)
+
+        self.assertEqual(backend.get_stock('reinicio_R1-B1')['reservada'], 7)
+        self.assertEqual(after.restore_reservations(), 2)
+        self._wait_for_reserved(backend, 'reinicio_R1-B1', 3)
+
+        confirmed = after.confirm_reservation(live['reservation_id'], 'OP_1')
+        self.assertTrue(confirmed['success'])
+        self.assertEqual(backend.get_stock('reinicio_R1-B1')['cantidad'], 7)
+        self.assertEqual(backend.count_holds(), 0)
+
+    def test_holds_are_shared_between_sqlite_workers(self):
+        """Con SQLite otro worker confirma las reservas y libera las vencidas de un worker caído"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'holds.sqlite3')
+        crashed_backend = SQLiteInventoryBackend(path)
+        with crashed_backend.locked([]):
+            crashed_backend.create_stock('reinicio_R1-B1', 'reinicio', 'R1-B1', 10)
+        crashed = self._worker(crashed_backend, scheduler=False)
+        live = crashed.reserve_stock('reinicio', 'R1-B1', 3, 'OP_1', ttl_seconds=60)
+        crashed.reserve_stock('reinicio', 'R1-B1', 4, 'OP_1', ttl_seconds=0.05)
+
+        backend = SQLiteInventoryBackend(path)
+        worker = self._worker(backend)
+        self.assertEqual(worker.restore_reservations(), 2)
+        self._wait_for_reserved(backend, 'reinicio_R1-B1', 3)
+
+        self.assertTrue(worker.confirm_reservation(live['reservation_id'], 'OP_2')['success'])
+        self.assertFalse(crashed.release_reservation(live['reservation_id'])['success'])
+        self.assertEqual((backend.get_stock('reinicio_R1-B1')['cantidad'],
+                          backend.get_stock('reinicio_R1-B1')['reservada']), (7, 0))
+
+
+class JsonSerializationTests(TestCase):
+    """Tests de la serialización JSON de las respuestas del inventario"""
+
+    def test_stdlib_encoder_matches_json_and_handles_django_types(self):
+        """El fallback estándar produce JSON válido con fechas y texto UTF-8"""
+        now = datetime(2024, 1, 2, 3, 4, 5)
+        content = inventory_json._stdlib_dumps({'ubicación': 'Bodega Ñ', 'fecha': now})
+        self.assertEqual(json.loads(content), {'ubicación': 'Bodega Ñ', 'fecha': '2024-01-02T03:04:05'})
+
+    def test_serialization_time_is_reported_per_endpoint(self):
+        """Cada respuesta reporta su tiempo de serialización y se acumula por endpoint"""
+        request = RequestFactory().get('/api/inventory/transactions/', {'limit': 5})
+        response = simulator.TransactionView.as_view()(request)
+
+        self.assertIn('X-Serialization-Time-Ms', response)
+        stats = inventory_json.serialization_stats()
+        self.assertEqual(stats['encoder'], inventory_json.ENCODER_NAME)
+        self.assertGreaterEqual(stats['endpoints']['transactions GET']['count'], 1)
+
+
+class ChangeStreamTests(TestCase):
+    """Tests del flujo de cambios (long-poll y SSE) para el dashboard"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_long_poll_resumes_from_last_event_id(self):
+        """Un long-poll desde el último id recibe solo los cambios nuevos"""
+        last_id = simulator.CHANGE_FEED.last_id
+        simulator.InventoryServiceSimulator.create_transaction('mesa', 'RECEPCION', 1, 'A4-B1', 'TEST_USER')
+
+        request = self.factory.get('/api/inventory/stream/', {'poll': 1, 'last_event_id': last_id, 'timeout': 0})
+        body = json.loads(simulator.ChangeStreamView.as_view()(request).content)
+
+        self.assertFalse(body['data']['reset'])
+        self.assertEqual([e['type'] for e in body['data']['events']], ['stock', 'transaction'])
+        self.assertEqual(body['data']['events'][1]['data']['producto_id'], 'mesa')
+        self.assertEqual(body['data']['last_event_id'], simulator.CHANGE_FEED.last_id)
+
+    def _sse_chunks(self, last_event_id):
+        request = self.factory.get('/api/inventory/stream/', HTTP_ACCEPT='text/event-stream',
+                                   HTTP_LAST_EVENT_ID=last_event_id)
+        chunks = iter(simulator.ChangeStreamView.as_view()(request).streaming_content)
+        next(chunks)  # retry
+        return chunks
+
+    def test_sse_stream_sends_events_with_ids(self):
+        """El stream SSE emite cada evento con su id epoch:secuencia para reanudar"""
+        epoch, last_id = simulator.CHANGE_FEED.epoch, simulator.CHANGE_FEED.last_id
+        simulator.InventoryServiceSimulator.create_transaction('silla', 'RECEPCION', 1, 'A5-B1', 'TEST_USER')
+
+        events = next(self._sse_chunks(f'{epoch}:{last_id}')).decode()
+
+        self.assertIn(f'id: {epoch}:{last_id + 1}\nevent: stock\n', events)
+        self.assertIn('event: transaction', events)
+
+    def test_unknown_epoch_sends_full_snapshot(self):
+        """Un id de otro epoch (reinicio u otro worker) recibe el stock completo y sigue desde su versión"""
+        chunk = next(self._sse_chunks('otro-epoch:5')).decode()
+        header, data = chunk.split('data: ', 1)
+        snapshot = json.loads(data)
+
+        self.assertEqual(header, f'id: {simulator.CHANGE_FEED.epoch}:{snapshot["version"]}\nevent: reset\n')
+        storage = simulator.InventoryServiceSimulator.storage
+        self.assertEqual({s['stock_key']: s['cantidad'] for s in snapshot['stock']},
+                         {key: stock['cantidad'] for key, stock in storage.all_stock()})
+
+        request = self.factory.get('/api/inventory/stream/', {'poll': 1, 'last_event_id': 'otro-epoch:5',
+                                                              'timeout': 0})
+        body = json.loads(simulator.ChangeStreamView.as_view()(request).content)['data']
+        self.assertTrue(body['reset'])
+        self.assertEqual(body['epoch'], simulator.CHANGE_FEED.epoch)
+        self.assertEqual(len(body['snapshot']['stock']), len(storage.all_stock()))
+
+    def test_sqlite_feed_sees_events_from_other_workers(self):
+        """Con SQLite el flujo de un worker despierta con los cambios confirmados por otro"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'stream.sqlite3')
+        worker_a, worker_b = SQLiteInventoryBackend(path), SQLiteInventoryBackend(path)
+        worker_b.create_stock('sse_E1-B1', 'sse', 'E1-B1', cantidad=1)
+        feed = SQLiteChangeFeed(worker_a, poll_interval_ms=10)
+        last_id = feed.last_id
+
+        writer = threading.Timer(0.05, worker_b.adjust_stock, ('sse_E1-B1', 4))
+        writer.start()
+        self.assertTrue(feed.wait(last_id, 2))
+        writer.join()
+
+        events, reset = feed.since(last_id)
+        self.assertFalse(reset)
+        self.assertEqual([(event_type, json.loads(payload)['cantidad']) for _, event_type, payload in events],
+                         [('stock', 5)])
+
+    def test_feed_signals_reset_when_events_left_the_buffer(self):
+        """Si el id pedido ya salió del buffer se indica reset"""
+        feed = ChangeFeed(capacity=3)
+        for index in range(5):
+            feed.publish('stock', {'n': index})
+
+        events, reset = feed.since(1)
+        self.assertTrue(reset)
+        self.assertEqual([event[0] for event in events], [3, 4, 5])
+
+        events, reset = feed.since(4)
+        self.assertFalse(reset)
+        self.assertEqual([event[0] for event in events], [5])
+
+
+class StockDeltaSyncTests(TestCase):
+    """Tests de la sincronización incremental de stock por versión"""
+
+    def _sync(self, **params):
+        request = RequestFactory().get('/api/inventory/stock/changes/', params)
+        return json.loads(simulator.StockChangesView.as_view()(request).content)['data']
+
+    def test_replica_converges_with_full_then_delta_sync(self):
+        """Una réplica que aplica full + deltas queda igual al inventario"""
+        full = self._sync(since=0)
+        self.assertTrue(full['full'])
+        replica = {change['stock_key']: change['cantidad'] for change in full['changes']}
+
+        service = simulator.InventoryServiceSimulator
+        service.create_transaction('caja', 'PICKING', 2, 'A2-B1', 'TEST_USER')
+        service.create_transaction('caja', 'RECEPCION', 5, 'A2-B1', 'TEST_USER')
+        service.create_transaction('libro', 'RECEPCION', 1, 'A3-B1', 'TEST_USER')
+
+        delta = self._sync(since=full['version'], epoch=full['epoch'])
+        self.assertFalse(delta['full'])
+        self.assertEqual(sorted(c['stock_key'] for c in delta['changes']), ['caja_A2-B1', 'libro_A3-B1'])
+        for change in delta['changes']:
+            replica[change['stock_key']] = change['cantidad']
+
+        storage = service.storage
+        self.assertEqual(replica, {key: stock['cantidad'] for key, stock in storage.all_stock()})
+        self.assertEqual(self._sync(since=delta['version'], epoch=delta['epoch'])['changes'], [])
+
+    def test_unknown_epoch_forces_full_sync(self):
+        """Si el servicio reinició (otro epoch) se pide sincronización completa"""
+        self.assertTrue(self._sync(since=1, epoch='otro-epoch')['full'])
+
+    def test_full_sync_is_paged_by_limit(self):
+        """La sincronización completa respeta limit y se recorre con next_after"""
+        pages = [self._sync(since=0, limit=2)]
+        while pages[-1]['has_more']:
+            pages.append(self._sync(since=0, limit=2, after=pages[-1]['next_after']))
+
+        self.assertTrue(all(len(page['changes']) <= 2 for page in pages))
+        keys = [change['stock_key'] for page in pages for change in page['changes']]
+        storage = simulator.InventoryServiceSimulator.storage
+        self.assertEqual(keys, sorted(stock_key for stock_key, _ in storage.all_stock()))
+
+    def test_sqlite_versions_are_shared_between_workers(self):
+        """Con SQLite la versión y el historial de cambios están en la base: todos los workers ven lo mismo"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'cambios.sqlite3')
+        worker_a = SQLiteInventoryBackend(path, change_log_events=5)
+        worker_b = SQLiteInventoryBackend(path, change_log_events=5)
+        feed_a, feed_b = SQLiteChangeFeed(worker_a), SQLiteChangeFeed(worker_b)
+        self.assertEqual(feed_a.epoch, feed_b.epoch)
+
+        with worker_b.locked([]):
+            worker_b.create_stock('sync_S1-B1', 'sync', 'S1-B1', cantidad=10)
+            worker_b.create_stock('sync_S2-B1', 'sync', 'S2-B1', cantidad=10)
+        version = feed_a.last_id
+        worker_b.adjust_stock('sync_S2-B1', -3)
+
+        changed, current = feed_a.stock_changes_since(version)
+        self.assertEqual(changed, [('sync_S2-B1', current)])
+        self.assertEqual(current, feed_b.last_id)
+
+        # Un cambio que no se confirma no consume versión
+        with self.assertRaises(KeyError):
+            with worker_a.locked([]):
+                worker_a.adjust_stock('sync_S1-B1', 1)
+                worker_a.adjust_stock('sync_NO_EXISTE', 1)
+        self.assertEqual(feed_b.last_id, current)
+
+        # Una versión que ya salió del historial obliga a sincronizar todo
+        for _ in range(5):
+            worker_a.adjust_stock('sync_S1-B1', 1)
+        self.assertTrue(feed_b.covers(feed_b.last_id - 4))
+        self.assertFalse(feed_b.covers(version))
+
+
+class LowStockDetectorTests(TestCase):
+    """Tests de la detección incremental de stock bajo"""
+
+    def setUp(self):
+        self.events = []
+        self.detector = LowStockDetector(10, hysteresis=5, thresholds={'vino': 50},
+                                         on_event=lambda event_type, data: self.events.append(event_type))
+
+    def test_hysteresis_avoids_flapping(self):
+        """Oscilar alrededor del umbral emite una sola alerta hasta superar umbral + histéresis"""
+        for nivel in (12, 9, 11, 8, 14, 16, 9):
+            self.detector.observe('pan_A1-B1', 'pan', 'A1-B1', nivel)
+
+        self.assertEqual(self.events, ['STOCK_LOW_WARNING', 'STOCK_LOW_RESOLVED', 'STOCK_LOW_WARNING'])
+
+    def test_below_threshold_is_sorted_by_shortfall(self):
+        """La consulta de SKUs en alerta las ordena de la más a la menos crítica"""
+        self.detector.observe('pan_A1-B1', 'pan', 'A1-B1', 8)
+        self.detector.observe('vino_A2-B1', 'vino', 'A2-B1', 20)
+        self.detector.observe('leche_A3-B1', 'leche', 'A3-B1', 2)
+        self.detector.observe('pan_A1-B1', 'pan', 'A1-B1', 30)
+
+        skus = self.detector.below_threshold()
+        self.assertEqual([sku['stock_key'] for sku in skus], ['vino_A2-B1', 'leche_A3-B1'])
+        self.assertEqual(skus[0]['faltante'], 30)
+
+    def test_simulator_emits_alert_on_picking(self):
+        """Un picking que deja la SKU bajo el umbral publica STOCK_LOW_WARNING"""
+        storage = simulator.InventoryServiceSimulator.storage
+        if storage.get_stock('alerta_L1-B1') is None:
+            storage.create_stock('alerta_L1-B1', 'alerta', 'L1-B1', cantidad=30)
+        simulator.InventoryServiceSimulator.create_transaction('alerta', 'PICKING', 25, 'L1-B1', 'TEST_USER')
+
+        self.assertIn('alerta_L1-B1', [sku['stock_key'] for sku in simulator.LOW_STOCK_DETECTOR.below_threshold()])
+        self.assertEqual(simulator.STOCK_ALERTS[-1]['event_type'], 'STOCK_LOW_WARNING')
+
+    def test_sqlite_listeners_only_see_committed_changes(self):
+        """Con SQLite el detector y el flujo de cambios se notifican tras el COMMIT y nunca tras un ROLLBACK"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        backend = SQLiteInventoryBackend(os.path.join(tmp.name, 'alerts.sqlite3'))
+        feed = ChangeFeed(capacity=10)
+        backend.listeners += [feed, self.detector]
+        with backend.locked([]):
+            backend.create_stock('pan_A1-B1', 'pan', 'A1-B1', 30)
+
+        with self.assertRaises(RuntimeError):
+            with backend.locked(['pan_A1-B1']):
+                backend.adjust_stock('pan_A1-B1', -25)
+                raise RuntimeError('falla antes del COMMIT')
+        self.assertEqual(backend.get_stock('pan_A1-B1')['cantidad'], 30)
+        self.assertEqual(self.events, [])
+        self.assertEqual(feed.last_id, 1)
+
+        with backend.locked(['pan_A1-B1']):
+            backend.adjust_stock('pan_A1-B1', -25)
+            self.assertEqual(feed.last_id, 1)
+        self.assertEqual(self.events, ['STOCK_LOW_WARNING'])
+        self.assertEqual(feed.last_id, 2)
+
+    def test_mysql_alert_is_written_by_the_committed_batch(self):
+        """El servicio MySQL decide la alerta dentro del lote de escritura, con el disponible y no en proceso"""
+        import inventory_microservice
+
+        service = inventory_microservice.InventoryService()
+        batches = []
+
+        @contextmanager
+        def unit_of_work(dictionary=False):
+            yield mock.Mock(), mock.Mock()
+
+        def execute_batch(cursor, query, params):
+            batches.append((query, params))
+            return 1, 40
+
+        service._unit_of_work = unit_of_work
+        service._execute_batch = execute_batch
+        service._invalidate_stock = lambda producto_id, ubicacion: None
+        with mock.patch.object(service.low_stock, 'observe') as observe:
+            result = service.create_inventory_transaction({
+                'producto_id': 'zapatos', 'tipo_operacion': 'PICKING', 'cantidad': 15,
+                'ubicacion': 'A1-B1', 'operario_id': 'TEST_USER'
+            })
+        observe.assert_not_called()
+        self.assertEqual(result['cantidad_nueva'], 25)
+
+        query, params = batches[0]
+        self.assertEqual((params['umbral'], params['histeresis']), (30, 5))
+        self.assertIn('cantidad - cantidad_reservada >= %(cantidad)s', query)
+        self.assertIn('SET @nivel = @cantidad_anterior + %(delta)s - @reservada', query)
+        # Cada evento de alerta depende de la sentencia que abre o cierra la alerta, antes del SELECT final
+        warning = query.index("'STOCK_LOW_WARNING'")
+        resolved = query.index("'STOCK_LOW_RESOLVED'")
+        self.assertLess(query.index('INSERT IGNORE INTO alertas_stock_bajo'), warning)
+        self.assertLess(query.index('DELETE FROM alertas_stock_bajo'), resolved)
+        self.assertLess(resolved, query.index('SELECT @aplicada AS aplicada'))
+
+
+class EngineParityTests(TestCase):
+    """Misma carga contra cada motor de inventory_engines: mismas respuestas"""
+
+    # Campos que dependen del motor o del momento de ejecución
+    VOLATILE_FIELDS = {'processing_time_ms', 'asr_compliant', 'transaction_id', 'id', 'timestamp'}
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _normalize(self, value):
+        if isinstance(value, dict):
+            return {k: self._normalize(v) for k, v in value.items() if k not in self.VOLATILE_FIELDS}
+        if isinstance(value, list):
+            return [self._normalize(item) for item in value]
+        return value
+
+    def _run_workload(self, engine):
+        engine.create_stock('paridad', 'P1-B1', cantidad=50, reservada=10)
+        engine.create_stock('paridad', 'P2-B1', cantidad=20)
+        results = []
+
+        recepcion = engine.create_transaction('paridad', 'RECEPCION', 15, 'P1-B1', 'OP1')
+        picking = engine.create_transaction('paridad', 'PICKING', 30, 'P1-B1', 'OP1')
+        results += [recepcion, picking]
+        results.append(engine.create_transaction('paridad', 'PICKING', 30, 'P1-B1', 'OP1'))  # Toca lo reservado
+        results.append(engine.create_transaction('paridad', 'PICKING', 1, 'P9-B1', 'OP1'))   # Ubicación inexistente
+        devolucion = engine.create_transaction('paridad', 'DEVOLUCION', 5, 'P2-B1', 'OP2')
+        results.append(devolucion)
+
+        results.append(engine.update_transaction(picking['transaction_id'], {'cantidad': 20}))
+        results.append(engine.update_transaction(picking['transaction_id'], {'cantidad': 5}))   # Ya actualizada
+        results.append(engine.update_transaction(recepcion['transaction_id'],
+                                                 {'tipo_operacion': 'PICKING', 'cantidad': 500}))
+        results.append(engine.update_transaction('TXN_INEXISTENTE', {'cantidad': 1}))
+        results.append(engine.cancel_transaction(devolucion['transaction_id'], 'OP3'))
+        results.append(engine.cancel_transaction(devolucion['transaction_id'], 'OP3'))
+        results.append(engine.cancel_transaction(picking['transaction_id'], 'OP3'))
+
+        results.append(engine.get_stock_status('paridad', 'P1-B1'))
+        results.append(engine.get_stock_status('paridad'))
+        results.append(engine.get_stock_status('inexistente'))
+        history = engine.get_transaction_history(10)
+        results.append({
+            'total_count': history['total_count'],
+            'estados': [t['estado'] for t in history['transactions']],
+        })
+        return self._normalize(results)
+
+    def test_memory_and_sqlite_engines_match(self):
+        """Los motores de memoria y SQLite producen las mismas respuestas"""
+        memory = self._run_workload(create_engine('memory'))
+        sqlite = self._run_workload(create_engine('sqlite', sqlite_path=f"{self.tmp.name}/engine.sqlite3"))
+
+        self.assertEqual(memory, sqlite)
+        self.assertEqual(memory[-1], {'total_count': 3, 'estados': ['CANCELADA', 'CANCELADA', 'COMPLETADA']})
+        self.assertEqual(memory[-4]['cantidad'], 65)
+
+    def test_default_engine_is_simulator_storage_backend(self):
+        """Sin nombre se crea el motor del backend configurado para el simulador"""
+        config = {'backend': 'sqlite', 'engine': None, 'sqlite_path': f"{self.tmp.name}/default.sqlite3",
+                  'busy_timeout_ms': 100, 'change_log_events': 1000}
+        engine = create_engine(config=config)
+
+        self.assertEqual(engine.name, 'sqlite')
+        self.assertIsInstance(engine.backend, SQLiteInventoryBackend)
+        with self.assertRaises(ValueError):
+            create_engine('oracle')
+        with self.assertRaises(TypeError):
+            InventoryEngine()
+
+    def _run_contract_workload(self, engine, producto):
+        """Operaciones con las mismas reglas en todos los motores, proyectadas al contrato de InventoryEngine"""
+        engine.create_stock(producto, 'P1-B1', cantidad=50, reservada=10)
+        engine.create_stock(producto, 'P2-B1', cantidad=20)
+        results = []
+
+        picking = engine.create_transaction(producto, 'PICKING', 30, 'P1-B1', 'OP1')
+        devolucion = engine.create_transaction(producto, 'DEVOLUCION', 5, 'P2-B1', 'OP2')
+        results += [picking, devolucion]
+        results.append(engine.create_transaction(producto, 'RECEPCION', 15, 'P1-B1', 'OP1'))
+        results.append(engine.create_transaction(producto, 'PICKING', 30, 'P1-B1', 'OP1'))  # Toca lo reservado
+        # Una actualización solo promete transaction_id (el simulador informa además el stock)
+        for transaction_id in (picking['transaction_id'], 'TXN_INEXISTENTE'):
+            results.append({'success': engine.update_transaction(transaction_id, {'observaciones': 'revisada'})['success']})
+
+        results.append(engine.get_stock_status(producto, 'P1-B1'))
+        results.append(engine.get_stock_status(producto))
+        results.append(engine.get_stock_status(producto, 'P9-B1'))
+        history = engine.get_transaction_history(10)
+        results.append(sorted(t['estado'] for t in history['transactions'] if t['producto_id'] == producto))
+
+        results.append(engine.cancel_transaction(devolucion['transaction_id'], 'OP3'))
+        results.append(engine.cancel_transaction(devolucion['transaction_id'], 'OP3'))
+        results.append(engine.cancel_transaction('TXN_INEXISTENTE', 'OP3'))
+        results.append(engine.get_stock_status(producto, 'P2-B1'))
+
+        contract = {'success', 'stock_anterior', 'stock_nuevo', 'estado_nuevo', 'cantidad', 'cantidad_reservada',
+                    'cantidad_disponible', 'total_cantidad', 'total_reservada', 'total_disponible', 'ubicaciones'}
+        return [{k: v for k, v in r.items() if k in contract} if isinstance(r, dict) else r for r in results]
+
+    def test_mysql_engine_matches_memory_on_the_contract(self):
+        """El adaptador del servicio MySQL responde como el simulador donde las reglas coinciden"""
+        engine = create_engine('mysql')
+        try:
+            engine.service.execute_with_retry("SELECT 1")
+        except Exception as e:
+            self.skipTest(f"MySQL no disponible: {e}")
+
+        producto = new_id('PAR_')
+        mysql_results = self._run_contract_workload(engine, producto)
+        memory_results = self._run_contract_workload(create_engine('memory'), producto)
+
+        self.assertEqual(mysql_results, memory_results)
+        self.assertEqual(memory_results[6]['cantidad_disponible'], 25)
+
+
+class PolicyCacheTests(TestCase):
+    """Tests del caché por clase de dato de InventoryService"""
+
+    def setUp(self):
+        self.now = 0.0
+        self.cache = PolicyCache({'stock': 10, 'transactions': 100}, max_entries=3,
+                                 sweep_interval_seconds=1, clock=lambda: self.now)
+
+    def test_ttl_per_data_class_and_active_expiry(self):
+        """Cada clase vence con su TTL y el barrido elimina las vencidas sin leerlas"""
+        self.cache.set('stock', 'zapatos_A1-B1', 90)
+        self.cache.set('transactions', 'TXN_1', {'estado': 'COMPLETADA'})
+
+        self.now = 11
+        self.assertEqual(self.cache.get('stock', 'zapatos_A1-B1'), (False, None))
+        self.assertTrue(self.cache.get('transactions', 'TXN_1')[0])
+
+        self.cache.set('stock', 'caja_A2-B1', 200)
+        self.now = 200
+        self.cache.sweep()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.stats()['expired'], 3)
+
+    def test_size_bound_evicts_oldest(self):
+        """Al superar max_entries se descarta la entrada escrita hace más tiempo"""
+        for index in range(4):
+            self.now = index * 0.1
+            self.cache.set('stock', f'sku{index}', index)
+
+        self.assertEqual(len(self.cache), 3)
+        self.assertFalse(self.cache.get('stock', 'sku0')[0])
+        self.assertEqual(self.cache.stats()['evicted'], 1)
+
+    def test_invalidation_discards_in_flight_stale_load(self):
+        """Una lectura que empezó antes de la escritura no repuebla el caché"""
+        def stale_loader():
+            # Una escritura concurrente confirma e invalida mientras se lee la BD
+            self.cache.invalidate('stock', 'zapatos_A1-B1')
+            return 100
+
+        self.assertEqual(self.cache.get_or_load('stock', 'zapatos_A1-B1', stale_loader), 100)
+        self.assertFalse(self.cache.get('stock', 'zapatos_A1-B1')[0])
+
+        self.assertEqual(self.cache.get_or_load('stock', 'zapatos_A1-B1', lambda: 90), 90)
+        self.assertEqual(self.cache.get('stock', 'zapatos_A1-B1'), (True, 90))
+        stats = self.cache.stats()
+        self.assertEqual(stats['stale_discarded'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_service_status_reads_use_cache_and_writes_invalidate(self):
+        """Las consultas filtradas se sirven del caché hasta que una escritura de la SKU las invalida"""
+        import inventory_microservice
+
+        service = inventory_microservice.InventoryService()
+        stock = {('zapatos', 'A1-B1'): 1000}
+        queries = []
+
+        def execute(query, params=None):
+            # Filtros por producto_id o por producto_id y ubicación
+            queries.append(query)
+            return [{'producto_id': p, 'ubicacion': u, 'cantidad': cantidad, 'transacciones_pendientes': 0}
+                    for (p, u), cantidad in stock.items() if [p, u][:len(params)] == params]
+
+        @contextmanager
+        def unit_of_work(dictionary=False):
+            yield mock.Mock(), mock.Mock()
+
+        def execute_batch(cursor, query, params):
+            if 'tipo_operacion' in params:
+                previous = stock[(params['producto_id'], params['ubicacion'])]
+                stock[(params['producto_id'], params['ubicacion'])] += params['delta']
+                return 1, previous
+            return 1, 'zapatos', 'A1-B1'  # update_inventory: encontrada y su SKU
+
+        service.execute_with_retry = execute
+        service._unit_of_work = unit_of_work
+        service._execute_batch = execute_batch
+
+        self.assertEqual(service.get_product_stock('zapatos', 'A1-B1'), 1000)
+        self.assertEqual(service.get_inventory_status('zapatos', 'A1-B1')['inventory'][0]['cantidad'], 1000)
+        self.assertEqual(service.get_inventory_status('zapatos')['total_records'], 1)
+        self.assertEqual(len(queries), 2)
+
+        result = service.create_inventory_transaction({
+            'producto_id': 'zapatos', 'tipo_operacion': 'PICKING', 'cantidad': 10,
+            'ubicacion': 'A1-B1', 'operario_id': 'TEST_USER'
+        })
+        self.assertEqual(result['cantidad_nueva'], 990)
+        self.assertEqual(service.get_product_stock('zapatos', 'A1-B1'), 990)
+        self.assertEqual(service.get_inventory_status('zapatos')['inventory'][0]['cantidad'], 990)
+        self.assertEqual(len(queries), 4)
+
+        service.update_inventory('TXN_1', {'estado': 'PROCESANDO'})
+        service.get_product_stock('zapatos', 'A1-B1')
+        self.assertEqual(len(queries), 5)
+
+        # Una lectura de una SKU inexistente no la crea
+        self.assertEqual(service.get_product_stock('botas', 'A1-B1'), 0)
+        self.assertTrue(all(query.strip().startswith('SELECT') for query in queries))
+        self.assertGreater(service.cache.stats()['hits'], 0)
+
+
+class EventPublisherTests(TestCase):
+    """Tests del publicador asíncrono de eventos del servicio MySQL"""
+
+    def test_batches_and_ordered_drain_on_stop(self):
+        """Los eventos se escriben en lotes y stop() no pierde ni reordena pendientes"""
+        written = []
+        publisher = EventPublisher(queue.Queue(maxsize=100), written.extend, workers=1,
+                                   batch_size=10, flush_interval_ms=20)
+        for index in range(25):
+            self.assertTrue(publisher.publish(('EVT', index)))
+        publisher.stop(timeout=5)
+
+        self.assertEqual(written, [('EVT', index) for index in range(25)])
+        stats = publisher.stats()
+        self.assertEqual(stats['written'], 25)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertGreaterEqual(stats['avg_batch_size'], 2)
+
+    def test_service_retries_only_idempotent_or_transient_failures(self):
+        """Un commit de resultado desconocido repite el lote (INSERT IGNORE); otros errores no se reintentan"""
+        import inventory_microservice
+
+        service = inventory_microservice.InventoryService()
+        outbox = {}
+        calls = []
+        cursor = mock.Mock()
+        cursor.executemany.side_effect = lambda query, rows: outbox.update(
+            (row[0], row) for row in rows if 'IGNORE' in query or row[0] not in outbox)
+        connection = mock.Mock()
+        connection.commit.side_effect = [Exception('conexión perdida durante el commit'), None]
+
+        @contextmanager
+        def unit_of_work(dictionary=False):
+            calls.append(1)
+            yield connection, cursor
+
+        service._unit_of_work = unit_of_work
+        publisher = EventPublisher(queue.Queue(maxsize=10), service._write_events, workers=1,
+                                   retryable=service._event_write_retryable)
+        publisher._write([(time.monotonic(), ('EVT_1', 'STOCK_LOW_WARNING', '{}', datetime.now()))])
+        self.assertEqual((len(calls), list(outbox), publisher.stats()['failed']), (2, ['EVT_1'], 0))
+
+        cursor.executemany.side_effect = ValueError('datos inválidos')
+        publisher._write([(time.monotonic(), ('EVT_2', 'STOCK_LOW_WARNING', '{}', datetime.now()))])
+        self.assertEqual((len(calls), publisher.stats()['failed']), (3, 1))
+
+    def test_full_queue_applies_backpressure(self):
+        """Con la cola llena el productor espera y luego escribe en línea, sin perder eventos"""
+        release = threading.Event()
+        written = []
+
+        def slow_writer(rows):
+            # Solo el hilo de fondo queda bloqueado; las escrituras en línea pasan
+            if threading.current_thread().name.startswith('inventory-events'):
+                release.wait(5)
+            written.extend(rows)
+
+        publisher = EventPublisher(queue.Queue(maxsize=2), slow_writer, workers=1,
+                                   batch_size=1, flush_interval_ms=1, put_timeout_ms=10)
+        results = [publisher.publish(('EVT', index)) for index in range(5)]
+        release.set()
+        publisher.stop(timeout=5)
+
+        self.assertIn(False, results)
+        self.assertEqual(sorted(written), [('EVT', index) for index in range(5)])
+        self.assertEqual(publisher.stats()['sync_writes'], results.count(False))
+
+
+class _OutboxTable:
+    """outbox_inventario en memoria con la interfaz mínima de mysql.connector que usa el relay"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.commits = 0
+
+    def cursor(self, dictionary=False):
+        return self
+
+    def start_transaction(self):
+        pass
+
+    def execute(self, query, params):
+        if query.strip().startswith('SELECT'):
+            pending = [row for row in self.rows if row['entregado'] is None]
+            self._result = [dict(row) for row in pending[:params[0]]]
+        else:
+            for row in self.rows:
+                if row['id'] in params:
+                    row['entregado'] = datetime.now()
+
+    def fetchall(self):
+        return self._result
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class OutboxRelayTests(TestCase):
+    """Tests del relay del outbox transaccional y sus adaptadores de broker"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.table = _OutboxTable([
+            {'id': index, 'evento_id': f'EVT_{index}', 'tipo_evento': 'INVENTORY_CHANGED',
+             'datos': json.dumps({'cantidad_nueva': index}), 'creado': datetime.now(), 'entregado': None}
+            for index in range(1, 6)
+        ])
+
+    def test_relay_delivers_batches_to_file_broker(self):
+        """El relay entrega en orden, marca entregados y no reenvía lo ya entregado"""
+        path = f"{self.tmp.name}/events.jsonl"
+        relay = OutboxRelay(lambda: self.table, FileBroker(path), batch_size=3)
+
+        self.assertEqual(relay.relay_once(), 3)
+        self.assertEqual(relay.relay_once(), 2)
+        self.assertEqual(relay.relay_once(), 0)
+        relay.stop()
+
+        with open(path, encoding='utf-8') as events_file:
+            delivered = [json.loads(line) for line in events_file]
+        self.assertEqual([event['evento_id'] for event in delivered], [f'EVT_{index}' for index in range(1, 6)])
+        self.assertEqual(delivered[0]['datos'], {'cantidad_nueva': 1})
+        stats = relay.stats()
+        self.assertEqual((stats['delivered'], stats['batches']), (5, 2))
+        self.assertGreater(stats['events_per_second'], 0)
+        self.assertIsNotNone(stats['avg_lag_ms'])
+
+    def test_socket_broker_sends_json_lines(self):
+        """El adaptador de socket envía un evento por línea"""
+        server = socket.create_server(('127.0.0.1', 0))
+        self.addCleanup(server.close)
+        broker = SocketBroker('127.0.0.1', server.getsockname()[1])
+        relay = OutboxRelay(lambda: self.table, broker, batch_size=10)
+
+        self.assertEqual(relay.relay_once(), 5)
+        connection, _ = server.accept()
+        self.addCleanup(connection.close)
+        relay.stop()
+        received = b''
+        while received.count(b'\n') < 5:
+            received += connection.recv(65536)
+
+        self.assertEqual([json.loads(line)['evento_id'] for line in received.splitlines()],
+                         [f'EVT_{index}' for index in range(1, 6)])
+
+
+class _FakeConnection:
+    """Conexión MySQL mínima para el pool: ping/reset_session/close"""
+
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise OSError('MySQL server has gone away')
+
+    def reset_session(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class ElasticConnectionPoolTests(TestCase):
+    """Tests del pool elástico de conexiones del servicio MySQL"""
+
+    def setUp(self):
+        self.opened = []
+
+        def connect():
+            connection = _FakeConnection()
+            self.opened.append(connection)
+            return connection
+
+        self.pool = ElasticConnectionPool(connect, pool_size=2, max_overflow=1, pool_timeout=0.05,
+                                          pre_ping_idle_seconds=0, pool_recycle=3600)
+
+    def test_overflow_then_bounded_wait(self):
+        """Se abren pool_size + max_overflow conexiones y luego se espera hasta pool_timeout"""
+        connections = [self.pool.get_connection() for _ in range(3)]
+        self.assertEqual(self.pool.stats()['in_use'], 3)
+
+        with self.assertRaises(PoolTimeoutError):
+            self.pool.get_connection()
+
+        for connection in connections:
+            connection.close()
+        stats = self.pool.stats()
+        # La conexión de overflow se cierra al volver: quedan pool_size ociosas
+        self.assertEqual((stats['in_use'], stats['idle'], stats['overflow_closed']), (0, 2, 1))
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(sum(stats['wait_histogram_ms'].values()), 3)
+
+    def test_waiter_gets_released_connection(self):
+        """Un hilo en espera recibe la conexión que otro devuelve"""
+        self.pool.pool_timeout = 2
+        connections = [self.pool.get_connection() for _ in range(3)]
+        threading.Timer(0.05, connections[0].close).start()
+
+        connection = self.pool.get_connection()
+
+        self.assertEqual(len(self.opened), 3)
+        waits = self.pool.stats()['wait_histogram_ms']
+        self.assertEqual(sum(waits.values()) - waits['<=1'] - waits['<=5'] - waits['<=10'], 1)
+        for other in [connection] + connections[1:]:
+            other.close()
+
+    def test_pre_ping_and_recycle_replace_connections(self):
+        """Las conexiones caídas o demasiado viejas se reemplazan al prestarse"""
+        connection = self.pool.get_connection()
+        connection.close()
+        self.opened[0].alive = False
+
+        replacement = self.pool.get_connection()
+        self.assertTrue(self.opened[0].closed)
+        self.assertEqual(len(self.opened), 2)
+        replacement.close()
+
+        self.pool.pool_recycle = 0
+        self.pool.get_connection().close()
+        stats = self.pool.stats()
+        self.assertEqual((stats['ping_failures'], stats['recycled'], stats['open']), (1, 1, 1))
+
+    def test_warm_opens_pool_size_idle_connections(self):
+        """El pre-calentamiento deja pool_size conexiones ociosas"""
+        self.assertEqual(self.pool.warm(), 2)
+        stats = self.pool.stats()
+        self.assertEqual((stats['open'], stats['idle'], stats['in_use']), (2, 2, 0))
+
+    def test_service_import_does_not_create_pool(self):
+        """Importar el servicio MySQL no crea el pool ni abre conexiones"""
+        import inventory_microservice
+
+        self.assertIsNone(inventory_microservice.connection_pool)
+
+
+class _MySQLError(Exception):
+    def __init__(self, errno):
+        super().__init__(f"error {errno}")
+        self.errno = errno
+
+
+class RetryPolicyTests(TestCase):
+    """Reintentos de unidades de trabajo con backoff, jitter y presupuesto"""
+
+    def setUp(self):
+        self.now = [0.0]
+        self.sleeps = []
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            self.now[0] += seconds
+
+        self.policy = RetryPolicy(max_attempts=4, base_delay_ms=10, max_delay_ms=40, budget_ms=500,
+                                  rng=lambda: 1.0, sleep=sleep, clock=lambda: self.now[0])
+
+    def _failing(self, errors, result='ok'):
+        calls = []
+
+        def unit_of_work():
+            calls.append(1)
+            if len(calls) <= len(errors):
+                raise errors[len(calls) - 1]
+            return result
+        return unit_of_work, calls
+
+    def test_deadlock_is_retried_until_success(self):
+        """Un deadlock (1213) reintenta la unidad completa con backoff exponencial acotado"""
+        unit_of_work, calls = self._failing([_MySQLError(1213), _MySQLError(1213), _MySQLError(2013)])
+
+        self.assertEqual(self.policy.run(unit_of_work), 'ok')
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(self.sleeps, [0.01, 0.02, 0.04])
+        stats = self.policy.stats()
+        self.assertEqual(stats['succeeded_after_retry'], 1)
+        self.assertEqual(stats['retries_by_reason'], {'deadlock': 2, 'lost_connection': 1})
+
+    def test_non_retryable_errors_are_raised_immediately(self):
+        """Errores no transitorios y commits de resultado incierto no se reintentan"""
+        for error in (_MySQLError(1062), CommitOutcomeUnknown('conexión perdida en commit')):
+            unit_of_work, calls = self._failing([error])
+            with self.assertRaises(type(error)):
+                self.policy.run(unit_of_work)
+            self.assertEqual(len(calls), 1)
+        self.assertEqual(self.policy.stats()['retries'], 0)
+
+    def test_gives_up_after_max_attempts_and_budget(self):
+        """Se rinde al agotar los intentos o si la espera superaría el presupuesto"""
+        unit_of_work, calls = self._failing([_MySQLError(1205)] * 5)
+        with self.assertRaises(_MySQLError):
+            self.policy.run(unit_of_work)
+        self.assertEqual(len(calls), 4)
+
+        self.policy.budget_ms = 25
+        unit_of_work, calls = self._failing([_MySQLError(1205)] * 5)
+        with self.assertRaises(_MySQLError):
+            self.policy.run(unit_of_work)
+        self.assertEqual(len(calls), 2)  # 10 ms + 20 ms superaría 25 ms
+        stats = self.policy.stats()
+        self.assertEqual((stats['gave_up'], stats['budget_exhausted']), (1, 1))
+
+    def test_full_jitter_stays_within_exponential_cap(self):
+        """El backoff es uniforme entre 0 y min(max_delay, base * 2^intento)"""
+        policy = RetryPolicy(base_delay_ms=10, max_delay_ms=40, rng=lambda: 0.5)
+        self.assertEqual([policy.backoff_ms(attempt) for attempt in range(4)], [5, 10, 20, 20])
+        self.assertEqual(RetryPolicy(rng=lambda: 0.0).backoff_ms(3), 0)
+
+
+class InventoryStatusListingTests(TestCase):
+    """Listado de estado del servicio MySQL: páginas por clave y respuesta transmitida"""
+
+    def setUp(self):
+        import inventory_microservice
+
+        self.module = inventory_microservice
+        self.service = inventory_microservice.InventoryService()
+        self.rows = [{'id': index, 'producto_id': f'P{index}', 'ubicacion': 'A1', 'cantidad': index,
+                      'fecha_actualizacion': None, 'transacciones_pendientes': index % 2}
+                     for index in range(1, 8)]
+        self.queries = []
+
+        def execute(query, params=None):
+            # Keyset: WHERE id > %s ORDER BY id LIMIT %s, sin JOIN a transacciones
+            self.queries.append(query)
+            after_id, limit = params
+            return [dict(row) for row in self.rows if row['id'] > after_id][:limit]
+        self.service.execute_with_retry = execute
+
+    def test_keyset_pages_follow_next_cursor(self):
+        """Cada página sigue el cursor de la anterior hasta que no quedan filas"""
+        first = self.service.get_inventory_status(limit=3)
+        second = self.service.get_inventory_status(after_id=first['next_cursor'], limit=3)
+        last = self.service.get_inventory_status(after_id=second['next_cursor'], limit=3)
+
+        self.assertEqual([row['producto_id'] for row in first['inventory']], ['P1', 'P2', 'P3'])
+        self.assertEqual((first['next_cursor'], second['next_cursor'], last['next_cursor']), (3, 6, None))
+        self.assertEqual([row['producto_id'] for row in last['inventory']], ['P7'])
+        self.assertNotIn('id', last['inventory'][0])
+        self.assertTrue(all('JOIN' not in query and 'pendientes' in query for query in self.queries))
+
+    def test_unfiltered_listing_is_streamed_in_pages(self):
+        """Sin filtros la vista transmite todo el inventario leyendo página a página"""
+        request = RequestFactory().get('/api/inventory/status/')
+        with mock.patch.object(self.module, 'inventory_service', self.service), \
+                mock.patch.dict(self.module.INVENTORY_STATUS_CONFIG, {'page_size': 2}):
+            response = self.module.get_inventory_status(request)
+            self.assertTrue(response.streaming)
+            data = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual(data['total_records'], 7)
+        self.assertEqual([row['cantidad'] for row in data['inventory']], list(range(1, 8)))
+        self.assertEqual(len(self.queries), 4)
+        self.assertEqual(data['status_code'], 200)
+        self.assertIn('response_time_ms', data)
+
+    def test_streamed_listing_reports_page_failures(self):
+        """Si falla la primera página la respuesta es un 500; si falla una posterior el cuerpo termina con error"""
+        request = RequestFactory().get('/api/inventory/status/')
+        execute = self.service.execute_with_retry
+
+        def failing_after(pages):
+            def execute_page(query, params=None):
+                if len(self.queries) >= pages:
+                    raise RuntimeError('conexión perdida')
+                return execute(query, params)
+            return execute_page
+
+        with mock.patch.object(self.module, 'inventory_service', self.service), \
+                mock.patch.dict(self.module.INVENTORY_STATUS_CONFIG, {'page_size': 2}):
+            self.service.execute_with_retry = failing_after(0)
+            response = self.module.get_inventory_status(request)
+            self.assertFalse(response.streaming)
+            self.assertEqual(response.status_code, 500)
+
+            self.service.execute_with_retry = failing_after(2)
+            response = self.module.get_inventory_status(request)
+            data = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual((data['total_records'], data['status_code'], data['error']), (4, 500, 'conexión perdida'))
+
+    def test_invalid_cursor_or_limit_is_a_bad_request(self):
+        """cursor o limit no numéricos (o fuera de rango) responden 400 en las vistas síncrona y async"""
+        with mock.patch.object(self.module, 'inventory_service', self.service):
+            for params in ({'cursor': 'abc'}, {'limit': 'diez'}, {'limit': '0'}, {'cursor': '-1'}):
+                response = self.module.get_inventory_status(RequestFactory().get('/api/inventory/status/', params))
+                self.assertEqual(response.status_code, 400, params)
+
+        with mock.patch.object(inventory_async, 'get_async_service'):
+            response = async_to_sync(inventory_async.get_inventory_status)(
+                AsyncRequestFactory().get('/api/inventory/async/status/', {'limit': 'diez'}))
+        self.assertEqual(response.status_code, 400)
+
+
+class IdGeneratorTests(TestCase):
+    """IDs de transacciones y eventos: únicos, ordenados por tiempo y sin locks"""
+
+    def test_ids_are_time_ordered(self):
+        """Los IDs ordenan como sus instantes y, dentro del milisegundo, por secuencia"""
+        now = [1_700_000_000_000 * 1_000_000]
+        generator = IdGenerator(clock_ns=lambda: now[0])
+        ids = []
+        for _ in range(3):
+            ids.extend(generator.new_id('TXN_') for _ in range(100))
+            now[0] += 1_000_000
+
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(ids[0]), len('TXN_') + 26)
+        self.assertEqual(id_timestamp_ms(ids[0]), 1_700_000_000_000)
+        self.assertEqual(id_timestamp_ms(ids[-1]), 1_700_000_000_002)
+
+    def test_ids_are_unique_across_threads_and_generators(self):
+        """Hilos del mismo proceso y generadores de otros procesos no colisionan"""
+        ids = []
+
+        def worker():
+            ids.extend([new_id('EVT_') for _ in range(5000)])
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        other_process = IdGenerator()
+        ids.extend(other_process.new_id('EVT_') for _ in range(5000))
+
+        self.assertEqual(len(set(ids)), 25000)
+
+    def test_reseed_after_fork_changes_node(self):
+        """Tras un fork el hijo elige otro nodo y otra secuencia"""
+        generator = IdGenerator()
+        node = generator.node
+        generator.reseed()
+        self.assertNotEqual(generator.node, node)
+
+    def test_simulator_uses_shared_generator(self):
+        """El simulador genera sus IDs con el generador compartido"""
+        transaction_id = simulator._new_transaction_id()
+        self.assertTrue(transaction_id.startswith('TXN_'))
+        self.assertLessEqual(abs(id_timestamp_ms(transaction_id) - time.time() * 1000), 1000)
+        self.assertTrue(simulator._new_reservation_id().startswith('HOLD_'))
+
+
+class _FakeAsyncConnection:
+    def __init__(self):
+        self.closed = False
+
+    async def ping(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class AsyncConnectionPoolTests(TestCase):
+    """Pool async de los endpoints ASGI"""
+
+    def setUp(self):
+        self.opened = []
+
+        async def connect():
+            self.opened.append(_FakeAsyncConnection())
+            return self.opened[-1]
+        self.pool = inventory_async.AsyncConnectionPool(connect, pool_size=1, max_overflow=1, pool_timeout=0.05)
+
+    async def test_waiter_gets_released_connection_and_timeout_is_bounded(self):
+        """Con todas en uso se espera sin hilo: recibe la que se libera o PoolTimeoutError"""
+        first, second = await self.pool.acquire(), await self.pool.acquire()
+        with self.assertRaises(PoolTimeoutError):
+            await self.pool.acquire()
+
+        self.pool.pool_timeout = 1
+        waiter = asyncio.ensure_future(self.pool.acquire())
+        await asyncio.sleep(0.01)
+        await self.pool.release(first)
+        self.assertIs(await waiter, first)
+
+        await self.pool.release(first)
+        await self.pool.release(second)
+        stats = self.pool.stats()
+        self.assertEqual((stats['open'], stats['idle'], stats['timeouts'], stats['max_waiters']), (1, 1, 1, 1))
+        self.assertTrue(second.closed)  # Overflow: no se conserva más de pool_size ociosas
+
+    async def test_discarded_connection_frees_its_slot(self):
+        """Una conexión en estado incierto se cierra y su lugar queda libre"""
+        connection = await self.pool.acquire()
+        await self.pool.release(connection, discard=True)
+
+        self.assertTrue(connection.closed)
+        self.assertIsNot(await self.pool.acquire(), connection)
+        self.assertEqual(self.pool.stats()['discarded'], 1)
+
+
+class AsyncInventoryServiceTests(TestCase):
+    """Servicio y vistas async contra SQLite (y MySQL local si está disponible)"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config = dict(inventory_async.INVENTORY_ASYNC_CONFIG, driver='sqlite',
+                           sqlite_path=os.path.join(self.tmpdir.name, 'inventory_async.sqlite3'),
+                           pool_size=5, max_overflow=5)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _service(self, config=None):
+        config = config or self.config
+        return inventory_async.AsyncInventoryService(
+            inventory_async.create_async_pool(config), RetryPolicy(), config['driver']
+        )
+
+    def _transaction(self, tipo_operacion, cantidad, producto_id='async_test', ubicacion='Z1-A1'):
+        return {'producto_id': producto_id, 'tipo_operacion': tipo_operacion, 'cantidad': cantidad,
+                'ubicacion': ubicacion, 'operario_id': 'OP_ASYNC'}
+
+    async def _run_workload(self, service):
+        results = [await service.create_transaction(self._transaction('RECEPCION', 30))]
+        # Pickings concurrentes: exactamente los que alcanzan el stock se aplican
+        results.extend(await asyncio.gather(*[
+            service.create_transaction(self._transaction('PICKING', 1)) for _ in range(40)
+        ]))
+        status = await service.get_inventory_status(producto_id='async_test', ubicacion='Z1-A1')
+        return results, status
+
+    async def test_concurrent_pickings_never_oversell(self):
+        """40 pickings concurrentes sobre 30 unidades: 30 aplicados y 10 rechazados"""
+        service = self._service()
+        try:
+            results, status = await self._run_workload(service)
+        finally:
+            await service.close()
+
+        self.assertEqual(results[0]['status_code'], 201)
+        self.assertEqual(sum(1 for result in results[1:] if result.get('status_code') == 201), 30)
+        self.assertEqual(sum(1 for result in results[1:] if result.get('error') == 'Stock insuficiente'), 10)
+        self.assertEqual(status['inventory'][0]['cantidad'], 0)
+
+    async def test_low_stock_alerts_are_written_with_the_stock_change(self):
+        """Cada cruce del umbral deja un solo evento en el outbox, en la misma transacción que el stock"""
+        service = self._service()
+        try:
+            await self._run_workload(service)
+            await service.create_transaction(self._transaction('RECEPCION', 22))  # 22 < 20 + 5: sigue en alerta
+            await service.create_transaction(self._transaction('RECEPCION', 3))
+            events = await service._fetchall("SELECT tipo_evento, datos FROM outbox_inventario ORDER BY id")
+            alerts = await service._fetchall("SELECT COUNT(*) AS abiertas FROM alertas_stock_bajo")
+        finally:
+            await service.close()
+
+        low_stock = [(event['tipo_evento'], json.loads(event['datos'])['nivel'])
+                     for event in events if event['tipo_evento'] != 'INVENTORY_CHANGED']
+        self.assertEqual(low_stock, [('STOCK_LOW_WARNING', 19), ('STOCK_LOW_RESOLVED', 25)])
+        self.assertEqual(alerts[0]['abiertas'], 0)
+
+    async def test_status_pages_and_streamed_listing(self):
+        """El estado se pagina por clave y la vista transmite el listado completo"""
+        service = self._service()
+        try:
+            for index in range(5):
+                await service.create_transaction(self._transaction('RECEPCION', index + 1, producto_id=f'P{index}'))
+            first = await service.get_inventory_status(limit=3)
+            second = await service.get_inventory_status(after_id=first['next_cursor'], limit=3)
+
+            request = AsyncRequestFactory().get('/api/inventory/async/status/')
+            with mock.patch.object(inventory_async, 'get_async_service', return_value=service):
+                response = await inventory_async.get_inventory_status(request)
+                chunks = [chunk async for chunk in response.streaming_content]
+                health = json.loads((await inventory_async.inventory_health_check(
+                    AsyncRequestFactory().get('/api/inventory/async/health/'))).content)
+        finally:
+            await service.close()
+
+        self.assertEqual([row['producto_id'] for row in first['inventory']], ['P0', 'P1', 'P2'])
+        self.assertEqual(([row['cantidad'] for row in second['inventory']], second['next_cursor']), ([4, 5], None))
+        data = json.loads(b''.join(chunks))
+        self.assertEqual((data['total_records'], data['inventory'][4]['transacciones_pendientes']), (5, 0))
+        self.assertEqual((health['status'], health['metrics']['database_test']), ('healthy', 'OK'))
+
+    async def test_mysql_driver_matches_sqlite(self):
+        """El driver MySQL (aiomysql) se comporta igual (requiere INVENTORY_ENGINE_MYSQL_TESTS=1)"""
+        if os.getenv('INVENTORY_ENGINE_MYSQL_TESTS') != '1':
+            self.skipTest('MySQL de inventario no disponible')
+
+        service = self._service(dict(self.config, driver='mysql'))
+        try:
+            results, status = await self._run_workload(service)
+        finally:
+            await service.close()
+        self.assertEqual(sum(1 for result in results[1:] if result.get('status_code') == 201), 30)
+        self.assertEqual(status['inventory'][0]['cantidad'], 0)
+
+
+class InventoryRoutingProbe(models.Model):
+    """Modelo de la app 'inventory' solo para verificar el router"""
+    sku = models.CharField(max_length=50)
+
+    class Meta:
+        app_label = 'inventory'
+
+
+class InventoryDatabaseRouterTests(TestCase):
+    """Lecturas a réplicas y escrituras al primario, con dos alias SQLite locales"""
+
+    ALIASES = ('inventory_test_primary', 'inventory_test_replica')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Alias registrados después de super(): TestCase no los restringe ni los envuelve en transacciones
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        configured = connections.configure_settings({**connections.settings, **{
+            alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(cls.tmpdir.name, f'{alias}.sqlite3')}
+            for alias in cls.ALIASES
+        }})
+        for alias in cls.ALIASES:
+            connections.settings[alias] = configured[alias]
+            with connections[alias].schema_editor() as editor:
+                editor.create_model(InventoryRoutingProbe)
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in cls.ALIASES:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        for alias in self.ALIASES:
+            InventoryRoutingProbe.objects.using(alias).all().delete()
+        # Sesión limpia: las escrituras de otras pruebas fijan al primario el contexto del hilo
+        self.addCleanup(_session.reset, _session.set(None))
+        self.monitor = ReplicaMonitor()
+        self.router = self._router(self.monitor)
+
+    def _router(self, monitor, replicas=('inventory_test_replica',), selection='round_robin'):
+        return InventoryDatabaseRouter({
+            'primary': 'inventory_test_primary', 'replicas': list(replicas), 'selection': selection,
+            'max_lag_seconds': 2, 'read_your_writes_seconds': 5, 'health_check_interval_seconds': 60,
+        }, monitor)
+
+    def _in_request(self, view, cookies=None):
+        """Ejecuta view() dentro del middleware de read-your-writes, como una petición"""
+        request = RequestFactory().get('/api/inventory/status/')
+        request.COOKIES.update(cookies or {})
+        middleware = InventoryReadYourWritesMiddleware(lambda request: HttpResponse(view()))
+        with override_settings(DATABASE_ROUTERS=[self.router]):
+            return middleware(request)
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        """Sin escrituras en la sesión se lee de la réplica; la escritura va al primario"""
+        InventoryRoutingProbe.objects.using('inventory_test_replica').create(sku='solo_en_replica')
+
+        response = self._in_request(lambda: ','.join(InventoryRoutingProbe.objects.values_list('sku', flat=True)))
+        self.assertEqual(response.content, b'solo_en_replica')
+
+        self._in_request(lambda: InventoryRoutingProbe.objects.create(sku='nuevo').sku)
+        self.assertTrue(InventoryRoutingProbe.objects.using('inventory_test_primary').filter(sku='nuevo').exists())
+        self.assertFalse(InventoryRoutingProbe.objects.using('inventory_test_replica').filter(sku='nuevo').exists())
+
+    def test_session_reads_its_writes_from_primary(self):
+        """Tras escribir, la misma petición y las siguientes con la cookie leen del primario"""
+        def write_then_read():
+            InventoryRoutingProbe.objects.create(sku='recien_escrito')
+            return str(InventoryRoutingProbe.objects.filter(sku='recien_escrito').count())
+
+        response = self._in_request(write_then_read)
+        self.assertEqual(response.content, b'1')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        count = lambda: str(InventoryRoutingProbe.objects.count())
+        pinned = self._in_request(count, cookies={PIN_COOKIE: response.cookies[PIN_COOKIE].value})
+        self.assertEqual(pinned.content, b'1')
+        self.assertEqual(self._in_request(count).content, b'0')  # Otra sesión: réplica
+        self.assertEqual(self.router.stats()['pinned_reads'], 2)
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        """Con el lag por encima del umbral (o la réplica caída) se lee del primario"""
+        InventoryRoutingProbe.objects.using('inventory_test_primary').create(sku='en_primario')
+        self.monitor.record('inventory_test_replica', 10.0, 1.0)
+
+        response = self._in_request(lambda: str(InventoryRoutingProbe.objects.count()))
+        self.assertEqual(response.content, b'1')
+
+        self.monitor.record('inventory_test_replica', None, error='conexión rechazada')
+        self._in_request(lambda: str(InventoryRoutingProbe.objects.count()))
+        self.assertEqual(self.router.stats()['lag_fallbacks'], 2)
+
+    def test_replica_selection_policies(self):
+        """Round-robin alterna entre réplicas sanas; least_latency elige la más rápida"""
+        monitor = ReplicaMonitor(probe=lambda alias: 0.5)
+        for alias, latency_ms in (('r1', 8.0), ('r2', 2.0), ('r3', 1.0)):
+            monitor.record(alias, 0.5, latency_ms)
+        monitor.record('r3', 30.0, 1.0)  # Atrasada: no elegible
+
+        round_robin = self._router(monitor, replicas=('r1', 'r2', 'r3'))
+        self.assertEqual([round_robin.read_alias() for _ in range(4)], ['r1', 'r2', 'r1', 'r2'])
+        least_latency = self._router(monitor, replicas=('r1', 'r2', 'r3'), selection='least_latency')
+        self.assertEqual(least_latency.read_alias(), 'r2')
+        self.assertFalse(round_robin.allow_migrate('r1', 'inventory'))
+        self.assertTrue(round_robin.allow_migrate('inventory_test_primary', 'inventory'))
+
+    def test_inventory_service_reads_use_replica_pools(self):
+        """InventoryService (SQL directo) elige el pool de cada lectura con read_alias()"""
+        import inventory_microservice
+
+        service = inventory_microservice.InventoryService()
+        service.read_router = self._router(self.monitor, replicas=('r1',))
+        self.monitor.record('r1', 0.5, 1.0)
+        used = []
+
+        @contextmanager
+        def unit_of_work(dictionary=False, pool=None):
+            used.append(pool)
+            if pool == 'pool_r1' and len(used) > 4:
+                raise RuntimeError('réplica caída')
+            cursor = mock.Mock(rowcount=1)
+            cursor.fetchall.return_value = []
+            yield mock.Mock(), cursor
+
+        def write_then_read():
+            service.get_inventory_status('zapatos')
+            service.execute_with_retry("UPDATE productos_inventario SET cantidad = 1 WHERE id = 1")
+            service.get_inventory_status('zapatos')  # Sin caché: la sesión está fijada al primario
+            return ''
+
+        service._unit_of_work = unit_of_work
+        with mock.patch.object(inventory_microservice, 'get_replica_pool', lambda alias: f'pool_{alias}'):
+            self._in_request(write_then_read)
+            self.assertEqual(used, ['pool_r1', None, None])
+
+            self._in_request(lambda: str(service.get_inventory_status()['total_records']))
+            self.assertEqual(used[3:], ['pool_r1'])
+
+            # La réplica falla: se repite en el primario y queda fuera hasta la siguiente medición
+            self._in_request(lambda: str(service.get_inventory_status()['total_records']))
+            self._in_request(lambda: str(service.get_inventory_status()['total_records']))
+        self.assertEqual(used[4:], ['pool_r1', None, None])
+        self.assertEqual(self.monitor.stats()['r1']['error'], 'réplica caída')
+